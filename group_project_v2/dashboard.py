@@ -0,0 +1,271 @@
+"""
+Dashboard data of group activities.
+
+Dashboard detail view shows a page of activity workgroups at a time (see `DashboardDetailPage`): workgroups are
+filtered and sorted by completion of a single stage first, and full statistics (`StageCompletionDetailsData`) are then
+collected for workgroups on the page only.
+
+Incomplete students exports stream csv rows, reading stage completion chunk by chunk - see
+`iter_users_completion_states`.
+"""
+from operator import itemgetter
+
+import webob
+
+from group_project_v2.request_context import request_scope
+from group_project_v2.roster import ProjectRoster
+from group_project_v2.stage import PeerReviewStage
+from group_project_v2.stage.completion import CompletionMatrix
+from group_project_v2.stage.utils import StageState
+from group_project_v2.utils import iter_csv, named_tuple_with_docstring
+
+# order of group states when sorting dashboard detail view groups by stage state
+GROUP_STATE_SORT_ORDER = (StageState.NOT_STARTED, StageState.INCOMPLETE, StageState.COMPLETED)
+
+StageCompletionDetailsData = named_tuple_with_docstring(  # pylint: disable=invalid-name
+    "StageCompletionDetailsData",
+    ['internal_group_status', 'external_group_status', 'external_group_status_label', 'user_stats', 'groups_to_grade'],
+    """
+    StageCompletionDetailsData members
+    * internal_group_status: dict[group_id, StageState] - group-wise internal completion status - aggregate
+        of individual student statuses
+    * external_group_status: dict[group_id, StageState] - group-wise external completion status. Not all stages
+        have external statuses, see stage's get_external_group_status for meaning of external status.
+    * user_stats: dict[user_id, StageState] - user-wise completion
+    * groups_to_grade: dict[user_id, list[{'id': group_id}] - groups to review for each user
+    """
+)
+
+DashboardDetailPage = named_tuple_with_docstring(  # pylint: disable=invalid-name
+    "DashboardDetailPage",
+    ['groups', 'page', 'num_pages', 'total_groups', 'filtered_out_workgroups'],
+    """
+    DashboardDetailPage members
+    * groups: list[dict] - group rows of the page, see `build_groups_data`
+    * page: int - page number, starting from 1
+    * num_pages: int - number of pages - at least one, even if there are no groups
+    * total_groups: int - number of groups matching sort and filter criteria, on all pages
+    * filtered_out_workgroups: int - number of groups hidden since all their members are filtered out
+    """
+)
+
+
+def search_workgroups(workgroups, search):
+    """
+    :param list[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Workgroups
+    :param str search: Text to search for - case insensitive
+    :return: Workgroups with members whose email or full name contain `search`
+    :rtype: list[group_project_v2.project_api.dtos.WorkgroupDetails]
+    """
+    search = search.lower()
+    return [
+        workgroup for workgroup in workgroups
+        if any(search in (user.email or '').lower() or search in user.full_name.lower() for user in workgroup.users)
+    ]
+
+
+def get_internal_group_states(stage, roster, workgroups):
+    """
+    :param group_project_v2.stage.BaseGroupActivityStage stage: Stage
+    :param group_project_v2.roster.ProjectRoster roster: Project roster
+    :param list[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Workgroups
+    :return: Workgroup ID to internal StageState mapping
+    :rtype: dict[int, str]
+    """
+    target_roster = roster.subset(workgroups)
+    completion_matrix = CompletionMatrix((user.id for user in target_roster.users), target_roster)
+    completion_matrix.add_stage(
+        stage.id, *stage.get_materialized_users_completion(target_roster, target_roster.users)
+    )
+    return completion_matrix.get_group_states(stage.id)
+
+
+def sort_workgroups_by_state(workgroups, group_states, descending=False):
+    """
+    :param list[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Workgroups - sorted in place
+    :param dict[int, str] group_states: Workgroup ID to internal StageState mapping
+    :param bool descending: Sort completed groups first
+    """
+    state_rank = {state: rank for rank, state in enumerate(GROUP_STATE_SORT_ORDER)}
+    workgroups.sort(key=lambda workgroup: (state_rank.get(group_states[workgroup.id], -1), workgroup.id))
+    if descending:
+        workgroups.reverse()
+
+
+def get_stage_completion_details(stage, target_workgroups, target_students, completion_matrix=None):
+    """
+    Gets stage completion stats from individual stage
+    :param group_project_v2.stage.BaseGroupActivityStage stage: Get stage stats from this stage
+    :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] target_workgroups:
+    :param collections.Iterable[group_project_v2.project_api.dtos.ReducedUserDetails] target_students:
+    :param group_project_v2.stage.completion.CompletionMatrix completion_matrix: Matrix to store stage completion
+        in - shared by all stages of the dashboard. Built for target workgroups and students if not given.
+    :rtype: StageCompletionDetailsData
+    :returns: Stage completion stats
+    """
+    if completion_matrix is None:
+        completion_matrix = CompletionMatrix((user.id for user in target_students), target_workgroups)
+
+    completed_users, partially_completed_users = stage.get_materialized_users_completion(
+        target_workgroups, target_students
+    )
+    completion_matrix.add_stage(stage.id, completed_users, partially_completed_users)
+    roster = target_workgroups if isinstance(target_workgroups, ProjectRoster) else None
+
+    groups_to_grade = {}
+    if isinstance(stage, PeerReviewStage):
+        for user in target_students:
+            groups_to_grade[user.id] = stage.get_review_subjects(user.id, roster)
+
+    external_group_status, external_group_status_label = get_group_statuses(stage, target_workgroups, roster)
+
+    return StageCompletionDetailsData(
+        internal_group_status=completion_matrix.get_group_states(stage.id),
+        external_group_status=external_group_status,
+        external_group_status_label=external_group_status_label,
+        user_stats=completion_matrix.get_user_states(stage.id),
+        groups_to_grade=groups_to_grade
+    )
+
+
+def get_group_statuses(stage, target_workgroups, roster=None):
+    """
+    Gets external group statuses - internal statuses are aggregated from user completion by `CompletionMatrix`
+    """
+    external_group_status, external_group_status_label = {}, {}
+    for group in target_workgroups:
+        external_status = stage.get_external_group_status(group, roster)
+        external_group_status[group.id] = external_status
+        external_group_status_label[group.id] = stage.get_external_status_label(external_status)
+    return external_group_status, external_group_status_label
+
+
+def _render_user(user, stage_stats, filtered_students, get_ta_review_link):
+    """
+    :param group_project_v2.project_api.dtos.ReducedUserDetail user:
+    :param dict[str, StageCompletionDetailsData] stage_stats: Stage completion statistics
+    :param set[int] filtered_students:  users filtered out from view
+    :param callable get_ta_review_link: Activity's `get_ta_review_link`
+    :return: dict
+    """
+
+    return {
+        'id': user.id, 'full_name': user.full_name, 'email': user.email,
+        'is_filtered_out': user.id in filtered_students,
+        'stage_states': {
+            stage_id: stage_data.user_stats.get(user.id, StageState.UNKNOWN)
+            for stage_id, stage_data in stage_stats.items()
+        },
+        'groups_to_grade': {
+            stage_id: [
+                {'id': group.id, 'ta_grade_link': get_ta_review_link(group.id, stage_id)}
+                for group in stage_data.groups_to_grade.get(user.id, [])
+            ]
+            for stage_id, stage_data in stage_stats.items()
+        }
+    }
+
+
+def _render_workgroup(workgroup, stage_stats, filtered_students, get_ta_review_link):
+    """
+    :param group_project_v2.project_api.dtos.WorkgroupDetails workgroup:
+    :param dict[str, StageCompletionDetailsData] stage_stats: Stage completion statistics
+    :param set[int] filtered_students:  users filtered out from view
+    :param callable get_ta_review_link: Activity's `get_ta_review_link`
+    :return: dict
+    """
+
+    users = [
+        _render_user(user, stage_stats, filtered_students, get_ta_review_link)
+        for user in workgroup.users
+    ]
+
+    users.sort(key=itemgetter('is_filtered_out'))
+
+    group_visible = any((not user['is_filtered_out'] for user in users))
+
+    return {
+        'id': workgroup.id,
+        'ta_grade_link': get_ta_review_link(workgroup.id),
+        'group_visible': group_visible,
+        'stage_states': {
+            stage_id: {
+                'internal_status': stage_data.internal_group_status.get(workgroup.id, StageState.UNKNOWN),
+                'external_status': stage_data.external_group_status.get(workgroup.id, StageState.NOT_AVAILABLE),
+                'external_status_label': stage_data.external_group_status_label.get(workgroup.id, ""),
+            }
+            for stage_id, stage_data in stage_stats.items()
+        },
+        'users': users
+    }
+
+
+def build_groups_data(workgroups, stage_stats, filtered_users, get_ta_review_link):
+    """
+    Converts WorkgroupDetails into dict expected by dashboard_detail_view template.
+
+    :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Workgroups
+    :param dict[str, StageCompletionDetailsData] stage_stats: Stage statistics - group-wise and user-wise completion
+        data and groups_to_review.
+    :param set[int] filtered_users: users filtered out from view - depending on actual view
+        (dashboard or dashboard details) such students are either completely excluded, or included but diplayed
+        differently
+    :param callable get_ta_review_link: Activity's `get_ta_review_link`
+    :rtype: list[dict]
+    :returns:
+        List of dictionaries with the following format:
+            * id - Group ID
+            * stage_states - dictionary stage_id -> StateState
+            * users - dictionary with the following format:
+                * id - User ID
+                * full_name - User full name
+                * email - user email
+                * stage_states - dictionary stage_id -> StageState
+                * groups_to_grade - dictionary stage_id -> list of groups to grade
+    """
+    return [
+        _render_workgroup(workgroup, stage_stats, filtered_users, get_ta_review_link)
+        for workgroup in workgroups
+    ]
+
+
+def iter_users_completion_states(stages, roster, context, chunk_size):
+    """
+    :param list[group_project_v2.stage.BaseGroupActivityStage] stages: Stages
+    :param group_project_v2.roster.ProjectRoster roster: Project roster
+    :param group_project_v2.request_context.RequestDataContext context: Request context of the handler -
+        generator is consumed after the handler returns, so chunks are read in handler's context again, sharing
+        project data fetched by the handler
+    :param int chunk_size: Number of workgroups which completion is read at once
+    :return: Students, along with list of student's StageStates - one per stage
+    :rtype: collections.Iterator[(group_project_v2.project_api.dtos.ReducedUserDetails, list[str])]
+    """
+    for start in range(0, len(roster), chunk_size):
+        chunk = roster.subset(roster.workgroups[start:start + chunk_size])
+        with request_scope(context):
+            stage_completion = [stage.get_materialized_users_completion(chunk, chunk.users) for stage in stages]
+
+        for user in chunk.users:
+            states = []
+            for completed_users, partially_completed_users in stage_completion:
+                if user.id in completed_users:
+                    states.append(StageState.COMPLETED)
+                elif user.id in partially_completed_users:
+                    states.append(StageState.INCOMPLETE)
+                else:
+                    states.append(StageState.NOT_STARTED)
+            yield user, states
+
+
+def make_csv_response(data, filename, headers):
+    """
+    :param collections.Iterable[list] data: Rows - encoded as the response is streamed
+    :param str filename: Name of the downloaded file
+    :param list[str] headers: csv headers
+    :rtype: webob.response.Response
+    """
+    response = webob.response.Response(charset='UTF-8', content_type="text/csv")
+    response.headers['Content-Disposition'] = 'attachment; filename="{filename}"'.format(filename=filename)
+    response.app_iter = iter_csv(data, headers=headers, encoding=response.charset)
+
+    return response
@@ -0,0 +1,106 @@
+"""
+Direct uploads of submission files: browser uploads the file straight to S3 with a presigned POST policy issued by
+`get_upload_policy`, and then calls `confirm_upload` to have the upload recorded as submission - see
+`group_project_v2.upload_file.DirectUpload`.
+"""
+import json
+import os
+
+from upload_validator import FileTypeValidator
+from xblock.core import XBlock
+
+from group_project_v2 import messages
+from group_project_v2.upload_file import DirectUpload, direct_uploads_enabled, get_max_upload_size
+
+
+class DirectUploadXBlockMixin(object):
+    """
+    Direct upload handlers of `group_project_v2.stage_components.GroupProjectSubmissionXBlock` - uploads are checked
+    and recorded the same way as uploads through LMS.
+    """
+    def _validate_direct_upload_request(self, request, parameter):
+        """
+        Checks upload access, that direct uploads are enabled, and reads `parameter` from JSON request body.
+
+        :param request: HTTP request
+        :param str parameter: Required request parameter
+        :return: Failure code (None if request is valid) and error response data, or parameter value if request is valid
+        :rtype: (int|None, dict|str)
+        """
+        failure_code, response_data = self._validate_upload_access()
+        if failure_code is not None:
+            return failure_code, response_data
+
+        if not direct_uploads_enabled():
+            # 404 - NOT FOUND
+            return 404, {'result': 'error', 'message': self._(messages.DIRECT_UPLOADS_DISABLED)}
+
+        try:
+            value = json.loads(request.body.decode('utf-8')).get(parameter)
+        except (ValueError, AttributeError):
+            # not a JSON object
+            value = None
+        if not value or not isinstance(value, str):
+            # 400 - BAD REQUEST
+            return 400, {'result': 'error', 'message': self._(messages.INVALID_DIRECT_UPLOAD_REQUEST)}
+
+        return None, value
+
+    @XBlock.handler
+    def get_upload_policy(self, request, _suffix=''):
+        """
+        Issues presigned POST policy browser uploads the file straight to storage with - to be followed by
+        `confirm_upload`. Expects JSON body with `file_name`; responds with policy `url`, `fields` and object `key`.
+        :param request: HTTP request
+        :param str _suffix:
+        """
+        failure_code, response_data = self._validate_direct_upload_request(request, 'file_name')
+
+        if failure_code is None:
+            file_name = response_data
+            extension = os.path.splitext(file_name.lower())[1]
+            if extension not in self.validator.allowed_exts:
+                message = self._(FileTypeValidator.extension_message) % {
+                    'extension': extension, 'allowed_extensions': ', '.join(self.validator.allowed_exts)
+                }
+                failure_code, response_data = 400, {'result': 'error', 'message': message}
+            else:
+                activity = self.stage.activity
+                upload = DirectUpload(
+                    DirectUpload.make_key(activity.workgroup.id, file_name),
+                    self.upload_id, self._make_upload_context(activity)
+                )
+                response_data = dict(upload.make_policy(get_max_upload_size()), key=upload.key)
+
+        return self._make_response(failure_code, response_data)
+
+    @XBlock.handler
+    def confirm_upload(self, request, _suffix=''):
+        """
+        Records file uploaded straight to storage (see `get_upload_policy`) as submission and marks stage as
+        completed if all submissions in stage have uploads. Expects JSON body with object `key`.
+        :param request: HTTP request
+        :param str _suffix:
+        """
+        failure_code, response_data = self._validate_direct_upload_request(request, 'key')
+
+        if failure_code is None:
+            key = response_data
+            failure_code, response_data = self._record_upload(
+                lambda activity, context: self.validate_and_submit_direct_upload(activity, context, key)
+            )
+
+        return self._make_response(failure_code, response_data)
+
+    def validate_and_submit_direct_upload(self, activity, context, key):
+        """
+        Checks file uploaded straight to storage, moves it to its permanent location, sends it to submissions backend
+        and emits submission events
+        """
+        upload = DirectUpload(key, self.upload_id, context)
+        upload.validate(self.validator)
+        upload.save_file()
+        upload.submit()
+        self._publish_submission(activity, upload.submission_id, upload.file_name)
+        self._notify_file_upload()
+        return upload
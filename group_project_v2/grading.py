@@ -0,0 +1,448 @@
+"""
+Group activity grading.
+
+`GradingPlan` is an immutable description of activity grade questions, built once per activity content version (see
+`get_grading_plan`), so that grading does not walk activity stages and their children.
+
+`GradeCalculator` calculates a group grade from a reviewers x questions answer matrix laid out by the grading plan -
+it is shared by grading of a single group (`GroupActivityXBlock.calculate_grade`) and bulk grade recalculation.
+
+`ActivityGradeRecalculation` recalculates grades of all activity workgroups in resumable batches: review items and
+reviewers of a batch are fetched concurrently, grades are calculated, and pushed to the API with bounded concurrency.
+Progress is kept in a `GradingCheckpoint`, so that an interrupted recalculation continues where it stopped.
+
+`GradeCache` remembers last grade sent to the API for each group, so that unchanged grades are not sent again.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import MappingProxyType
+
+from django.conf import settings
+
+from group_project_v2.project_api.api_implementation import MAX_CONCURRENT_REQUESTS
+from group_project_v2.request_context import request_cached
+from group_project_v2.utils import ExpiringLRUCache, mean, round_half_up
+
+log = logging.getLogger(__name__)
+
+GRADING_CHECKPOINT_SETTING = 'GROUP_PROJECT_V2_GRADING_CHECKPOINT_CACHE'
+GRADING_CHECKPOINT_KEY_PREFIX = 'group_project_v2:grading:v1'
+GRADING_CHECKPOINT_EXPIRATION = timedelta(days=1)
+
+DEFAULT_GRADING_BATCH_SIZE = 100
+
+GRADE_CACHE_SETTING = 'GROUP_PROJECT_V2_GRADE_CACHE'
+GRADE_CACHE_KEY_PREFIX = 'group_project_v2:grade:v3'
+# grades can be changed in the LMS (overrides, rescoring) without the activity knowing, so sent grades are only
+# trusted long enough to coalesce repeated sends of a submission burst or a recalculation run
+GRADE_CACHE_EXPIRATION = timedelta(minutes=15)
+
+GRADING_PLAN_CACHE_MAX_SIZE = 1000
+GRADING_PLAN_EXPIRATION = timedelta(hours=1)
+
+_grading_plans = ExpiringLRUCache(GRADING_PLAN_CACHE_MAX_SIZE, GRADING_PLAN_EXPIRATION)
+
+
+class GradingPlan(object):
+    """
+    Immutable snapshot of activity grade questions: their IDs in grading order, required flags, and column index of
+    each question in an answer matrix.
+    """
+    __slots__ = ('_question_ids', '_required', '_question_index')
+
+    def __init__(self, questions):
+        """
+        :param collections.Iterable[group_project_v2.stage_components.GroupProjectReviewQuestionXBlock] questions:
+            Grade questions, in grading order
+        """
+        questions = list(questions)
+        self._question_ids = tuple(question.question_id for question in questions)
+        self._required = tuple(bool(question.required) for question in questions)
+        self._question_index = MappingProxyType({
+            question_id: index for index, question_id in enumerate(self._question_ids)
+        })
+
+    def __len__(self):
+        return len(self._question_ids)
+
+    @property
+    def question_ids(self):
+        """
+        :rtype: tuple[str]
+        """
+        return self._question_ids
+
+    @property
+    def required(self):
+        """
+        Required flags of questions, in the same order as `question_ids`. Grade calculation requires answers to all
+        grade questions regardless of the flags.
+
+        :rtype: tuple[bool]
+        """
+        return self._required
+
+    def get_question_index(self, question_id):
+        """
+        :param str question_id: Question ID
+        :return: Position of question in grading order, or None if it is not a grade question
+        :rtype: int|None
+        """
+        return self._question_index.get(question_id)
+
+
+def get_grading_plan(activity):
+    """
+    Returns grading plan of the activity. Plans are cached across requests by activity content version, so that
+    editing activity produces a new plan; if runtime does not expose content version, plan is built once per request.
+
+    :param group_project_v2.group_project.GroupActivityXBlock activity: Activity
+    :rtype: GradingPlan
+    """
+    version = activity.content_version
+    if version is None:
+        return request_cached(('grading_plan', activity.content_id), lambda: GradingPlan(activity.grade_questions))
+
+    key = (activity.content_id, version)
+    plan = _grading_plans.get(key)
+    if plan is None:
+        plan = GradingPlan(activity.grade_questions)
+        _grading_plans.set(key, plan)
+    return plan
+
+
+class GradeCalculator(object):
+    """
+    Calculates group grade from review answers to grade questions.
+
+    Answers are arranged in a reviewers x questions matrix: a row per reviewer, a column per grade question (as laid
+    out by grading plan). Reviewers assigned to the group must provide complete rows; rows of other reviewers
+    (admins/TAs) are used only if complete, and stand in for incomplete rows of assigned reviewers. Group grade is
+    a mean of mean row values.
+    """
+    def __init__(self, plan):
+        """
+        :param GradingPlan plan: Activity grading plan
+        """
+        self.plan = plan
+
+    def build_answer_matrix(self, review_items, real_user_id):
+        """
+        :param collections.Iterable[dict] review_items: Workgroup review items
+        :param callable real_user_id: Converts anonymous reviewer ID into user ID
+        :return: Reviewer ID to row of answers mapping - missing answers are None. All reviewers that submitted any
+            review item have a row, even if they have not answered any grade question.
+        :rtype: dict[int, list]
+        """
+        question_count = len(self.plan)
+        get_question_index = self.plan.get_question_index
+        matrix = {}
+        for review_item in review_items:
+            reviewer_id = real_user_id(review_item['reviewer'])
+            row = matrix.get(reviewer_id)
+            if row is None:
+                row = matrix[reviewer_id] = [None] * question_count
+            question_index = get_question_index(review_item['question'])
+            if question_index is not None:
+                row[question_index] = review_item['answer']
+        return matrix
+
+    @staticmethod
+    def _is_complete(row):
+        return all(answer is not None for answer in row)
+
+    def calculate(self, answer_matrix, group_reviewer_ids):
+        """
+        :param dict[int, list] answer_matrix: Answer matrix - see `build_answer_matrix`
+        :param list[int] group_reviewer_ids: IDs of reviewers assigned to the group
+        :return: Group grade or None if there are not enough answers to grade the group
+        :rtype: int|None
+        """
+        empty_row = [None] * len(self.plan)
+        admin_rows = [
+            row for reviewer_id, row in answer_matrix.items()
+            if reviewer_id not in group_reviewer_ids and row and self._is_complete(row)
+        ]
+        admin_provided_grades = None
+        if len(admin_rows) > 1:
+            admin_provided_grades = [mean(column) for column in zip(*admin_rows)]
+        elif admin_rows:
+            admin_provided_grades = admin_rows[0]
+
+        rows = []
+        for reviewer_id in group_reviewer_ids:
+            row = answer_matrix.get(reviewer_id, empty_row)
+            if not self._is_complete(row):
+                if not admin_provided_grades:
+                    return None
+                row = admin_provided_grades
+            rows.append(row)
+        if not group_reviewer_ids:
+            if not admin_provided_grades:
+                return None
+            rows.append(admin_provided_grades)
+
+        reviewer_grades = [mean(row) for row in rows if row]
+        return round_half_up(mean(reviewer_grades)) if reviewer_grades else None
+
+
+class GradeCache(object):
+    """
+    Grades of an activity last sent to the API, stored in a Django cache (one of `CACHES`) pointed to by
+    `GROUP_PROJECT_V2_GRADE_CACHE` setting.
+
+    For each group, the cache records grade and maximum score last sent to the API, which allows skipping repeated
+    sends of an unchanged grade (and grade events that come with them). Grades are always calculated - the cache only
+    saves the API write. Entries expire after `GRADE_CACHE_EXPIRATION`, and are cleared when grade recalculation is
+    restarted, so grades overridden or rescored in the LMS are published again. Sent grades must be visible to all
+    processes serving the course, so the cache is disabled unless the setting points to a shared cache (i.e.
+    memcached) - when disabled, nothing is stored and every grade is sent. Cache errors are logged and treated as
+    missing entries.
+    """
+    def __init__(self, activity_content_id):
+        """
+        :param str activity_content_id: Activity content ID
+        """
+        self.activity_content_id = activity_content_id
+        # memcached keys are limited to 250 characters without spaces, so content id is hashed
+        self._key_prefix = ':'.join([
+            GRADE_CACHE_KEY_PREFIX, hashlib.md5(activity_content_id.encode('utf-8')).hexdigest()
+        ])
+
+    @property
+    def cache(self):
+        """
+        :return: Django cache holding sent grades, or None if grade cache is disabled
+        """
+        alias = getattr(settings, GRADE_CACHE_SETTING, None)
+        if not alias:
+            return None
+
+        from django.core.cache import caches
+        return caches[alias]
+
+    def _make_sent_grade_key(self, group_id):
+        return '{prefix}:sent:{group_id}'.format(prefix=self._key_prefix, group_id=group_id)
+
+    def is_sent(self, group_id, grade, max_score):
+        """
+        :param int group_id: Group ID
+        :param int grade: Group grade
+        :param int max_score: Maximum score of the activity
+        :return: True if exactly this grade was last sent to the API for the group
+        :rtype: bool
+        """
+        cache = self.cache
+        if cache is None:
+            return False
+        try:
+            return cache.get(self._make_sent_grade_key(group_id)) == [grade, max_score]
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to read grade cache for %s", self.activity_content_id)
+            return False
+
+    def mark_sent(self, group_id, grade, max_score):
+        """
+        :param int group_id: Group ID
+        :param int grade: Group grade
+        :param int max_score: Maximum score of the activity
+        """
+        cache = self.cache
+        if cache is None:
+            return
+        try:
+            cache.set(self._make_sent_grade_key(group_id), [grade, max_score], GRADE_CACHE_EXPIRATION.total_seconds())
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to update grade cache for %s", self.activity_content_id)
+
+    def clear_sent(self, group_ids):
+        """
+        :param collections.Iterable[int] group_ids: IDs of groups which grades are sent again next time
+        """
+        cache = self.cache
+        if cache is None:
+            return
+        try:
+            cache.delete_many([self._make_sent_grade_key(group_id) for group_id in group_ids])
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to clear grade cache for %s", self.activity_content_id)
+
+
+class GradingCheckpoint(object):
+    """
+    Progress of activity grade recalculation, stored in a Django cache (one of `CACHES`) pointed to by
+    `GROUP_PROJECT_V2_GRADING_CHECKPOINT_CACHE` setting - `default` cache is used if not set.
+    """
+    def __init__(self, activity_content_id):
+        """
+        :param str activity_content_id: Activity content ID
+        """
+        self.activity_content_id = activity_content_id
+        # memcached keys are limited to 250 characters without spaces, so content id is hashed
+        self._key = ':'.join([
+            GRADING_CHECKPOINT_KEY_PREFIX, hashlib.md5(activity_content_id.encode('utf-8')).hexdigest()
+        ])
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[getattr(settings, GRADING_CHECKPOINT_SETTING, None) or 'default']
+
+    def load(self):
+        """
+        :return: Saved progress, or None if recalculation has not been started (or checkpoint expired)
+        :rtype: dict|None
+        """
+        return self.cache.get(self._key)
+
+    def save(self, progress):
+        """
+        :param dict progress: Recalculation progress
+        """
+        self.cache.set(self._key, progress, GRADING_CHECKPOINT_EXPIRATION.total_seconds())
+
+    def clear(self):
+        self.cache.delete(self._key)
+
+
+class ActivityGradeRecalculation(object):
+    """
+    Recalculates and re-sends grades of all workgroups of an activity, batch by batch.
+
+    Progress counters:
+        * total - number of workgroups to grade
+        * processed - number of workgroups already processed, in workgroup ID order
+        * graded - workgroups that were graded
+        * ungraded - workgroups without enough reviews to calculate grade
+        * failed - IDs of workgroups grade calculation or sending failed for
+    """
+    def __init__(self, activity, checkpoint=None, max_workers=MAX_CONCURRENT_REQUESTS):
+        """
+        :param group_project_v2.group_project.GroupActivityXBlock activity: Activity
+        :param GradingCheckpoint checkpoint: Checkpoint - one bound to the activity by default
+        :param int max_workers: Maximum number of concurrent API requests
+        """
+        self.activity = activity
+        self.checkpoint = checkpoint or GradingCheckpoint(activity.content_id)
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _new_progress(workgroup_ids):
+        return {'total': len(workgroup_ids), 'processed': 0, 'graded': 0, 'ungraded': 0, 'failed': []}
+
+    def run_batch(self, workgroup_ids, batch_size=DEFAULT_GRADING_BATCH_SIZE, restart=False):
+        """
+        Grades next batch of workgroups, and saves progress to the checkpoint.
+
+        :param collections.Iterable[int] workgroup_ids: IDs of all activity workgroups
+        :param int batch_size: Number of workgroups to grade
+        :param bool restart: Start from the first workgroup, discarding saved progress and sent grades
+        :return: Progress, with `done` flag set when all workgroups are processed
+        :rtype: dict
+        """
+        workgroup_ids = sorted(set(workgroup_ids))
+        if restart:
+            self.activity.grade_cache.clear_sent(workgroup_ids)
+        progress = None if restart else self.checkpoint.load()
+        if progress is None or progress['total'] != len(workgroup_ids):
+            progress = self._new_progress(workgroup_ids)
+
+        batch = workgroup_ids[progress['processed']:progress['processed'] + batch_size]
+        if batch:
+            grades, failed = self.calculate_grades(batch)
+            failed.extend(self.send_grades(grades))
+
+            progress['processed'] += len(batch)
+            progress['graded'] += len([grade for grade in grades.values() if grade is not None])
+            progress['ungraded'] += len([grade for grade in grades.values() if grade is None])
+            progress['failed'].extend(failed)
+            self.checkpoint.save(progress)
+            log.info("Recalculated grades of %s: %s", self.activity.content_id, progress)
+
+        progress['done'] = progress['processed'] >= progress['total']
+        return progress
+
+    def _map_concurrently(self, func, workgroup_ids):
+        """
+        :return: Workgroup ID to result mapping, and IDs of workgroups `func` failed for
+        :rtype: (dict, list[int])
+        """
+        results, failed = {}, []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(workgroup_ids)))) as executor:
+            futures = [(group_id, executor.submit(func, group_id)) for group_id in workgroup_ids]
+            for group_id, future in futures:
+                try:
+                    results[group_id] = future.result()
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Grading workgroup %s of %s failed", group_id, self.activity.content_id)
+                    failed.append(group_id)
+        return results, failed
+
+    def calculate_grades(self, workgroup_ids):
+        """
+        :param list[int] workgroup_ids: Workgroup IDs
+        :return: Workgroup ID to grade (None if workgroup can't be graded yet) mapping, and IDs of workgroups
+            grade calculation failed for
+        :rtype: (dict[int, int|None], list[int])
+        """
+        activity, api = self.activity, self.activity.project_api
+        calculator = GradeCalculator(activity.grading_plan)
+
+        def fetch(group_id):
+            review_items = api.get_workgroup_review_items_for_group(group_id, activity.content_id)
+            reviewer_ids = [user["id"] for user in api.get_workgroup_reviewers(group_id, activity.content_id)]
+            return review_items, reviewer_ids
+
+        review_data, failed = self._map_concurrently(fetch, workgroup_ids)
+
+        grades = {}
+        for group_id, (review_items, reviewer_ids) in review_data.items():
+            try:
+                # resolving user IDs uses runtime, so it is done on the calling thread
+                answer_matrix = calculator.build_answer_matrix(review_items, activity.real_user_id)
+                grades[group_id] = calculator.calculate(answer_matrix, reviewer_ids)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Calculating grade of workgroup %s of %s failed", group_id, activity.content_id)
+                failed.append(group_id)
+        return grades, failed
+
+    def send_grades(self, grades):
+        """
+        Sends grades to the API, and emits grading events for workgroups that were graded successfully. Grades that
+        were already sent to the API are not sent again - see `GradeCache`.
+
+        :param dict[int, int|None] grades: Workgroup ID to grade mapping - workgroups without grade are skipped
+        :return: IDs of workgroups sending grade failed for
+        :rtype: list[int]
+        """
+        activity = self.activity
+        max_score = activity.max_score()
+        grade_cache = activity.grade_cache
+        graded_ids = sorted(group_id for group_id, grade in grades.items() if grade is not None)
+
+        def send(group_id):
+            grade = grades[group_id]
+            sent = not grade_cache.is_sent(group_id, grade, max_score)
+            if sent:
+                activity.project_api.set_group_grade(
+                    group_id, activity.course_id, activity.content_id, grade, max_score
+                )
+                grade_cache.mark_sent(group_id, grade, max_score)
+            return activity.project_api.get_workgroup_by_id(group_id), sent
+
+        results, failed = self._map_concurrently(send, graded_ids)
+
+        # runtime is not thread safe, so events are published on the calling thread
+        for group_id in graded_ids:
+            if group_id not in results:
+                continue
+            workgroup, sent = results[group_id]
+            if sent:
+                activity.publish_group_grade(group_id, grades[group_id], workgroup)
+            else:
+                # grade has not changed, but workgroup membership might have
+                for user in workgroup.users:
+                    activity.mark_complete(user.id)
+        return failed
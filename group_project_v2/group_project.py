@@ -2,7 +2,7 @@
 import itertools
 import logging
 from datetime import datetime
-from operator import itemgetter
+from urllib.parse import urlencode
 
 import webob
 from lazy.lazy import lazy
@@ -15,6 +15,24 @@ from xblock.validation import ValidationMessage
 from xblockutils.studio_editable import NestedXBlockSpec, XBlockWithPreviewMixin
 
 from group_project_v2 import messages
+from group_project_v2.dashboard import (
+    GROUP_STATE_SORT_ORDER,
+    DashboardDetailPage,
+    build_groups_data,
+    get_internal_group_states,
+    get_stage_completion_details,
+    iter_users_completion_states,
+    make_csv_response,
+    search_workgroups,
+    sort_workgroups_by_state,
+)
+from group_project_v2.grading import (
+    DEFAULT_GRADING_BATCH_SIZE,
+    ActivityGradeRecalculation,
+    GradeCache,
+    GradeCalculator,
+    get_grading_plan,
+)
 from group_project_v2.mixins import (
     AuthXBlockMixin,
     CommonMixinCollection,
@@ -22,6 +40,7 @@ from group_project_v2.mixins import (
     DashboardXBlockMixin,
 )
 from group_project_v2.project_navigator import GroupProjectNavigatorXBlock
+from group_project_v2.request_context import get_request_context, request_cached
 from group_project_v2.stage import (
     STAGE_TYPES,
     BasicStage,
@@ -32,17 +51,18 @@ from group_project_v2.stage import (
     SubmissionStage,
     TeamEvaluationStage,
 )
+from group_project_v2.stage.completion import CompletionMatrix
 from group_project_v2.stage.utils import StageState
 from group_project_v2.utils import (
     Constants,
     DiscussionXBlockShim,
     add_resource,
-    export_to_csv,
+    conversion_protected_handler,
     get_block_content_id,
     get_default_stage,
 )
 from group_project_v2.utils import gettext as _
-from group_project_v2.utils import groupwork_protected_view, make_key, mean, named_tuple_with_docstring, round_half_up
+from group_project_v2.utils import groupwork_protected_handler, groupwork_protected_view, key_error_protected_handler
 
 log = logging.getLogger(__name__)
 
@@ -59,6 +79,10 @@ class GroupProjectXBlock(CommonMixinCollection, DashboardXBlockMixin, DashboardR
 
     CATEGORY = "gp-v2-project"
     REPORT_FILENAME = "group_project_{group_project_name}_stage_{stage_name}_incomplete_report_{timestamp}.csv"
+    ACTIVITY_REPORT_FILENAME = (
+        "group_project_{group_project_name}_activity_{activity_name}_incomplete_report_{timestamp}.csv"
+    )
+    EXPORT_CHUNK_SIZE = 100
     CSV_HEADERS = ['Name', 'Username', 'Email']
     CSV_TIMESTAMP_FORMAT = "%Y_%m_%d_%H_%M_%S"
 
@@ -244,31 +268,111 @@ class GroupProjectXBlock(CommonMixinCollection, DashboardXBlockMixin, DashboardR
 
     @XBlock.handler
     def download_incomplete_list(self, request, _suffix=''):
-        target_stage_id = self.get_block_id_from_string(request.GET.get(Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME))
-        target_stage = self._get_target_block(target_stage_id)
+        """
+        Exports students that have not completed a stage as csv. If target block is an activity, students that have not
+        completed any of activity stages are exported, along with their state in each stage.
+
+        Completion is read from stage completion tables, EXPORT_CHUNK_SIZE workgroups at a time, while the response is
+        streamed - so the first rows are sent before completion of the whole cohort is read.
+        """
+        target_block_id = self.get_block_id_from_string(request.GET.get(Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME))
+        target_block = self._get_target_block(target_block_id)
 
-        if target_stage is None:
-            return webob.response.Response(u"Stage {stage_id} not found".format(stage_id=target_stage_id), status=404)
+        if target_block is None:
+            return webob.response.Response(u"Stage {stage_id} not found".format(stage_id=target_block_id), status=404)
 
-        workgroups, users = self.get_workgroups_and_students()
-        completed, _partially_completed = target_stage.get_users_completion(workgroups, users)
+        roster, _users = self.get_workgroups_and_students()
+        context = get_request_context()
+        timestamp = datetime.utcnow().strftime(self.CSV_TIMESTAMP_FORMAT)
+
+        if isinstance(target_block, GroupActivityXBlock):
+            stages = target_block.detail_view_stages
+            filename = self.ACTIVITY_REPORT_FILENAME.format(
+                group_project_name=self.display_name, activity_name=target_block.display_name, timestamp=timestamp
+            )
+            rows = (
+                [user.full_name, user.username, user.email] +
+                [self._(StageState.get_human_name(state)) for state in states]
+                for user, states in iter_users_completion_states(stages, roster, context, self.EXPORT_CHUNK_SIZE)
+                if any(state != StageState.COMPLETED for state in states)
+            )
+            headers = self.CSV_HEADERS + [stage.display_name for stage in stages]
+            return make_csv_response(rows, filename, headers)
 
-        users_to_export = [user for user in users if user.id not in completed]
         filename = self.REPORT_FILENAME.format(
-            group_project_name=self.display_name, stage_name=target_stage.display_name,
-            timestamp=datetime.utcnow().strftime(self.CSV_TIMESTAMP_FORMAT)
+            group_project_name=self.display_name, stage_name=target_block.display_name, timestamp=timestamp
         )
-
+        users_states = iter_users_completion_states([target_block], roster, context, self.EXPORT_CHUNK_SIZE)
+        users_to_export = (user for user, (state, ) in users_states if state != StageState.COMPLETED)
         return self.export_users(users_to_export, filename)
 
+    @XBlock.json_handler
+    @groupwork_protected_handler
+    @AuthXBlockMixin.check_dashboard_access_for_current_user
+    def reset_completion_tables(self, _data, _suffix=''):
+        """
+        Drops completion of all project students from stage completion tables - repairs completion shown on
+        dashboards if it drifted from actual data. Completion is not recalculated here, as it takes too long for
+        large cohorts - dropped rows are recalculated by dashboards, only for the students they display.
+        """
+        _workgroups, users = self.get_workgroups_and_students()
+        user_ids = [user.id for user in users]
+        reset_stages = 0
+        for activity in self.activities:
+            for stage in activity.stages:
+                stage.completion_table.invalidate_users(user_ids)
+                reset_stages += 1
+
+        return {'result': 'success', 'stages': reset_stages, 'users': len(user_ids)}
+
+    @XBlock.json_handler
+    @groupwork_protected_handler
+    @AuthXBlockMixin.check_dashboard_access_for_current_user
+    @key_error_protected_handler
+    @conversion_protected_handler
+    def dashboard_detail_groups(self, data, _suffix=''):
+        """
+        Returns a page of dashboard detail view group rows, as rendered HTML - used for lazy loading of groups.
+        """
+        ctx = self._sanitize_context(data)
+        self._add_students_and_workgroups_to_context(ctx)
+
+        activity_id = data['activity_id']
+        activity = next((activity for activity in self.activities if str(activity.id) == activity_id), None)
+        if activity is None:
+            raise ValueError("Unknown activity {}".format(activity_id))
+
+        filter_state = data.get('filter_state') or None
+        if filter_state is not None and filter_state not in GROUP_STATE_SORT_ORDER:
+            raise ValueError("Unknown stage state {}".format(filter_state))
+
+        detail_page = activity.get_dashboard_detail_page(
+            ctx,
+            page=int(data.get('page', 1)),
+            sort_stage_id=data.get('sort_stage_id') or None,
+            sort_descending=bool(data.get('sort_descending', False)),
+            filter_stage_id=data.get('filter_stage_id') or None,
+            filter_state=filter_state,
+            search=data.get('search') or None,
+        )
+
+        return {
+            'result': 'success',
+            'html': activity.render_dashboard_detail_rows(detail_page),
+            'page': detail_page.page,
+            'num_pages': detail_page.num_pages,
+            'total_groups': detail_page.total_groups,
+        }
+
     @classmethod
     def export_users(cls, users_to_export, filename):
-        response = webob.response.Response(charset='UTF-8', content_type="text/csv")
-        response.headers['Content-Disposition'] = 'attachment; filename="{filename}"'.format(filename=filename)
-        user_data = [[user.full_name, user.username, user.email] for user in users_to_export]
-        export_to_csv(user_data, response, headers=cls.CSV_HEADERS)
-
-        return response
+        """
+        :param collections.Iterable[group_project_v2.project_api.dtos.ReducedUserDetails] users_to_export: Users
+        :param str filename: Name of the downloaded file
+        :rtype: webob.response.Response
+        """
+        user_data = ([user.full_name, user.username, user.email] for user in users_to_export)
+        return make_csv_response(user_data, filename, cls.CSV_HEADERS)
 
     def validate(self):
         validation = super(GroupProjectXBlock, self).validate()
@@ -308,21 +412,6 @@ class GroupProjectXBlock(CommonMixinCollection, DashboardXBlockMixin, DashboardR
         return None  # if there are no activities there's no stages as well - nothing we can really do
 
 
-StageCompletionDetailsData = named_tuple_with_docstring(  # pylint: disable=invalid-name
-    "StageCompletionDetailsData",
-    ['internal_group_status', 'external_group_status', 'external_group_status_label', 'user_stats', 'groups_to_grade'],
-    """
-    StageCompletionDetailsData members
-    * internal_group_status: dict[group_id, StageState] - group-wise internal completion status - aggregate
-        of individual student statuses
-    * external_group_status: dict[group_id, StageState] - group-wise external completion status. Not all stages
-        have external statuses, see stage's get_external_group_status for meaning of external status.
-    * user_stats: dict[user_id, StageState] - user-wise completion
-    * groups_to_grade: dict[user_id, list[{'id': group_id}] - groups to review for each user
-    """
-)
-
-
 @XBlock.needs("i18n")
 @XBlock.wants('notifications')
 @XBlock.wants('courseware_parent_info')
@@ -384,6 +473,8 @@ class GroupActivityXBlock(
     TA_REVIEW_URL_KEY = 'ta_review_url'
     DEFAULT_TA_REVIEW_URL_TPL = "ta_grading=true&activate_block_id={activate_block_id}&group_id={group_id}"
 
+    DASHBOARD_DETAIL_PAGE_SIZE = 50
+
     @property
     def id(self):
         return self.scope_ids.usage_id
@@ -442,6 +533,28 @@ class GroupActivityXBlock(
     def grade_questions(self):
         return list(self._chain_questions(self.stages, 'grade_questions'))
 
+    @property
+    def grading_plan(self):
+        """
+        :rtype: group_project_v2.grading.GradingPlan
+        """
+        return get_grading_plan(self)
+
+    @property
+    def grade_cache(self):
+        """
+        :rtype: group_project_v2.grading.GradeCache
+        """
+        return GradeCache(self.content_id)
+
+    @property
+    def content_version(self):
+        """
+        Identifies version of activity content, including its stages and questions: last edit time of the activity
+        subtree, if runtime provides it (LMS does), None otherwise.
+        """
+        return getattr(self, 'subtree_edited_on', None)
+
     @property
     def team_evaluation_questions(self):
         stages = self.get_children_by_category(TeamEvaluationStage.CATEGORY)
@@ -597,182 +710,154 @@ class GroupActivityXBlock(
 
         return fragment
 
+    @property
+    def detail_view_stages(self):
+        """
+        :rtype: list[group_project_v2.stage.BaseGroupActivityStage]
+        """
+        return [stage for stage in self.stages if stage.shown_on_detail_view]
+
+    def get_detail_view_stage(self, stage_id):
+        """
+        :param str stage_id: Stage ID, as string
+        :raises ValueError: if there's no such stage shown on dashboard detail view
+        :rtype: group_project_v2.stage.BaseGroupActivityStage
+        """
+        for stage in self.detail_view_stages:
+            if str(stage.id) == stage_id:
+                return stage
+        raise ValueError("Unknown stage {}".format(stage_id))
+
     @groupwork_protected_view
     @AuthXBlockMixin.check_dashboard_access_for_current_user
     def dashboard_detail_view(self, context):
+        """
+        Renders first page of groups - further pages are loaded by the client via project's `dashboard_detail_groups`
+        handler.
+        """
         fragment = Fragment()
 
         children_context = context.copy()
 
-        target_workgroups = context.get(Constants.TARGET_WORKGROUPS)
-        target_users = context.get(Constants.TARGET_STUDENTS)
-        filtered_users = children_context[Constants.FILTERED_STUDENTS]
-
         stages = []
-        stage_stats = {}
-        for stage in self.stages:
-            if not stage.shown_on_detail_view:
-                continue
+        for stage in self.detail_view_stages:
             stage_fragment = stage.render('dashboard_detail_view', children_context)
             stage_fragment.add_fragment_resources(fragment)
-            stages.append({"id": stage.id, 'content': stage_fragment.content})
-            stage_stats[stage.id] = self._get_stage_completion_details(stage, target_workgroups, target_users)
+            stages.append({"id": stage.id, "name": stage.display_name, 'content': stage_fragment.content})
 
-        groups_data = self._build_groups_data(target_workgroups, stage_stats, filtered_users)
-        visible_groups = [group for group in groups_data if group["group_visible"]]
+        detail_page = self.get_dashboard_detail_page(context)
 
         render_context = {
             'activity': self,
             'StageState': StageState,
             'stages': stages,
             'stages_count': len(stages),
-            'groups': visible_groups,
-            'filtered_out_workgroups': len(groups_data) - len(visible_groups),
+            'group_rows': self.render_dashboard_detail_rows(detail_page),
+            'has_groups': bool(detail_page.total_groups),
+            'page': detail_page.page,
+            'num_pages': detail_page.num_pages,
+            'total_groups': detail_page.total_groups,
+            'page_size': self.DASHBOARD_DETAIL_PAGE_SIZE,
+            'client_filter_id': context.get(Constants.CURRENT_CLIENT_FILTER_ID_PARAMETER_NAME),
+            'download_incomplete_emails_handler_url': self.get_incomplete_emails_handler_url(),
+            # grades are only recalculated for activities with grade questions - see `recalculate_grades`
+            'recalculate_grades_handler_url': (
+                self.runtime.handler_url(self, 'recalculate_grades') if self.grading_plan else None
+            ),
+            'state_filters': [
+                (state, self._(StageState.get_human_name(state))) for state in GROUP_STATE_SORT_ORDER
+            ],
+            'filtered_out_workgroups': detail_page.filtered_out_workgroups,
             'stage_cell_width_percent': (100 - 30) / float(len(stages)),  # 30% is reserved for first column
-            'assigned_to_groups_label': self._(messages.ASSIGNED_TO_GROUPS_LABEL).format(group_count=len(groups_data))
+            'assigned_to_groups_label': self._(messages.ASSIGNED_TO_GROUPS_LABEL).format(
+                group_count=len(context.get(Constants.TARGET_WORKGROUPS))
+            )
         }
         fragment.add_content(self.render_template('dashboard_detail_view', render_context))
 
         return fragment
 
-    def _render_user(self, user, stage_stats, filtered_students):
+    def get_incomplete_emails_handler_url(self):
         """
-        :param group_project_v2.project_api.dtos.ReducedUserDetail user:
-        :param dict[str, StageCompletionDetailsData] stage_stats: Stage completion statistics
-        :param set[int] filtered_students:  users filtered out from view
-        :return: dict
+        :return: URL of a csv export of students that have not completed any of activity stages
+        :rtype: str
         """
+        base_url = self.runtime.handler_url(self.project, 'download_incomplete_list')
+        return base_url + '?' + urlencode({Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME: self.id})
 
-        return {
-            'id': user.id, 'full_name': user.full_name, 'email': user.email,
-            'is_filtered_out': user.id in filtered_students,
-            'stage_states': {
-                stage_id: stage_data.user_stats.get(user.id, StageState.UNKNOWN)
-                for stage_id, stage_data in stage_stats.items()
-            },
-            'groups_to_grade': {
-                stage_id: [
-                    {'id': group.id, 'ta_grade_link': self.get_ta_review_link(group.id, stage_id)}
-                    for group in stage_data.groups_to_grade.get(user.id, [])
-                ]
-                for stage_id, stage_data in stage_stats.items()
-            }
+    def render_dashboard_detail_rows(self, detail_page):
+        """
+        :param DashboardDetailPage detail_page: Page of groups
+        :return: HTML of group and user rows of dashboard detail view table
+        :rtype: str
+        """
+        render_context = {
+            'StageState': StageState,
+            'stages': [{"id": stage.id} for stage in self.detail_view_stages],
+            'groups': detail_page.groups,
         }
+        return self.render_template('dashboard_detail_rows', render_context)
 
-    def _render_workgroup(self, workgroup, stage_stats, filtered_students):
+    def get_dashboard_detail_page(  # pylint: disable=too-many-arguments,too-many-locals
+            self, context, page=1, page_size=None, sort_stage_id=None, sort_descending=False,
+            filter_stage_id=None, filter_state=None, search=None
+    ):
         """
-        :param group_project_v2.project_api.dtos.WorkgroupDetails workgroup:
-        :param dict[str, StageCompletionDetailsData] stage_stats: Stage completion statistics
-        :param set[int] filtered_students:  users filtered out from view
-        :return: dict
+        Builds a page of dashboard detail view groups. Groups are sorted and filtered first (which only requires
+        completion of sort/filter stage), and full stage statistics are then computed for groups on the page only.
+
+        :param dict context: Dashboard view context, with target workgroups, students and filtered students
+        :param int page: Page number, starting from 1 - clamped to available pages
+        :param int page_size: Number of groups on a page, `DASHBOARD_DETAIL_PAGE_SIZE` by default
+        :param str sort_stage_id: If set, groups are sorted by their internal state in this stage
+        :param bool sort_descending: Sort completed groups first
+        :param str filter_stage_id: If set (along with `filter_state`), only groups in given state in this stage
+            are returned
+        :param str filter_state: StageState to filter groups by
+        :param str search: If set, only groups with members whose email or full name contain it are returned
+        :rtype: DashboardDetailPage
         """
+        roster = context[Constants.TARGET_WORKGROUPS]
+        filtered_users = context[Constants.FILTERED_STUDENTS]
+        page_size = page_size or self.DASHBOARD_DETAIL_PAGE_SIZE
 
-        users = [
-            self._render_user(user, stage_stats, filtered_students)
-            for user in workgroup.users
+        workgroups = [
+            workgroup for workgroup in roster if any(user.id not in filtered_users for user in workgroup.users)
         ]
+        filtered_out_workgroups = len(roster) - len(workgroups)
 
-        users.sort(key=itemgetter('is_filtered_out'))
+        if search:
+            workgroups = search_workgroups(workgroups, search)
 
-        group_visible = any((not user['is_filtered_out'] for user in users))
+        if filter_stage_id and filter_state:
+            filter_stage = self.get_detail_view_stage(filter_stage_id)
+            group_states = get_internal_group_states(filter_stage, roster, workgroups)
+            workgroups = [workgroup for workgroup in workgroups if group_states[workgroup.id] == filter_state]
 
-        return {
-            'id': workgroup.id,
-            'ta_grade_link': self.get_ta_review_link(workgroup.id),
-            'group_visible': group_visible,
-            'stage_states': {
-                stage_id: {
-                    'internal_status': stage_data.internal_group_status.get(workgroup.id, StageState.UNKNOWN),
-                    'external_status': stage_data.external_group_status.get(workgroup.id, StageState.NOT_AVAILABLE),
-                    'external_status_label': stage_data.external_group_status_label.get(workgroup.id, ""),
-                }
-                for stage_id, stage_data in stage_stats.items()
-            },
-            'users': users
-        }
+        if sort_stage_id:
+            sort_stage = self.get_detail_view_stage(sort_stage_id)
+            sort_workgroups_by_state(
+                workgroups, get_internal_group_states(sort_stage, roster, workgroups), descending=sort_descending
+            )
 
-    def _build_groups_data(self, workgroups, stage_stats, filtered_users):
-        """
-        Converts WorkgroupDetails into dict expected by dashboard_detail_view template.
-
-        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Workgroups
-        :param dict[str, StageCompletionDetailsData] stage_stats: Stage statistics - group-wise and user-wise completion
-            data and groups_to_review.
-        :param set[int] filtered_users: users filtered out from view - depending on actual view
-            (dashboard or dashboard details) such students are either completely excluded, or included but diplayed
-            differently
-        :rtype: list[dict]
-        :returns:
-            List of dictionaries with the following format:
-                * id - Group ID
-                * stage_states - dictionary stage_id -> StateState
-                * users - dictionary with the following format:
-                    * id - User ID
-                    * full_name - User full name
-                    * email - user email
-                    * stage_states - dictionary stage_id -> StageState
-                    * groups_to_grade - dictionary stage_id -> list of groups to grade
-        """
-        return [
-            self._render_workgroup(workgroup, stage_stats, filtered_users)
-            for workgroup in workgroups
-        ]
+        num_pages = max(1, (len(workgroups) + page_size - 1) // page_size)
+        page = min(max(page, 1), num_pages)
+        page_roster = roster.subset(workgroups[(page - 1) * page_size:page * page_size])
 
-    @classmethod
-    def _get_stage_completion_details(cls, stage, target_workgroups, target_students):
-        """
-        Gets stage completion stats from individual stage
-        :param group_project_v2.stage.BaseGroupActivityStage stage: Get stage stats from this stage
-        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] target_workgroups:
-        :param collections.Iterable[group_project_v2.project_api.dtos.ReducedUserDetails] target_students:
-        :rtype: StageCompletionDetailsData
-        :returns: Stage completion stats
-        """
-        completed_users, partially_completed_users = stage.get_users_completion(target_workgroups, target_students)
-        user_stats = {}
-        groups_to_grade = {}
-        for user in target_students:
-            state = StageState.NOT_STARTED
-            if user.id in completed_users:
-                state = StageState.COMPLETED
-            elif user.id in partially_completed_users:
-                state = StageState.INCOMPLETE
-            user_stats[user.id] = state
-
-            if isinstance(stage, PeerReviewStage):
-                groups_to_grade[user.id] = stage.get_review_subjects(user.id)
-
-        external_group_status, external_group_status_label, internal_group_status = cls._get_group_statuses(
-            stage, target_workgroups, user_stats
-        )
+        completion_matrix = CompletionMatrix((user.id for user in page_roster.users), page_roster)
+        stage_stats = {
+            stage.id: get_stage_completion_details(stage, page_roster, page_roster.users, completion_matrix)
+            for stage in self.detail_view_stages
+        }
 
-        return StageCompletionDetailsData(
-            internal_group_status=internal_group_status,
-            external_group_status=external_group_status,
-            external_group_status_label=external_group_status_label,
-            user_stats=user_stats,
-            groups_to_grade=groups_to_grade
+        return DashboardDetailPage(
+            groups=build_groups_data(page_roster, stage_stats, filtered_users, self.get_ta_review_link),
+            page=page,
+            num_pages=num_pages,
+            total_groups=len(workgroups),
+            filtered_out_workgroups=filtered_out_workgroups,
         )
 
-    @classmethod
-    def _get_group_statuses(cls, stage, target_workgroups, user_stats):
-        internal_group_status, external_group_status, external_group_status_label = {}, {}, {}
-        for group in target_workgroups:
-            user_completions = [user_stats.get(user.id, StageState.UNKNOWN) for user in group.users]
-            student_review_state = StageState.NOT_STARTED
-            if all(completion == StageState.COMPLETED for completion in user_completions):
-                student_review_state = StageState.COMPLETED
-            elif any(completion != StageState.NOT_STARTED for completion in user_completions):
-                student_review_state = StageState.INCOMPLETE
-            elif any(completion == StageState.UNKNOWN for completion in user_completions):
-                student_review_state = StageState.UNKNOWN
-            internal_group_status[group.id] = student_review_state
-
-            external_status = stage.get_external_group_status(group)
-            external_group_status[group.id] = external_status
-            external_group_status_label[group.id] = stage.get_external_status_label(external_status)
-        return external_group_status, external_group_status_label, internal_group_status
-
     def mark_complete(self, user_id):
         self.runtime.publish(self, 'progress', {'user_id': user_id})
 
@@ -791,7 +876,12 @@ class GroupActivityXBlock(
     def calculate_and_send_grade(self, group_id):
         grade_value = self.calculate_grade(group_id)
         if grade_value is not None:
-            self.assign_grade_to_group(group_id, grade_value)
+            max_score = self.max_score()
+            if self.grade_cache.is_sent(group_id, grade_value, max_score):
+                log.debug("Grade of group %s in %s has not changed - not sending it again", group_id, self.content_id)
+            else:
+                self.assign_grade_to_group(group_id, grade_value)
+                self.grade_cache.mark_sent(group_id, grade_value, max_score)
 
             workgroup = self.project_api.get_workgroup_by_id(group_id)
             for user in workgroup.users:
@@ -811,6 +901,26 @@ class GroupActivityXBlock(
             grade_value,
             self.max_score()
         )
+        self._publish_final_grade_event(group_id, grade_value)
+        notifications_service = self.runtime.service(self, 'notifications')
+        grade_display_stage = self.get_grade_display_stage()
+        if notifications_service and grade_display_stage:
+            grade_display_stage.fire_grades_posted_notification(group_id, notifications_service)
+
+    def publish_group_grade(self, group_id, grade_value, workgroup):
+        """
+        Fires events for a recalculated group grade - same as `calculate_and_send_grade`, except that grades posted
+        notification is not sent again.
+
+        :param int group_id: Group ID
+        :param float grade_value: Assigned grade
+        :param group_project_v2.project_api.dtos.WorkgroupDetails workgroup: Workgroup
+        """
+        self._publish_final_grade_event(group_id, grade_value)
+        for user in workgroup.users:
+            self.mark_complete(user.id)
+
+    def _publish_final_grade_event(self, group_id, grade_value):
         # Emit analytics event...
         self.runtime.publish(
             self,
@@ -821,75 +931,41 @@ class GroupActivityXBlock(
                 "content_id": self.content_id,
             }
         )
-        notifications_service = self.runtime.service(self, 'notifications')
-        grade_display_stage = self.get_grade_display_stage()
-        if notifications_service and grade_display_stage:
-            grade_display_stage.fire_grades_posted_notification(group_id, notifications_service)
+
+    @XBlock.json_handler
+    @groupwork_protected_handler
+    @AuthXBlockMixin.check_dashboard_access_for_current_user
+    @conversion_protected_handler
+    def recalculate_grades(self, data, _suffix=''):
+        """
+        Recalculates and re-sends grades of the next batch of activity workgroups (i.e. after grade questions or
+        reviewer assignments changed). Progress is saved, so the handler is called repeatedly until it reports `done`;
+        pass `restart` to start over. Called by "Recalculate grades" button of dashboard detail view.
+        """
+        batch_size = int(data.get('batch_size', DEFAULT_GRADING_BATCH_SIZE))
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive, got {}".format(batch_size))
+
+        recalculation = ActivityGradeRecalculation(self)
+        progress = recalculation.run_batch(
+            self.project.project_roster.workgroup_ids, batch_size=batch_size, restart=bool(data.get('restart'))
+        )
+        progress['result'] = 'success'
+        return progress
 
     def calculate_grade(self, group_id):
-        # pylint:disable=too-many-locals,too-many-branches,consider-using-set-comprehension
-        review_item_data = self.project_api.get_workgroup_review_items_for_group(group_id, self.content_id)
-        review_item_map = {
-            make_key(review_item['question'], self.real_user_id(review_item['reviewer'])): review_item['answer']
-            for review_item in review_item_data
-        }
-        all_reviewer_ids = set([self.real_user_id(review_item['reviewer']) for review_item in review_item_data])
+        """
+        :param int group_id: Group ID
+        :return: Group grade, or None if there are not enough reviews to calculate it
+        :rtype: int|None
+        """
+        # shared with peer review stage, that updates it on review submission
+        review_items = request_cached(
+            ('workgroup_review_items', group_id, self.content_id),
+            lambda: self.project_api.get_workgroup_review_items_for_group(group_id, self.content_id)
+        )
         group_reviewer_ids = [
             user["id"] for user in self.project_api.get_workgroup_reviewers(group_id, self.content_id)
         ]
-        admin_reviewer_ids = [reviewer_id for reviewer_id in all_reviewer_ids if reviewer_id not in group_reviewer_ids]
-
-        def get_user_grade_value_list(user_id):
-            user_grades = []
-            for question in self.grade_questions:
-                user_value = review_item_map.get(make_key(question.question_id, user_id), None)
-                # pylint: disable=no-else-return
-                if user_value is None:
-                    # if any are incomplete, we consider the whole set to be unusable
-                    return None
-                else:
-                    user_grades.append(user_value)
-
-            return user_grades
-
-        admin_provided_grades = None
-        if admin_reviewer_ids:
-            admin_provided_grades = []
-            # Only include complete admin gradesets
-            admin_reviewer_grades = [
-                arg
-                for arg in [get_user_grade_value_list(admin_id) for admin_id in admin_reviewer_ids]
-                if arg
-            ]
-            admin_grader_count = len(admin_reviewer_grades)
-            if admin_grader_count > 1:
-                for idx in range(len(self.grade_questions)):
-                    admin_provided_grades.append(mean([adm[idx] for adm in admin_reviewer_grades]))
-            elif admin_grader_count > 0:  # which actually means admin_grader_count == 1
-                admin_provided_grades = admin_reviewer_grades[0]
-
-        user_grades = {}
-        if group_reviewer_ids:
-            for reviewer_id in group_reviewer_ids:
-                this_reviewers_grades = get_user_grade_value_list(reviewer_id)
-                if this_reviewers_grades is None:
-                    if admin_provided_grades:
-                        this_reviewers_grades = admin_provided_grades
-                    else:
-                        return None
-                user_grades[reviewer_id] = this_reviewers_grades
-        elif admin_provided_grades:
-            group_reviewer_ids = [self.user_id]
-            user_grades[self.user_id] = admin_provided_grades
-        else:
-            return None
-
-        # Okay, if we've got here we have a complete set of marks to calculate the grade
-        reviewer_grades = [
-            mean(user_grades[reviewer_id])
-            for reviewer_id in group_reviewer_ids
-            if len(user_grades[reviewer_id]) > 0
-        ]
-        group_grade = round_half_up(mean(reviewer_grades)) if reviewer_grades else None
-
-        return group_grade
+        calculator = GradeCalculator(self.grading_plan)
+        return calculator.calculate(calculator.build_answer_matrix(review_items, self.real_user_id), group_reviewer_ids)
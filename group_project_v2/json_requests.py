@@ -1,7 +1,13 @@
 """ GET, POST, DELETE, PUT requests for json client """
+import io
 import json
 import logging
-from urllib.request import HTTPHandler, Request, build_opener, urlopen
+import threading
+import time
+from collections import defaultdict
+from http.client import HTTPConnection, HTTPException, HTTPSConnection, RemoteDisconnected
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
 
 from django.conf import settings
 
@@ -22,6 +28,213 @@ if settings and hasattr(settings, "EDX_API_KEY"):
 
 TIMEOUT = 20
 
+# Max number of simultaneously open connections to a single host (scheme, host and port)
+POOL_MAX_CONNECTIONS_PER_HOST = 10
+# Idle connections older than this (in seconds) are closed instead of being reused
+POOL_IDLE_TIMEOUT = 30
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# Requests that can be safely sent again if reused connection turns out to be closed by server
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+# Errors signalling that server closed idle keep-alive connection before it received the request - timeouts and
+# other errors are not among them, as server might be processing the request already
+STALE_CONNECTION_ERRORS = (RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+MAX_REDIRECTS = 10
+
+
+class PooledResponse(object):
+    """
+    Fully read response to a request sent through :class:`ConnectionPool`.
+
+    Mimics the parts of `http.client.HTTPResponse` interface used by API clients: body is read eagerly so that
+    the underlying connection can be returned to the pool right away.
+    """
+    def __init__(self, url, code, reason, headers, body):
+        self.url = url
+        self.code = code
+        self.status = code
+        self.reason = reason
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def read(self, amt=None):
+        return self._body.read(amt)
+
+    def getcode(self):
+        return self.code
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections.
+
+    Connections are grouped by (scheme, host, port); at most `max_connections_per_host` connections to the same
+    host are in use at any given time - other threads wait for a connection to be released. Idle connections are
+    reused in LIFO order, and the ones that have been idle for more than `idle_timeout` seconds are closed.
+
+    Server might close idle connection right when it is reused, so request sent over reused connection is retried
+    once with a fresh connection - unless it is not idempotent, as such requests always open a fresh connection.
+    """
+    CONNECTION_CLASSES = {
+        'http': HTTPConnection,
+        'https': HTTPSConnection,
+    }
+
+    def __init__(self, max_connections_per_host=POOL_MAX_CONNECTIONS_PER_HOST, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.max_connections_per_host = max_connections_per_host
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle_connections = defaultdict(list)
+        self._host_slots = {}
+
+    @staticmethod
+    def _get_pool_key(url_parts):
+        scheme = url_parts.scheme.lower()
+        port = url_parts.port or (443 if scheme == 'https' else 80)
+        return scheme, url_parts.hostname, port
+
+    def _get_host_slots(self, key):
+        with self._lock:
+            if key not in self._host_slots:
+                self._host_slots[key] = threading.BoundedSemaphore(self.max_connections_per_host)
+            return self._host_slots[key]
+
+    def _pop_idle_connection(self, key):
+        """
+        Returns most recently used idle connection to the host, closing expired ones along the way
+        """
+        expired = []
+        connection = None
+        with self._lock:
+            idle_connections = self._idle_connections[key]
+            expire_before = time.monotonic() - self.idle_timeout
+            # idle connections list is ordered by last use time, so all expired connections are at the beginning
+            while idle_connections and idle_connections[0][1] <= expire_before:
+                expired.append(idle_connections.pop(0)[0])
+            if idle_connections:
+                connection = idle_connections.pop()[0]
+
+        for expired_connection in expired:
+            expired_connection.close()
+
+        return connection
+
+    def _new_connection(self, key, timeout):
+        scheme, host, port = key
+        try:
+            connection_class = self.CONNECTION_CLASSES[scheme]
+        except KeyError:
+            raise URLError("unknown url type: {}".format(scheme))  # pylint: disable=raise-missing-from
+        return connection_class(host, port, timeout=timeout)
+
+    def _release_connection(self, key, connection, reusable):
+        if reusable:
+            with self._lock:
+                idle_connections = self._idle_connections[key]
+                if len(idle_connections) < self.max_connections_per_host:
+                    idle_connections.append((connection, time.monotonic()))
+                    return
+        connection.close()
+
+    def clear(self):
+        """
+        Closes all idle connections
+        """
+        with self._lock:
+            idle_connections = [
+                connection for connections in self._idle_connections.values() for connection, _ in connections
+            ]
+            self._idle_connections.clear()
+
+        for connection in idle_connections:
+            connection.close()
+
+    def _send(self, connection, method, path, body, headers):
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def _do_request(self, key, method, path, body, headers, timeout):
+        host_slots = self._get_host_slots(key)
+        if not host_slots.acquire(timeout=timeout):
+            raise URLError("timed out waiting for a connection to {}:{}".format(key[1], key[2]))
+
+        try:
+            connection = self._pop_idle_connection(key) if method in IDEMPOTENT_METHODS else None
+            if connection is not None:
+                try:
+                    response, data = self._send(connection, method, path, body, headers)
+                    self._release_connection(key, connection, not response.will_close)
+                    return response, data
+                except STALE_CONNECTION_ERRORS as exc:
+                    log.debug("Pooled connection to %s:%s was closed (%s) - reconnecting", key[1], key[2], exc)
+                    connection.close()
+                except (HTTPException, OSError) as exc:
+                    connection.close()
+                    raise URLError(exc)  # pylint: disable=raise-missing-from
+
+            connection = self._new_connection(key, timeout)
+            try:
+                response, data = self._send(connection, method, path, body, headers)
+            except (HTTPException, OSError) as exc:
+                connection.close()
+                raise URLError(exc)  # pylint: disable=raise-missing-from
+            self._release_connection(key, connection, not response.will_close)
+            return response, data
+        finally:
+            host_slots.release()
+
+    def request(self, method, url, body=None, headers=None, timeout=TIMEOUT):
+        """
+        Sends request and reads response. Follows redirects the same way `urllib.request.urlopen` does.
+
+        :param str method: HTTP method
+        :param str url: Absolute URL
+        :param bytes body: Request body
+        :param dict headers: Request headers
+        :param float timeout: Socket timeout, also used as max time to wait for a free connection
+        :rtype: PooledResponse
+        :raises HTTPError: if server responds with an error status
+        :raises URLError: if request could not be sent
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            url_parts = urlsplit(url)
+            path = url_parts.path or '/'
+            if url_parts.query:
+                path += '?' + url_parts.query
+
+            response, data = self._do_request(self._get_pool_key(url_parts), method, path, body, headers, timeout)
+
+            location = response.getheader('Location')
+            if response.status in REDIRECT_CODES and location and self._can_redirect(method, response.status):
+                url = urljoin(url, location)
+                if response.status not in (307, 308):
+                    method, body = 'GET', None
+                continue
+
+            if response.status >= 300:
+                raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(data))
+
+            return PooledResponse(url, response.status, response.reason, response.headers, data)
+
+        raise HTTPError(url, response.status, "Too many redirects", response.headers, io.BytesIO(data))
+
+    @staticmethod
+    def _can_redirect(method, status):
+        # same rules as in urllib.request.HTTPRedirectHandler
+        if method in ('GET', 'HEAD'):
+            return True
+        return method == 'POST' and status in (301, 302, 303)
+
+
+connection_pool = ConnectionPool()
+
 
 def trace_request_information(func):
     """
@@ -52,30 +265,22 @@ def json_headers():
 @trace_request_information
 def GET(url_path):
     """ GET request wrapper to json web server """
-    url_request = Request(url=url_path, headers=json_headers())
-    return urlopen(url=url_request, timeout=TIMEOUT)
+    return connection_pool.request('GET', url_path, headers=json_headers())
 
 
 @trace_request_information
 def POST(url_path, data):
     """ POST request wrapper to json web server """
-    url_request = Request(url=url_path, headers=json_headers())
-    return urlopen(url_request, json.dumps(data).encode('utf-8'), TIMEOUT)
+    return connection_pool.request('POST', url_path, body=json.dumps(data).encode('utf-8'), headers=json_headers())
 
 
 @trace_request_information
 def DELETE(url_path):
     """ DELETE request wrapper to json web server """
-    opener = build_opener(HTTPHandler)
-    request = Request(url=url_path, headers=json_headers())
-    request.get_method = lambda: 'DELETE'
-    return opener.open(request, None, TIMEOUT)
+    return connection_pool.request('DELETE', url_path, headers=json_headers())
 
 
 @trace_request_information
 def PUT(url_path, data):
     """ PUT request wrapper to json web server """
-    opener = build_opener(HTTPHandler)
-    request = Request(url=url_path, headers=json_headers(), data=json.dumps(data).encode('utf-8'))
-    request.get_method = lambda: 'PUT'
-    return opener.open(request, None, TIMEOUT)
+    return connection_pool.request('PUT', url_path, body=json.dumps(data).encode('utf-8'), headers=json_headers())
@@ -59,3 +59,7 @@ SUCCESSFUL_UPLOAD_MESSAGE_TPL = _(
     u"deliverable by clicking the <span class='icon {icon}'></span> icon at any time before the deadline."
 )
 FAILED_UPLOAD_MESSAGE_TPL = _(u"Error uploading file: {error_goes_here}.")
+DIRECT_UPLOADS_DISABLED = _(u"Direct uploads are not enabled.")
+INVALID_DIRECT_UPLOAD = _(u"Uploaded file does not belong to your group.")
+DIRECT_UPLOAD_NOT_FOUND = _(u"Uploaded file was not found - please upload it again.")
+INVALID_DIRECT_UPLOAD_REQUEST = _(u"Upload request is invalid - please upload the file again.")
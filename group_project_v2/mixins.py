@@ -19,6 +19,8 @@ from group_project_v2 import messages
 from group_project_v2.api_error import ApiError
 from group_project_v2.project_api import ProjectAPIXBlockMixin
 from group_project_v2.project_api.dtos import WorkgroupDetails
+from group_project_v2.request_context import request_cached, request_scope
+from group_project_v2.roster import ProjectRoster
 from group_project_v2.utils import (
     MUST_BE_OVERRIDDEN,
     NO_EDITABLE_SETTINGS,
@@ -98,7 +100,21 @@ class CourseAwareXBlockMixin(object):
         return str(raw_course_id)
 
 
-class UserAwareXBlockMixin(ProjectAPIXBlockMixin):
+class RequestScopedXBlockMixin(object):
+    """
+    Runs views and handlers in request scope, so that request-scoped data (see `group_project_v2.request_context`)
+    is shared by the block and all its children rendered in the same request.
+    """
+    def render(self, view, context=None):
+        with request_scope():
+            return super(RequestScopedXBlockMixin, self).render(view, context)
+
+    def handle(self, handler_name, request, suffix=''):
+        with request_scope():
+            return super(RequestScopedXBlockMixin, self).handle(handler_name, request, suffix)
+
+
+class UserAwareXBlockMixin(RequestScopedXBlockMixin, ProjectAPIXBlockMixin):
     TA_REVIEW_KEY = "TA_REVIEW_WORKGROUP"
 
     @lazy
@@ -120,13 +136,16 @@ class UserAwareXBlockMixin(ProjectAPIXBlockMixin):
                 log.exception(exc)
             try:
                 return int(self.runtime.user_id)
-            except Exception as exc:
-                log.exception(exc)
+            except Exception as runtime_exc:
+                log.exception(runtime_exc)
                 return None
 
     @lazy
     def user_preferences(self):
-        return self.project_api.get_user_preferences(self.user_id)
+        user_id = self.user_id
+        return request_cached(
+            ('user_preferences', user_id), lambda: self.project_api.get_user_preferences(user_id)
+        )
 
     @property
     def is_admin_grader(self):
@@ -155,7 +174,10 @@ class SettingsMixin(object):
         return result
 
 
-class AuthXBlockMixin(SettingsMixin, ProjectAPIXBlockMixin, CourseAwareXBlockMixin, XBlockWithTranslationServiceMixin):
+class AuthXBlockMixin(
+        RequestScopedXBlockMixin, SettingsMixin, ProjectAPIXBlockMixin, CourseAwareXBlockMixin,
+        XBlockWithTranslationServiceMixin,
+):
 
     DEFAULT_TA_ROLE = ("assistant", )
 
@@ -254,7 +276,9 @@ class AuthXBlockMixin(SettingsMixin, ProjectAPIXBlockMixin, CourseAwareXBlockMix
         :rtype: bool
         """
 
-        granted_roles = self.project_api.get_user_roles_for_course(user_id, course_id)
+        granted_roles = request_cached(
+            ('user_roles', user_id, course_id), lambda: self.project_api.get_user_roles_for_course(user_id, course_id)
+        )
         allowed_roles = set(self.ta_roles)
         return bool(allowed_roles & granted_roles)
 
@@ -313,6 +337,46 @@ class AuthXBlockMixin(SettingsMixin, ProjectAPIXBlockMixin, CourseAwareXBlockMix
             if allowed_org_ids is not None:
                 self.allowed_org_ids = set(allowed_org_ids)
 
+        @property
+        def accessible_org_ids(self):
+            """
+            :return: Ids of organizations this user can see, respecting both allowed and filtered organizations.
+                     None means "all organizations".
+            :rtype: set[int]|None
+            """
+            if self.allowed_org_ids is None:
+                return self.filter_org_ids
+            if self.filter_org_ids is None:
+                return self.allowed_org_ids
+            return self.allowed_org_ids & self.filter_org_ids
+
+        @lazy
+        def members_by_organization(self):
+            """
+            Inverted index of accessible organizations membership - built once, with one API call per organization.
+
+            :rtype: dict[int, set[int]]
+            """
+            org_ids = sorted(self.accessible_org_ids or ())
+            organizations = self.project_api.get_organizations_by_ids(org_ids)
+            return {org_id: organization.user_ids for org_id, organization in zip(org_ids, organizations)}
+
+        def get_inaccessible_users(self, user_ids):
+            """
+            Bulk version of ``can_access_other_user`` - uses organizations membership index instead of fetching
+            organizations of each user. When neither allowed nor filtered organizations restrict this user, nothing
+            is filtered - without fetching organizations of any user.
+
+            :param collections.Iterable[int] user_ids:
+            :return: Ids of users from ``user_ids`` this user can't access
+            :rtype: set[int]
+            """
+            if self.accessible_org_ids is None:
+                return set()
+
+            accessible_user_ids = set().union(*self.members_by_organization.values())
+            return set(user_ids) - accessible_user_ids
+
         def can_access_other_user(self, user_id):
             """
             :param user_id:
@@ -342,7 +406,10 @@ class AuthXBlockMixin(SettingsMixin, ProjectAPIXBlockMixin, CourseAwareXBlockMix
         :return: A set containing a name of each group user belongs to.
         :rtype: set[str]
         """
-        return set(group.name for group in self.project_api.get_user_permissions(user_id))
+        permissions = request_cached(
+            ('user_permissions', user_id), lambda: self.project_api.get_user_permissions(user_id)
+        )
+        return set(group.name for group in permissions)
 
     def _can_user_access_all_orgs(self, user_id):
         """
@@ -387,6 +454,9 @@ class WorkgroupAwareXBlockMixin(AuthXBlockMixin, UserAwareXBlockMixin, CourseAwa
         """
         :rtype: WorkgroupDetails
         """
+        return request_cached(('workgroup', self.user_id, self.course_id), self._get_workgroup)
+
+    def _get_workgroup(self):
         try:
             user_prefs = self.user_preferences
             if UserAwareXBlockMixin.TA_REVIEW_KEY in user_prefs:
@@ -492,11 +562,10 @@ class DashboardRootXBlockMixin(AuthXBlockMixin, UserAwareXBlockMixin):
         :param dict context: XBlock view context
         :rtype: None
         """
-        workgroups, students = self.get_workgroups_and_students()
+        roster, students = self.get_workgroups_and_students()
 
-        context[Constants.TARGET_STUDENTS] = list(students)
-        context[Constants.TARGET_WORKGROUPS] = list(workgroups)
-        context[Constants.FILTERED_STUDENTS] = set()
+        context[Constants.TARGET_STUDENTS] = students
+        context[Constants.TARGET_WORKGROUPS] = roster
 
         # If not None students not belonging to organization represented by given id will be filtered out
         filter_by_organization_id = context.get(Constants.CURRENT_CLIENT_FILTER_ID_PARAMETER_NAME, None)
@@ -508,17 +577,24 @@ class DashboardRootXBlockMixin(AuthXBlockMixin, UserAwareXBlockMixin):
 
         org_filter = self.get_organization_filter_for_user(self.user_id, filter_by_organization_id)
 
-        filtered_students = set()
+        context[Constants.FILTERED_STUDENTS] = org_filter.get_inaccessible_users(roster.user_ids)
 
-        for workgroup in workgroups:
-            for user in workgroup.users:
-                if not org_filter.can_access_other_user(user.id):
-                    filtered_students.add(user.id)
+    def get_workgroups_and_students(self):
+        """
+        :return: Project roster (iterable of workgroups) and all students in project workgroups
+        :rtype: (group_project_v2.roster.ProjectRoster, tuple[group_project_v2.project_api.dtos.ReducedUserDetails])
+        """
+        roster = self.project_roster
+        return roster, roster.users
 
-        context[Constants.FILTERED_STUDENTS] = filtered_students
+    @property
+    def project_roster(self):
+        """
+        Project workgroups and their members - fetched once per request.
 
-    def get_workgroups_and_students(self):
-        return list(self.workgroups), list(self.all_users_in_workgroups)
+        :rtype: group_project_v2.roster.ProjectRoster
+        """
+        return request_cached(('project_roster', self.content_id), lambda: ProjectRoster(self.workgroups))
 
     @property
     def project_details(self):
@@ -533,17 +609,14 @@ class DashboardRootXBlockMixin(AuthXBlockMixin, UserAwareXBlockMixin):
         """
         :rtype: collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails]
         """
-        return (
-            self.project_api.get_workgroup_by_id(workgroup_id)
-            for workgroup_id in self.project_details.workgroups
-        )
+        return self.project_api.get_workgroups_by_ids(self.project_details.workgroups)
 
     @property
     def all_users_in_workgroups(self):
         """
         :rtype: collections.Iterable[group_project_v2.project_api.dtos.ReducedUserDetails]
         """
-        return itertools.chain.from_iterable(workgroup.users for workgroup in self.workgroups)
+        return self.project_roster.users
 
 
 class TemplateManagerMixin(I18NService):
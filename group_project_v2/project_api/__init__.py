@@ -2,6 +2,7 @@
 from django.conf import settings
 
 from group_project_v2.project_api.api_implementation import TypedProjectAPI
+from group_project_v2.request_context import invalidate_request_cached, request_cached
 
 # Looks like it's an issue, but technically it's not; this code runs in LMS, so 127.0.0.1 is always correct
 # location for API server, as it's basically executed in a neighbour thread/process/whatever.
@@ -22,3 +23,25 @@ class ProjectAPIXBlockMixin(object):
             ProjectAPIXBlockMixin._project_api = TypedProjectAPI(API_SERVER, author_mode)
 
         return ProjectAPIXBlockMixin._project_api
+
+    def get_latest_workgroup_submissions(self, group_id):
+        """
+        Snapshot of latest workgroup submissions (see `TypedProjectAPI.get_latest_workgroup_submissions_by_id`),
+        fetched once per request and shared by all submission blocks, stages and review views.
+
+        :param int group_id: Group ID
+        :rtype: dict[dict]
+        """
+        return request_cached(
+            ('latest_workgroup_submissions', group_id),
+            lambda: self.project_api.get_latest_workgroup_submissions_by_id(group_id)
+        )
+
+    @staticmethod
+    def invalidate_latest_workgroup_submissions(group_id):
+        """
+        Drops the request snapshot of workgroup submissions - must be called after workgroup uploads a submission.
+
+        :param int group_id: Group ID
+        """
+        invalidate_request_cached(('latest_workgroup_submissions', group_id))
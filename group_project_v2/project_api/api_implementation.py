@@ -1,9 +1,14 @@
+import copy
+import functools
 import itertools
 import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 
 from group_project_v2.api_error import api_error_protect
-from group_project_v2.json_requests import DELETE, GET, POST, PUT
+from group_project_v2.json_requests import DELETE, GET, POOL_MAX_CONNECTIONS_PER_HOST, POST, PUT
+from group_project_v2.project_api.cache import memoize_api_call
 from group_project_v2.project_api.dtos import (
     CompletionDetails,
     OrganisationDetails,
@@ -12,7 +17,9 @@ from group_project_v2.project_api.dtos import (
     UserGroupDetails,
     WorkgroupDetails,
 )
-from group_project_v2.utils import build_date_field, is_absolute, memoize_with_expiration
+from group_project_v2.request_context import invalidate_request_cached, request_cached
+from group_project_v2.roster import ReviewAssignmentGraph, ReviewItemIndex
+from group_project_v2.utils import build_date_field, is_absolute
 
 API_PREFIX = '/'.join(['api', 'server'])
 WORKGROUP_API = '/'.join([API_PREFIX, 'workgroups'])
@@ -25,6 +32,9 @@ COURSES_API = '/'.join([API_PREFIX, 'courses'])
 PROJECTS_API = '/'.join([API_PREFIX, 'projects'])
 ORGANIZATIONS_API = '/'.join([API_PREFIX, 'organizations'])
 
+# Max number of requests batch methods send concurrently - no point in going above connection pool limit
+MAX_CONCURRENT_REQUESTS = POOL_MAX_CONNECTIONS_PER_HOST
+
 
 # TODO: this class crosses service boundary, but some methods post-process responses, while other do not
 # There're two things to improve:
@@ -40,6 +50,13 @@ class ProjectAPI(object):
         self._api_server_address = address
         self.dry_run = dry_run
 
+    @property
+    def cache_namespace(self):
+        """
+        Identifies API server in cache keys - dry run responses are never shared with real ones
+        """
+        return "{}|{}".format(self._api_server_address, 'dry_run' if self.dry_run else 'live')
+
     def build_url(self, url_parts, query_params=None, no_trailing_slash=False):
         url = "/".join([str(url_part) for url_part in url_parts])
         if not is_absolute(url):
@@ -71,16 +88,18 @@ class ProjectAPI(object):
         url = self.build_url(url_parts, query_params, no_trailing_slash)
         return self._do_send_request(method, url, data)
 
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_user_organizations(self, user_id):
         qs_params = {'page_size': 0}
         return self.send_request(GET, (USERS_API, user_id, 'organizations'), query_params=qs_params)
 
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_user_preferences(self, user_id):
         """ gets users preferences information """
         return self.send_request(GET, (USERS_API, user_id, 'preferences'), no_trailing_slash=True)
 
+    # Cached - invalidated in submit_peer_review_items
+    @memoize_api_call()
     def get_peer_review_items_for_group(self, group_id, content_id):
         qs_params = {"content_id": content_id}
         return self.send_request(GET, (WORKGROUP_API, group_id, 'peer_reviews'), query_params=qs_params)
@@ -94,9 +113,10 @@ class ProjectAPI(object):
     def delete_peer_review_assessment(self, assessment_id):
         self.send_request(DELETE, (PEER_REVIEW_API, assessment_id))
 
-    # Do not cache - used both in submitting review and calculating grade, so if this call is cached grade calculation
-    # sees old value. So, when last review is performed, grade calculation does not see it and returns "No grade yet".
-    # See MCKIN-3501 and MCKIN-3471 for what would happen than.
+    # Used both in submitting review and calculating grade - cached value is invalidated in
+    # submit_workgroup_review_items, so that grade calculation sees review that has just been submitted.
+    # See MCKIN-3501 and MCKIN-3471 for what would happen otherwise.
+    @memoize_api_call()
     def get_workgroup_review_items_for_group(self, group_id, content_id):
         qs_params = {"content_id": content_id}
         return self.send_request(GET, (WORKGROUP_API, group_id, 'workgroup_reviews'), query_params=qs_params)
@@ -124,13 +144,18 @@ class ProjectAPI(object):
         return self.send_request(POST, (WORKGROUP_API, group_id, 'grades'), data=grade_data)
 
     def create_submission(self, submit_hash):
-        return self.send_request(POST, (SUBMISSION_API, ), data=submit_hash)
-
-    # Do not cache - Upload submission handler updates a list of submissions, than queries which submissions are there
+        try:
+            return self.send_request(POST, (SUBMISSION_API, ), data=submit_hash)
+        finally:
+            self.get_workgroup_submissions.invalidate(self, submit_hash['workgroup'])
+
+    # Upload submission handler updates a list of submissions, than queries which submissions are there - cached value
+    # is invalidated in create_submission
+    @memoize_api_call()
     def get_workgroup_submissions(self, group_id):
         return self.send_request(GET, (WORKGROUP_API, group_id, 'submissions'))
 
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_review_assignment_groups(self, user_id, course_id, xblock_id):
         qs_params = {
             "course": course_id,
@@ -159,64 +184,117 @@ class ProjectAPI(object):
 
         return reviewers
 
-    # TODO: these two methods are a different filters on top of the same method - might make sense to combine them
+    # Built once per request - invalidated in submit_peer_review_items
+    def get_peer_review_item_index(self, group_id, content_id):
+        """
+        :rtype: group_project_v2.roster.ReviewItemIndex
+        """
+        return request_cached(
+            ('peer_review_item_index', group_id, content_id),
+            lambda: ReviewItemIndex(self.get_peer_review_items_for_group(group_id, content_id), 'user')
+        )
+
+    # Built once per request - invalidated in submit_workgroup_review_items
+    def get_workgroup_review_item_index(self, group_id, content_id):
+        """
+        :rtype: group_project_v2.roster.ReviewItemIndex
+        """
+        return request_cached(
+            ('workgroup_review_item_index', group_id, content_id),
+            lambda: ReviewItemIndex(self.get_workgroup_review_items_for_group(group_id, content_id), 'workgroup')
+        )
+
     def get_peer_review_items(self, reviewer_id, peer_id, group_id, content_id):
-        teammate_evaluation_items = self.get_peer_review_items_for_group(group_id, content_id)
-        return [
-            pri for pri in teammate_evaluation_items
-            if pri['reviewer'] == reviewer_id and (pri['user'] == peer_id or pri['user'] == int(peer_id))
-        ]
+        index = self.get_peer_review_item_index(group_id, content_id)
+        return list(index.get_items(reviewer_id=reviewer_id, subject_id=peer_id))
 
     def get_user_peer_review_items(self, user_id, group_id, content_id):
-        teammate_evaluation_items = self.get_peer_review_items_for_group(group_id, content_id)
-        return [
-            pri for pri in teammate_evaluation_items
-            if pri['user'] == user_id or pri['user'] == int(user_id)
-        ]
+        index = self.get_peer_review_item_index(group_id, content_id)
+        return list(index.get_items(subject_id=user_id))
 
     def get_workgroup_review_items(self, reviewer_id, group_id, content_id):
-        peer_review_items = self.get_workgroup_review_items_for_group(group_id, content_id)
-        return [
-            gri for gri in peer_review_items
-            if gri['reviewer'] == reviewer_id and gri['content_id'] == content_id
-        ]
+        index = self.get_workgroup_review_item_index(group_id, content_id)
+        return [item for item in index.get_items(reviewer_id=reviewer_id) if item['content_id'] == content_id]
 
-    def submit_peer_review_items(self, reviewer_id, peer_id, group_id, content_id, data):
-        # get any data already there
-        current_data = {pi['question']: pi for pi in
-                        self.get_peer_review_items(reviewer_id, peer_id, group_id, content_id)}
-        for question_id, answer in data.items():
-            if question_id in current_data:
-                question_data = current_data[question_id]
 
-                if question_data['answer'] != answer:
-                    if answer:
-                        # update with relevant data
-                        del question_data['created']
-                        del question_data['modified']
-                        question_data['answer'] = answer
+class TypedProjectAPI(ProjectAPI):
+    """
+    This class is intended to contain methods that return typed responses.
+    Some of the methods may return non-reentrant iterables (i.e. generators) - clients are responsible to
+    convert them to reentrant collection if need more than one pass over the response
+    """
+    def _consume_paged_response(self, method, entry_url, data=None):
+        next_page_url = entry_url
 
-                        self.update_peer_review_assessment(question_data)
-                    else:
-                        self.delete_peer_review_assessment(question_data['id'])
+        while next_page_url:
+            response = self._do_send_request(method, next_page_url, data)
+            for item in response['results']:
+                yield item
 
-            elif answer:
-                question_data = {
-                    "question": question_id,
-                    "answer": answer,
-                    "workgroup": group_id,
-                    "user": peer_id,
-                    "reviewer": reviewer_id,
-                    "content_id": content_id,
-                }
-                self.create_peer_review_assessment(question_data)
+            next_page_url = response.get('next')
 
-    def submit_workgroup_review_items(self, reviewer_id, group_id, content_id, data):
-        # get any data already there
-        current_data = {ri['question']: ri for ri in self.get_workgroup_review_items(reviewer_id, group_id, content_id)}
+    @staticmethod
+    def _fan_out(method, item_ids):
+        """
+        Calls `method` for each of `item_ids` concurrently, using a bounded thread pool.
+        Each distinct id is requested only once; results are returned in the order of `item_ids`.
+
+        :param callable method: Single-argument API method, e.g. `get_workgroup_by_id`
+        :param collections.Iterable item_ids: Ids to fetch
+        :rtype: list
+        """
+        item_ids = list(item_ids)
+        unique_ids = list(OrderedDict.fromkeys(item_ids))
+
+        if len(unique_ids) <= 1:
+            results = [method(item_id) for item_id in unique_ids]
+        else:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(unique_ids))) as executor:
+                results = list(executor.map(method, unique_ids))
+
+        results_by_id = dict(zip(unique_ids, results))
+        return [results_by_id[item_id] for item_id in item_ids]
+
+    @staticmethod
+    def _run_concurrently(calls):
+        """
+        Runs parameterless `calls` concurrently, using a bounded thread pool. All calls are run to completion even if
+        some of them fail - then the first failure (in order of `calls`) is raised.
+
+        :param list[callable] calls: Calls to run
+        :return: Results of calls, in order of `calls`
+        :rtype: list
+        """
+        if len(calls) <= 1:
+            return [call() for call in calls]
+
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(calls))) as executor:
+            futures = [executor.submit(call) for call in calls]
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+        return [future.result() for future in futures]
+
+    def _apply_review_changes(self, current_items, data, new_item_data, create, update, delete):
+        """
+        Diffs submitted review answers against reviewer's current review items, and applies resulting creates,
+        updates and deletes concurrently.
+
+        :param collections.Iterable[dict] current_items: Reviewer's current review items of the review subject
+        :param dict data: Question ID to answer mapping - empty answer removes existing review item
+        :param dict new_item_data: Fields of created review items, apart from question and answer
+        :param callable create: Creates review item
+        :param callable update: Updates review item
+        :param callable delete: Deletes review item by ID
+        :return: Reviewer's review items of the review subject after the changes, or None if they can't be derived
+            from API responses (i.e. in dry run mode)
+        :rtype: list[dict]|None
+        """
+        items_by_question = OrderedDict((item['question'], item) for item in current_items)
+        changes = []
         for question_id, answer in data.items():
-            if question_id in current_data:
-                question_data = current_data[question_id]
+            if question_id in items_by_question:
+                question_data = dict(items_by_question[question_id])
 
                 if question_data['answer'] != answer:
                     if answer:
@@ -224,39 +302,92 @@ class ProjectAPI(object):
                         del question_data['created']
                         del question_data['modified']
                         question_data['answer'] = answer
-
-                        self.update_workgroup_review_assessment(question_data)
+                        changes.append((question_id, functools.partial(update, question_data)))
                     else:
-                        self.delete_workgroup_review_assessment(question_data['id'])
+                        changes.append((question_id, functools.partial(delete, question_data['id'])))
 
             elif answer:
-                question_data = {
-                    "question": question_id,
-                    "answer": answer,
-                    "workgroup": group_id,
-                    "reviewer": reviewer_id,
-                    "content_id": content_id,
-                }
-                self.create_workgroup_review_assessment(question_data)
+                question_data = dict(new_item_data, question=question_id, answer=answer)
+                changes.append((question_id, functools.partial(create, question_data)))
 
+        results = self._run_concurrently([change for _question_id, change in changes])
 
-class TypedProjectAPI(ProjectAPI):
-    """
-    This class is intended to contain methods that return typed responses.
-    Some of the methods may return non-reentrant iterables (i.e. generators) - clients are responsible to
-    convert them to reentrant collection if need more than one pass over the response
-    """
-    def _consume_paged_response(self, method, entry_url, data=None):
-        next_page_url = entry_url
+        for (question_id, change), result in zip(changes, results):
+            if change.func is delete:
+                del items_by_question[question_id]
+            elif isinstance(result, dict) and 'id' in result:
+                items_by_question[question_id] = result
+            else:
+                return None
+        return list(items_by_question.values())
 
-        while next_page_url:
-            response = self._do_send_request(method, next_page_url, data)
-            for item in response['results']:
-                yield item
+    @staticmethod
+    def _replace_review_items(group_items, old_items, new_items):
+        """
+        Derives group review items after submission by splicing write responses over the items fetched right before
+        the writes - group items are not fetched again, so reviews other reviewers submitted meanwhile are picked up on
+        the next fetch, once cached items are invalidated.
+
+        :param list[dict] group_items: Group review items fetched before the changes
+        :param list[dict] old_items: Reviewer's items in `group_items` replaced by the changes
+        :param list[dict]|None new_items: Reviewer's review items after the changes - see `_apply_review_changes`
+        :rtype: list[dict]|None
+        """
+        if new_items is None:
+            return None
+        old_item_ids = set(id(item) for item in old_items)
+        return [item for item in group_items if id(item) not in old_item_ids] + new_items
 
-            next_page_url = response.get('next')
+    def submit_peer_review_items(self, reviewer_id, peer_id, group_id, content_id, data):
+        """
+        :return: Peer review items of the group after submission, or None if they have to be fetched again
+        :rtype: list[dict]|None
+        """
+        new_item_data = {
+            "workgroup": group_id, "user": peer_id, "reviewer": reviewer_id, "content_id": content_id,
+        }
+        try:
+            # cached review items might be stale, if review was submitted in other process
+            group_items = self.get_peer_review_items_for_group.refresh(self, group_id, content_id)
+            current_items = ReviewItemIndex(group_items, 'user').get_items(reviewer_id=reviewer_id, subject_id=peer_id)
+            new_items = self._apply_review_changes(
+                current_items, data, new_item_data,
+                self.create_peer_review_assessment,
+                self.update_peer_review_assessment,
+                self.delete_peer_review_assessment,
+            )
+        finally:
+            # cached review items are stale even if some of the writes failed
+            self.get_peer_review_items_for_group.invalidate(self, group_id, content_id)
+            invalidate_request_cached(('peer_review_item_index', group_id, content_id))
+        return self._replace_review_items(group_items, current_items, new_items)
 
-    @memoize_with_expiration()
+    def submit_workgroup_review_items(self, reviewer_id, group_id, content_id, data):
+        """
+        :return: Workgroup review items of the group after submission, or None if they have to be fetched again
+        :rtype: list[dict]|None
+        """
+        new_item_data = {"workgroup": group_id, "reviewer": reviewer_id, "content_id": content_id}
+        try:
+            # cached review items might be stale, if review was submitted in other process
+            group_items = self.get_workgroup_review_items_for_group.refresh(self, group_id, content_id)
+            current_items = [
+                item for item in ReviewItemIndex(group_items, 'workgroup').get_items(reviewer_id=reviewer_id)
+                if item['content_id'] == content_id
+            ]
+            new_items = self._apply_review_changes(
+                current_items, data, new_item_data,
+                self.create_workgroup_review_assessment,
+                self.update_workgroup_review_assessment,
+                self.delete_workgroup_review_assessment,
+            )
+        finally:
+            # cached review items are stale even if some of the writes failed
+            self.get_workgroup_review_items_for_group.invalidate(self, group_id, content_id)
+            invalidate_request_cached(('workgroup_review_item_index', group_id, content_id))
+        return self._replace_review_items(group_items, current_items, new_items)
+
+    @memoize_api_call()
     def get_user_details(self, user_id):
         """
         :param int user_id: User ID
@@ -265,7 +396,16 @@ class TypedProjectAPI(ProjectAPI):
         response = self.send_request(GET, (USERS_API, user_id), no_trailing_slash=True)
         return UserDetails(**response)
 
-    @memoize_with_expiration()
+    def get_users_by_ids(self, user_ids):
+        """
+        Fetches multiple users concurrently - see `get_user_details`
+
+        :param collections.Iterable[int] user_ids: User IDs
+        :rtype: list[UserDetails]
+        """
+        return self._fan_out(self.get_user_details, user_ids)
+
+    @memoize_api_call()
     def get_project_by_content_id(self, course_id, content_id):
         """
         :param str course_id: Course ID
@@ -284,7 +424,7 @@ class TypedProjectAPI(ProjectAPI):
         project = response['results'][0]
         return ProjectDetails(**project)
 
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_project_details(self, project_id):
         """
         :param int project_id: Project ID
@@ -293,7 +433,7 @@ class TypedProjectAPI(ProjectAPI):
         response = self.send_request(GET, (PROJECTS_API, project_id), no_trailing_slash=True)
         return ProjectDetails(**response)
 
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_workgroup_by_id(self, group_id):
         """
         :param int group_id: Group ID
@@ -302,7 +442,16 @@ class TypedProjectAPI(ProjectAPI):
         response = self.send_request(GET, (WORKGROUP_API, group_id))
         return WorkgroupDetails(**response)
 
-    @memoize_with_expiration()
+    def get_workgroups_by_ids(self, group_ids):
+        """
+        Fetches multiple workgroups concurrently - see `get_workgroup_by_id`
+
+        :param collections.Iterable[int] group_ids: Group IDs
+        :rtype: list[WorkgroupDetails]
+        """
+        return self._fan_out(self.get_workgroup_by_id, group_ids)
+
+    @memoize_api_call()
     def get_user_workgroup_for_course(self, user_id, course_id):
         """
         :param int user_id: User ID
@@ -333,7 +482,7 @@ class TypedProjectAPI(ProjectAPI):
             yield CompletionDetails(**item)
 
     # TODO: add tests
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_workgroups_for_assignment(self, assignment_id):
         """
         :param int assignment_id: Assignment ID
@@ -351,17 +500,49 @@ class TypedProjectAPI(ProjectAPI):
         :rtype: list[WorkgroupDetails]
         """
         assignments = self.get_review_assignment_groups(user_id, course_id, xblock_id)
+        assignment_ids = [assignment["id"] for assignment in assignments]
 
         return list(
-            itertools.chain.from_iterable(
-                self.get_workgroups_for_assignment(assignment["id"])
-                for assignment in assignments
-            )
+            itertools.chain.from_iterable(self._fan_out(self.get_workgroups_for_assignment, assignment_ids))
         )
 
-    # TODO: make typed + add tests
+    def get_review_assignment_members(self, assignment_url):
+        """
+        :param str assignment_url: Review assignment group URL, as listed in workgroup `groups`
+        :return: Reviewer IDs and workgroups assigned to these reviewers
+        :rtype: (list[int], list[WorkgroupDetails])
+        """
+        # stripping slashes as we're adding it in send_request anyway
+        assignment_url = assignment_url.strip("/")
+        reviewers = self.send_request(GET, (assignment_url, 'users'))
+        workgroups = self.send_request(GET, (assignment_url, 'workgroups'), no_trailing_slash=True)
+        return [user["id"] for user in reviewers["users"]], [WorkgroupDetails(**item) for item in workgroups["results"]]
+
+    def get_review_assignment_graph(self, workgroups, content_id):
+        """
+        Loads all review assignments given workgroups take part in - reviewers of these workgroups and all the
+        workgroups these reviewers are assigned to. Assignments are taken from workgroup details (`groups`), which
+        project roster has already fetched, so only members of distinct assignments are requested - concurrently.
+
+        :param collections.Iterable[WorkgroupDetails] workgroups: Workgroups
+        :param str content_id: Activity content ID
+        :rtype: group_project_v2.roster.ReviewAssignmentGraph
+        """
+        assignment_urls = OrderedDict()
+        for workgroup in workgroups:
+            for review_assignment in workgroup.groups or ():
+                if review_assignment["data"]["xblock_id"] == content_id:
+                    assignment_urls[review_assignment["id"]] = review_assignment["url"]
+        return ReviewAssignmentGraph(self._fan_out(self.get_review_assignment_members, assignment_urls.values()))
+
+    # TODO: make typed
     def get_latest_workgroup_submissions_by_id(self, group_id):
         """
+        Latest submission for each document of the workgroup, with `user_details` of the submitting user. Details of
+        distinct submitting users are fetched concurrently, once per user rather than once per submission.
+
+        Returned submissions are copies - cached `get_workgroup_submissions` response is not modified.
+
         :param int group_id: Group ID
         :rtype: dict[dict]
         """
@@ -370,31 +551,50 @@ class TypedProjectAPI(ProjectAPI):
         submissions_by_id = {}
         for submission in submission_list:
             submission_id = submission['document_id']
-            if submission['user']:
-                submission[u'user_details'] = self.get_user_details(submission['user'])
             if submission_id in submissions_by_id:
                 last_modified = build_date_field(submissions_by_id[submission_id]["modified"])
                 this_modified = build_date_field(submission["modified"])
                 if this_modified > last_modified:
-                    submissions_by_id[submission["document_id"]] = submission
+                    submissions_by_id[submission_id] = submission
             else:
-                submissions_by_id[submission["document_id"]] = submission
+                submissions_by_id[submission_id] = submission
 
-        return submissions_by_id
+        user_ids = sorted(set(submission['user'] for submission in submissions_by_id.values() if submission['user']))
+        user_details = dict(zip(user_ids, self.get_users_by_ids(user_ids)))
 
-    # TODO: add tests + do something about different type of user_details.organization attribute
+        latest_submissions = {}
+        for submission_id, submission in submissions_by_id.items():
+            submission = dict(submission)
+            if submission['user']:
+                submission[u'user_details'] = user_details[submission['user']]
+            latest_submissions[submission_id] = submission
+        return latest_submissions
+
+    # TODO: do something about different type of user_details.organization attribute
     def get_member_data(self, user_id):
         """
         :param int user_id:
+        :return: User details with organization display name. Cached `get_user_details` response is not modified.
         :rtype: UserDetails
         """
         user_details = self.get_user_details(user_id)  # user_details.organization is an int here
         user_organizations = self.get_user_organizations(user_id)
         if user_organizations:
+            user_details = copy.copy(user_details)
             user_details.organization = user_organizations[0]['display_name']  # and a string here
         return user_details
 
-    @memoize_with_expiration()
+    def get_members_data(self, user_ids):
+        """
+        Resolves multiple users concurrently - see `get_member_data`. Meant to be called once per render with all the
+        users it displays, instead of resolving users one by one.
+
+        :param collections.Iterable[int] user_ids: User IDs
+        :rtype: list[UserDetails]
+        """
+        return self._fan_out(self.get_member_data, user_ids)
+
+    @memoize_api_call()
     def get_user_roles_for_course(self, user_id, course_id):
         """
         Returns role names user has for a given course.
@@ -411,7 +611,7 @@ class TypedProjectAPI(ProjectAPI):
         response = self.send_request(GET, (COURSES_API, course_id, 'roles'), query_params=qs_params)
         return set(role['role'] for role in response)
 
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_organization_by_id(self, org_id):
         """
         :param org_id:
@@ -420,10 +620,19 @@ class TypedProjectAPI(ProjectAPI):
         """
         return OrganisationDetails(**self.send_request(GET, (ORGANIZATIONS_API, org_id)))
 
+    def get_organizations_by_ids(self, org_ids):
+        """
+        Fetches multiple organizations concurrently - see `get_organization_by_id`
+
+        :param collections.Iterable[int] org_ids: Organization IDs
+        :rtype: list[OrganisationDetails]
+        """
+        return self._fan_out(self.get_organization_by_id, org_ids)
+
     def get_user_permissions(self, user_id):
         return self.get_user_groups(user_id, "permission")
 
-    @memoize_with_expiration()
+    @memoize_api_call()
     def get_user_groups(self, user_id, group_type=None):
         """
         :param user_id: User id
@@ -0,0 +1,219 @@
+"""
+Caching of Project API responses.
+
+By default, responses are cached in process memory. To share cached responses between processes (e.g. all LMS
+workers), point `GROUP_PROJECT_V2_API_CACHE` Django setting to one of the caches configured in `CACHES`
+(i.e. memcached) - responses are then serialized to JSON and stored in that cache.
+"""
+import functools
+import hashlib
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+from group_project_v2.project_api import dtos
+from group_project_v2.utils import DEFAULT_EXPIRATION_TIME, ExpiringLRUCache
+
+log = logging.getLogger(__name__)
+
+API_CACHE_SETTING = 'GROUP_PROJECT_V2_API_CACHE'
+LOCAL_CACHE_MAX_SIZE = 10000
+
+# Bump when DTOs or API response format change - entries stored by previous versions will not be read
+API_CACHE_VERSION = 1
+API_CACHE_KEY_PREFIX = 'group_project_v2:api:v{}'.format(API_CACHE_VERSION)
+
+SERIALIZABLE_DTOS = {
+    dto_class.__name__: dto_class for dto_class in (
+        dtos.ReducedUserDetails,
+        dtos.UserDetails,
+        dtos.ProjectDetails,
+        dtos.WorkgroupDetails,
+        dtos.CompletionDetails,
+        dtos.OrganisationDetails,
+        dtos.UserGroupDetails,
+    )
+}
+
+DTO_TAG = '__dto__'
+SET_TAG = '__set__'
+
+
+def _to_json_compatible(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_to_json_compatible(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return {SET_TAG: [_to_json_compatible(item) for item in value]}
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            raise TypeError("Only dictionaries with string keys can be cached")
+        return {key: _to_json_compatible(item) for key, item in value.items()}
+
+    dto_name = type(value).__name__
+    if SERIALIZABLE_DTOS.get(dto_name) is type(value):
+        return {DTO_TAG: dto_name, 'attributes': _to_json_compatible(vars(value))}
+
+    raise TypeError("Values of type {} can't be cached".format(dto_name))
+
+
+def _from_json_compatible(value):
+    if isinstance(value, list):
+        return [_from_json_compatible(item) for item in value]
+    if isinstance(value, dict):
+        if SET_TAG in value:
+            return set(_from_json_compatible(item) for item in value[SET_TAG])
+        if DTO_TAG in value:
+            dto_class = SERIALIZABLE_DTOS[value[DTO_TAG]]
+            # DTO constructors post-process API responses, so attributes are restored directly
+            dto = dto_class.__new__(dto_class)
+            dto.__dict__.update(_from_json_compatible(value['attributes']))
+            return dto
+        return {key: _from_json_compatible(item) for key, item in value.items()}
+    return value
+
+
+def serialize(value):
+    """
+    Serializes API response to JSON. Supports DTOs, JSON types, tuples and sets.
+
+    :raises TypeError: if value (or any of nested values) can't be serialized
+    :rtype: str
+    """
+    return json.dumps(_to_json_compatible(value))
+
+
+def deserialize(data):
+    """
+    Restores API response serialized with :func:`serialize`
+    """
+    return _from_json_compatible(json.loads(data))
+
+
+class DjangoCacheBackend(object):
+    """
+    Stores serialized API responses in a Django cache. Cache errors are logged and treated as cache misses, so that
+    cache outage does not take the API client down.
+    """
+    def __init__(self, alias):
+        """
+        :param str alias: Name of the cache in `CACHES` Django setting
+        """
+        self.alias = alias
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key, default=None):
+        try:
+            data = self.cache.get(key)
+            if data is None:
+                return default
+            return deserialize(data)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to read %s from %s cache", key, self.alias)
+            return default
+
+    def set(self, key, value, expires_after=DEFAULT_EXPIRATION_TIME):
+        try:
+            self.cache.set(key, serialize(value), expires_after.total_seconds())
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to store %s in %s cache", key, self.alias)
+
+    def delete(self, key):
+        try:
+            self.cache.delete(key)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to delete %s from %s cache", key, self.alias)
+
+
+_local_cache = ExpiringLRUCache(LOCAL_CACHE_MAX_SIZE)
+_backend_lock = threading.Lock()
+_backends = {}
+
+
+def get_api_cache_backend():
+    """
+    Returns cache backend configured via `GROUP_PROJECT_V2_API_CACHE` Django setting - in-process cache if not set.
+
+    :rtype: DjangoCacheBackend|ExpiringLRUCache
+    """
+    alias = getattr(settings, API_CACHE_SETTING, None)
+    if not alias:
+        return _local_cache
+
+    with _backend_lock:
+        if alias not in _backends:
+            _backends[alias] = DjangoCacheBackend(alias)
+        return _backends[alias]
+
+
+def make_api_cache_key(namespace, func_name, args, kwargs):
+    """
+    Builds cache key suitable for any cache backend: memcached keys are limited to 250 characters without spaces,
+    so arguments are hashed.
+
+    :param str namespace: Identifies API server, see `ProjectAPI.cache_namespace`
+    :param str func_name: API method name
+    :param tuple args: Positional arguments
+    :param dict kwargs: Keyword arguments
+    :rtype: str
+    """
+    arguments = repr((namespace, args, sorted(kwargs.items())))
+    return ':'.join([API_CACHE_KEY_PREFIX, func_name, hashlib.md5(arguments.encode('utf-8')).hexdigest()])
+
+
+def memoize_api_call(expires_after=DEFAULT_EXPIRATION_TIME):
+    """
+    Caches results of Project API method in configured cache backend (see :func:`get_api_cache_backend`).
+    Apart from expiration, cached results are only dropped by explicit invalidation - use only on data that are
+    unlikely to be changed within single request, or are invalidated by all write paths.
+
+    Results are cached by API server address and method arguments, so they are shared between ProjectAPI instances.
+    Write paths can drop cached result via `invalidate` attribute of decorated method, called with the same arguments
+    as the method itself (i.e. `ProjectAPI.get_workgroup_submissions.invalidate(api, group_id)`).
+
+    Invalidation only reaches the process that performed the write, unless cache is shared - so data used to compute
+    writes must not be read from the cache. Use `refresh` attribute of decorated method (called the same way as
+    `invalidate`) to send the request bypassing cached result - the response then replaces cached result.
+
+    :param timedelta expires_after: Caching period
+    """
+    missing = ExpiringLRUCache.MISSING
+
+    def decorator(func):
+        def invalidate(api, *args, **kwargs):
+            log.debug("Invalidating cached value for %s%s", func.__name__, args)
+            get_api_cache_backend().delete(make_api_cache_key(api.cache_namespace, func.__name__, args, kwargs))
+
+        def refresh(api, *args, **kwargs):
+            result = func(api, *args, **kwargs)
+            log.debug("Refreshing cached value for %s%s", func.__name__, args)
+            get_api_cache_backend().set(
+                make_api_cache_key(api.cache_namespace, func.__name__, args, kwargs), result, expires_after
+            )
+            return result
+
+        @functools.wraps(func)
+        def wrapper(api, *args, **kwargs):
+            backend = get_api_cache_backend()
+            key = make_api_cache_key(api.cache_namespace, func.__name__, args, kwargs)
+
+            result = backend.get(key, missing)
+            if result is missing:
+                result = func(api, *args, **kwargs)
+                log.debug("Updating cached value for %s%s", func.__name__, args)
+                backend.set(key, result, expires_after)
+
+            return result
+
+        wrapper.invalidate = invalidate
+        wrapper.refresh = refresh
+        return wrapper
+
+    return decorator
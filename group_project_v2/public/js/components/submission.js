@@ -75,6 +75,66 @@ function GroupProjectSubmissionBlock(runtime, element) {
         return message;
     }
 
+    function showUploadResult(target_form, upload_name, jqXHR) {
+        $('.' + upload_name + '_progress', target_form).css('width', '100%').addClass('complete');
+        var input = $('.' + upload_name + '_name', target_form);
+        input.attr('data-original-value', input.val());
+        var message = prepareMessageObject(jqXHR, GroupProjectCommon.gettext("Error"));
+        GroupProjectCommon.Messages.show_message(message.content, message.title);
+    }
+
+    function showUploadFailure(target_form, upload_name, jqXHR) {
+        $('.' + upload_name + '_progress', target_form).css('width', '100%').addClass('failed');
+        var message = prepareMessageObject(jqXHR, GroupProjectCommon.gettext("Error"));
+        target_form.prop('title', message.message);
+        GroupProjectCommon.Messages.show_message(message.content, message.title, 'error');
+    }
+
+    function postJSON(handler_name, data) {
+        return $.ajax({
+            type: 'POST',
+            url: runtime.handlerUrl(element, handler_name),
+            data: JSON.stringify(data),
+            contentType: 'application/json',
+            dataType: 'json'
+        });
+    }
+
+    /**
+     * Uploads file straight to storage, using presigned POST policy issued by the server, and then asks the server
+     * to record the upload. Returns promise resolved with the response of the latter; aborting it aborts the request
+     * in progress.
+     */
+    function submitDirectUpload(data, target_form) {
+        var upload_name = data.paramName;
+        data.uploadName = upload_name;
+        var current_request = postJSON('get_upload_policy', {file_name: data.files[0].name});
+        var upload = current_request
+            .then(function (policy) {
+                data.url = policy.url;
+                data.paramName = 'file';  // storage expects file in the "file" field, after policy fields
+                data.formData = $.map(policy.fields, function (value, name) {
+                    return {name: name, value: value};
+                });
+                data.dataType = 'text';  // storage responds with empty body
+                current_request = data.submit();
+                return current_request.then(function () {
+                    current_request = postJSON('confirm_upload', {key: policy.key});
+                    return current_request;
+                });
+            })
+            .done(function (response, textStatus, jqXHR) {
+                showUploadResult(target_form, upload_name, jqXHR);
+            })
+            .fail(function (jqXHR) {
+                showUploadFailure(target_form, upload_name, jqXHR);
+            });
+        upload.abort = function () {
+            current_request.abort();
+        };
+        return upload;
+    }
+
     var upload_data = {
         dataType: 'json',
         url: runtime.handlerUrl(element, "upload_submission"),
@@ -87,16 +147,17 @@ function GroupProjectSubmissionBlock(runtime, element) {
         pasteZone: null,
         add: function (e, data) {
             var target_form = $(e.target),
-                parentData = data;
+                upload_name = data.paramName,
+                direct_upload = target_form.data('direct-upload') === true;
             $('.' + data.paramName + '_name', target_form).val(data.files[0].name);
             $('.' + data.paramName + '_progress', target_form).css({width: '0%'}).removeClass('complete failed');
             $('.' + data.paramName + '_progress_box', target_form).css({visibility: 'visible'});
 
             $(document).one('perform_uploads', function () {
-                var uploadXHR = data.submit();
+                var uploadXHR = direct_upload ? submitDirectUpload(data, target_form) : data.submit();
 
                 uploadXHR
-                    .success(function (data, textStatus, jqXHR) {
+                    .done(function (data) {
                         if (data.new_stage_states) {
                             for (var i=0; i<data.new_stage_states.length; i++) {
                                 var new_state = data.new_stage_states[i];
@@ -104,7 +165,7 @@ function GroupProjectSubmissionBlock(runtime, element) {
                                     "group_project_v2.project_navigator.stage_status_update",
                                     [new_state.activity_id, new_state.stage_id, new_state.state]
                                 );
-                                $('.' + parentData.paramName + '_uploaded_by', element).html(
+                                $('.' + upload_name + '_uploaded_by', element).html(
                                     GroupProjectCommon.gettext('Uploaded by ') + data.user_label +
                                   GroupProjectCommon.gettext(' on ') + data.submission_date);
                             }
@@ -121,10 +182,10 @@ function GroupProjectSubmissionBlock(runtime, element) {
                             }
                         }
 
-                        $(document).trigger(GroupProjectCommon.Submission.events.upload_complete, jqXHR);
+                        $(document).trigger(GroupProjectCommon.Submission.events.upload_complete, uploadXHR);
                     })
-                    .fail(function (jqXHR) {
-                        $(document).trigger(GroupProjectCommon.Submission.events.upload_failed, jqXHR);
+                    .fail(function () {
+                        $(document).trigger(GroupProjectCommon.Submission.events.upload_failed, uploadXHR);
                     });
 
                 $(document).trigger(GroupProjectCommon.Submission.events.upload_started, uploadXHR);
@@ -135,22 +196,18 @@ function GroupProjectSubmissionBlock(runtime, element) {
         progress: function (e, data) {
             var target_form = $(e.target);
             var percentage = parseInt(data.loaded / data.total * 100, 10);
-            $('.' + data.paramName + '_progress', target_form).css('width', percentage + '%');
+            $('.' + (data.uploadName || data.paramName) + '_progress', target_form).css('width', percentage + '%');
         },
         done: function (e, data) {
-            var target_form = $(e.target);
-            $('.' + data.paramName + '_progress', target_form).css('width', '100%').addClass('complete');
-            var input = $('.' + data.paramName + '_name', target_form);
-            input.attr('data-original-value', input.val());
-            var message = prepareMessageObject(data.jqXHR, GroupProjectCommon.gettext("Error"));
-            GroupProjectCommon.Messages.show_message(message.content, message.title);
+            // direct uploads are complete once confirmed - see submitDirectUpload
+            if (!data.uploadName) {
+                showUploadResult($(e.target), data.paramName, data.jqXHR);
+            }
         },
         fail: function (e, data) {
-            var target_form = $(e.target);
-            $('.' + data.paramName[0] + '_progress', target_form).css('width', '100%').addClass('failed');
-            var message = prepareMessageObject(data.jqXHR, GroupProjectCommon.gettext("Error"));
-            target_form.prop('title', message.message);
-            GroupProjectCommon.Messages.show_message(message.content, message.title, 'error');
+            if (!data.uploadName) {
+                showUploadFailure($(e.target), data.paramName[0], data.jqXHR);
+            }
         }
     };
 
@@ -11,7 +11,25 @@ var GroupProjectBlockDashboardDetailsConstants = {
         table: "table.activity-data",
         user_row: "tr.user-data-row",
         group_row: "tr.group-data-row",
-        group_label: ".group-label"
+        group_label: ".group-label",
+        group_rows: "tbody.group-rows",
+        page_tpl: "tbody.group-rows[data-page=%PAGE%]",
+        sort_stage: "select.sort-stage",
+        sort_order: "select.sort-order",
+        filter_stage: "select.filter-stage",
+        filter_state: "select.filter-state",
+        recalculate_grades: ".recalculate-grades",
+        recalculate_grades_button: ".recalculate-grades-button",
+        recalculate_grades_status: ".recalculate-grades-status"
+    },
+    handlers: {
+        groups: 'dashboard_detail_groups'
+    },
+    pagination: {
+        // start loading next page when less than that many viewport heights are left below the table bottom
+        load_ahead_viewports: 1,
+        // pages further than that many viewport heights from the viewport are replaced by placeholders
+        keep_viewports: 2
     },
     data_attributes: {
         collapsed: 'collapsed',
@@ -29,7 +47,8 @@ var GroupProjectBlockDashboardDetailsConstants = {
         search: 'group_project_v2.details_view.search',
         clear_search: 'group_project_v2.details_view.search_clear'
     },
-    search_hit_class: 'search-hit'
+    search_hit_class: 'search-hit',
+    placeholder_class: 'page-placeholder'
 };
 
 var GroupProjectBlockDashboardDetailsHelpers = {
@@ -51,10 +70,13 @@ function GroupProjectBlockDashboardDetailsView(runtime, element) {
     var selectors = GroupProjectBlockDashboardDetailsConstants.selectors;
 
     var search_hit_class = GroupProjectBlockDashboardDetailsConstants.search_hit_class ;
+    var placeholder_class = GroupProjectBlockDashboardDetailsConstants.placeholder_class;
     var icon_classes = GroupProjectBlockDashboardDetailsConstants.icon_classes;
     var data_attributes = GroupProjectBlockDashboardDetailsConstants.data_attributes;
     var collapsed_values = GroupProjectBlockDashboardDetailsConstants.collapsed_values;
     var events = GroupProjectBlockDashboardDetailsConstants.events;
+    var handlers = GroupProjectBlockDashboardDetailsConstants.handlers;
+    var pagination_settings = GroupProjectBlockDashboardDetailsConstants.pagination;
 
     var search_selector = {
         email: "tr[data-email]",
@@ -63,6 +85,28 @@ function GroupProjectBlockDashboardDetailsView(runtime, element) {
 
     var format = GroupProjectBlockDashboardDetailsHelpers.format;
 
+    var $table = $(selectors.table, element);
+
+    // Groups are rendered page by page: first page comes with the view, further pages are loaded from the server
+    // when user scrolls close to the table bottom. Pages far from the viewport are detached and replaced by
+    // placeholders of the same height, so that the number of rendered rows stays bounded.
+    var pagination = {
+        enabled: !isNaN(parseInt($table.attr('data-num-pages'), 10)) && typeof runtime.handlerUrl === 'function',
+        num_pages: parseInt($table.attr('data-num-pages'), 10) || 1,
+        last_loaded_page: 1,
+        loading: false,
+        // incremented on every reload, so that responses to outdated requests are discarded
+        generation: 0,
+        detached_pages: {}
+    };
+    var query = {
+        sort_stage_id: '',
+        sort_descending: false,
+        filter_stage_id: '',
+        filter_state: '',
+        search: ''
+    };
+
     function toggle_group(group_id, attr_value, icon_class, show_hidden_elements) {
         var group_user_rows_selector = format(selectors.user_row_tpl, {'GROUP_ID': group_id});
         var group_row_selector = format(selectors.group_row_tpl, {'GROUP_ID': group_id});
@@ -103,8 +147,214 @@ function GroupProjectBlockDashboardDetailsView(runtime, element) {
         $("table.activity-data", element).find(selectors.user_row).removeClass(search_hit_class);
     }
 
+    function highlight_search_hits(search_criteria) {
+        var search_regex = new RegExp(search_criteria, "i");
+        collapse_all_groups();
+        clear_search_highlighting();
+        var table = $(selectors.table, element);
+        var search_hits =$(search_selector.email, table)
+            .add($(search_selector.full_name, table))
+            .filter(function() {
+                return (
+                    search_regex.test($(this).data('email')) ||
+                    search_regex.test($(this).data('fullname'))
+                );
+            });
+
+        search_hits.addClass(search_hit_class);
+
+        for (var i=0; i<search_hits.length; i++) {
+            var group_id = $(search_hits[i]).data(data_attributes.group_id);
+            expand_group(group_id);
+        }
+    }
+
+    function all_pages_loaded() {
+        return !pagination.enabled || pagination.last_loaded_page >= pagination.num_pages;
+    }
+
+    function get_page_body(page) {
+        return $(format(selectors.page_tpl, {'PAGE': page}), $table);
+    }
+
+    function request_page(page) {
+        var data = $.extend({
+            activity_id: $table.attr('data-activity-id'),
+            client_filter_id: $table.attr('data-client-filter-id'),
+            page: page
+        }, query);
+
+        return $.ajax({
+            type: 'POST',
+            url: runtime.handlerUrl(element, handlers.groups),
+            data: JSON.stringify(data)
+        });
+    }
+
+    function append_page(page, html) {
+        var $page_body = $('<tbody>').addClass('group-rows').attr('data-page', page).html(html);
+        $page_body.find(selectors.user_row).hide();
+        $(selectors.group_rows, $table).last().after($page_body);
+    }
+
+    function load_next_page() {
+        if (all_pages_loaded() || pagination.loading) {
+            return;
+        }
+        var generation = pagination.generation;
+        pagination.loading = true;
+        request_page(pagination.last_loaded_page + 1)
+            .done(function(data) {
+                if (generation !== pagination.generation || data.result !== 'success') {
+                    return;
+                }
+                append_page(data.page, data.html);
+                pagination.last_loaded_page = data.page;
+                pagination.num_pages = data.num_pages;
+            })
+            .always(function() {
+                if (generation === pagination.generation) {
+                    pagination.loading = false;
+                    update_viewport();
+                }
+            });
+    }
+
+    /**
+     * Drops all loaded pages and loads groups from the first page, using current sort, filter and search criteria.
+     * @param {function} [on_loaded] Called when first page is rendered
+     */
+    function reload_groups(on_loaded) {
+        pagination.generation += 1;
+        var generation = pagination.generation;
+        pagination.loading = true;
+        request_page(1)
+            .done(function(data) {
+                if (generation !== pagination.generation || data.result !== 'success') {
+                    return;
+                }
+                pagination.detached_pages = {};
+                $(selectors.group_rows, $table).not(':first').remove();
+                $(selectors.group_rows, $table).first().attr('data-page', data.page).html(data.html)
+                    .find(selectors.user_row).hide();
+                pagination.last_loaded_page = data.page;
+                pagination.num_pages = data.num_pages;
+                if (on_loaded) {
+                    on_loaded();
+                }
+            })
+            .always(function() {
+                if (generation === pagination.generation) {
+                    pagination.loading = false;
+                    update_viewport();
+                }
+            });
+    }
+
+    function detach_page($page_body) {
+        var page = $page_body.attr('data-page');
+        var $placeholder_row = $('<tr>').addClass(placeholder_class).append(
+            $('<td>').attr('colspan', $page_body.find('tr:first td').length || 1).height($page_body.height())
+        );
+        pagination.detached_pages[page] = $page_body.children().detach();
+        $page_body.append($placeholder_row);
+    }
+
+    function restore_page($page_body) {
+        var page = $page_body.attr('data-page');
+        $page_body.empty().append(pagination.detached_pages[page]);
+        delete pagination.detached_pages[page];
+    }
+
+    function restore_all_pages() {
+        $(selectors.group_rows, $table).each(function() {
+            if (pagination.detached_pages.hasOwnProperty($(this).attr('data-page'))) {
+                restore_page($(this));
+            }
+        });
+    }
+
+    function update_viewport() {
+        if (!pagination.enabled) {
+            return;
+        }
+        var $window = $(window);
+        var viewport_top = $window.scrollTop(), viewport_height = $window.height();
+        var keep_distance = viewport_height * pagination_settings.keep_viewports;
+
+        $(selectors.group_rows, $table).each(function() {
+            var $page_body = $(this);
+            var page_top = $page_body.offset().top, page_bottom = page_top + $page_body.height();
+            var is_near = (
+                page_bottom > viewport_top - keep_distance && page_top < viewport_top + viewport_height + keep_distance
+            );
+            var is_detached = pagination.detached_pages.hasOwnProperty($page_body.attr('data-page'));
+            if (is_near && is_detached) {
+                restore_page($page_body);
+            }
+            else if (!is_near && !is_detached) {
+                detach_page($page_body);
+            }
+        });
+
+        var table_bottom = $table.offset().top + $table.height();
+        var load_distance = viewport_height * pagination_settings.load_ahead_viewports;
+        if (table_bottom - (viewport_top + viewport_height) < load_distance) {
+            load_next_page();
+        }
+    }
+
+    /**
+     * Recalculates grades batch by batch - `recalculate_grades` handler of the activity is called until it reports
+     * all workgroups are processed.
+     * @param {boolean} restart Discard progress of previous recalculation
+     */
+    function recalculate_grades(restart) {
+        var $container = $(selectors.recalculate_grades, element);
+        var $button = $(selectors.recalculate_grades_button, $container);
+        var $status = $(selectors.recalculate_grades_status, $container);
+
+        $button.prop('disabled', true);
+        $.ajax({
+            type: 'POST',
+            url: $container.data('handler-url'),
+            data: JSON.stringify({restart: restart})
+        })
+            .done(function(data) {
+                if (data.result !== 'success') {
+                    $status.text($container.data('error-message'));
+                    $button.prop('disabled', false);
+                    return;
+                }
+                if (!data.done) {
+                    $status.text(format(
+                        $container.data('progress-message'), {'PROCESSED': data.processed, 'TOTAL': data.total}
+                    ));
+                    recalculate_grades(false);
+                    return;
+                }
+                $status.text(format(
+                    $container.data('done-message'), {'GRADED': data.graded, 'FAILED': data.failed.length}
+                ));
+                $button.prop('disabled', false);
+            })
+            .fail(function() {
+                $status.text($container.data('error-message'));
+                $button.prop('disabled', false);
+            });
+    }
+
+    function update_query() {
+        query.sort_stage_id = $(selectors.sort_stage, element).val() || '';
+        query.sort_descending = $(selectors.sort_order, element).val() === 'desc';
+        query.filter_stage_id = $(selectors.filter_stage, element).val() || '';
+        query.filter_state = query.filter_stage_id ? $(selectors.filter_state, element).val() : '';
+        reload_groups();
+    }
+
     $(document).ready(function () {
-        $(selectors.group_label, element).click(function () {
+        // group rows are added and replaced as pages are loaded, so events are handled on the table
+        $table.on('click', selectors.group_row + ' ' + selectors.group_label, function () {
             var $row = $(this).parents(selectors.group_row);
             var group_id = $row.data(data_attributes.group_id);
             var state = $row.data(data_attributes.collapsed);
@@ -117,34 +367,52 @@ function GroupProjectBlockDashboardDetailsView(runtime, element) {
             }
         });
 
-        $(selectors.nav_icon, element).click(function(ev) {
+        $table.on('click', selectors.nav_icon, function(ev) {
             ev.stopPropagation();
         });
 
-        $(document).on(events.search, function(target, search_criteria) {
-            var search_regex = new RegExp(search_criteria, "i");
-            collapse_all_groups();
-            clear_search_highlighting();
-            var table = $(selectors.table, element);
-            var search_hits =$(search_selector.email, table)
-                .add($(search_selector.full_name, table))
-                .filter(function() {
-                    return (
-                        search_regex.test($(this).data('email')) ||
-                        search_regex.test($(this).data('fullname'))
-                    );
-                });
-
-            search_hits.addClass(search_hit_class);
+        $(selectors.recalculate_grades_button, element).on('click', function() {
+            recalculate_grades(true);
+        });
 
-            for (var i=0; i<search_hits.length; i++) {
-                var group_id = $(search_hits[i]).data(data_attributes.group_id);
-                expand_group(group_id);
+        $(document).on(events.search, function(target, search_criteria) {
+            // Only loaded groups can be searched on the client - otherwise groups matching search are loaded first
+            if (all_pages_loaded() && !query.search) {
+                restore_all_pages();
+                highlight_search_hits(search_criteria);
+                return;
             }
+            query.search = search_criteria;
+            reload_groups(function() {
+                highlight_search_hits(search_criteria);
+            });
         });
 
         $(document).on(events.clear_search, function() {
             clear_search_highlighting();
+            if (query.search) {
+                query.search = '';
+                reload_groups();
+            }
         });
+
+        if (pagination.enabled) {
+            $(selectors.sort_stage, element).add($(selectors.sort_order, element))
+                .add($(selectors.filter_stage, element)).add($(selectors.filter_state, element))
+                .on('change', update_query);
+
+            var scheduled = false;
+            $(window).on('scroll resize', function() {
+                if (scheduled) {
+                    return;
+                }
+                scheduled = true;
+                window.requestAnimationFrame(function() {
+                    scheduled = false;
+                    update_viewport();
+                });
+            });
+            update_viewport();
+        }
     });
 }
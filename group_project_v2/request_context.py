@@ -0,0 +1,161 @@
+"""
+Request-scoped storage for data shared by all XBlocks taking part in one view render or handler call.
+
+Top-level view or handler opens the scope (see `RequestScopedXBlockMixin`), nested views join it, and the data is
+discarded when the top-level call returns - so, unlike `memoize_with_expiration`, values are computed exactly once
+per request and never leak into subsequent requests.
+
+Write paths can also defer follow-up work (i.e. grade recalculation) until the end of request - see
+`defer_to_request_end` - so that it is done once, however many writes in the request call for it.
+"""
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RequestDataContext(object):
+    """
+    Holds per-request results, keyed by arbitrary hashable keys
+    """
+    def __init__(self):
+        self._values = {}
+        self._deferred_calls = OrderedDict()
+
+    def get_or_compute(self, key, factory):
+        """
+        :param collections.Hashable key: Value key
+        :param callable factory: Parameterless callable computing the value - called only if value is not known yet
+        """
+        if key not in self._values:
+            self._values[key] = factory()
+        return self._values[key]
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def invalidate(self, key):
+        self._values.pop(key, None)
+
+    def defer(self, key, func):
+        """
+        :param collections.Hashable key: Call key - calls deferred with the same key are coalesced into the last one
+        :param callable func: Parameterless callable
+        """
+        self._deferred_calls.pop(key, None)
+        self._deferred_calls[key] = func
+
+    def run_deferred(self):
+        """
+        Runs deferred calls, in order they were deferred in. Calls deferred while running are run as well.
+        """
+        while self._deferred_calls:
+            _key, func = self._deferred_calls.popitem(last=False)
+            func()
+
+
+def get_request_context():
+    """
+    :return: Context of the current request or None if called outside of request scope
+    :rtype: RequestDataContext|None
+    """
+    return getattr(_local, 'context', None)
+
+
+@contextmanager
+def request_scope(context=None):
+    """
+    Opens request scope, or joins already opened one. Context is discarded when outermost scope is closed - calls
+    deferred by `defer_to_request_end` and not run yet are run first, unless the scope is closed by an exception.
+
+    :param RequestDataContext context: Context to open the scope with - i.e. context of a handler, captured by
+        response generator that is consumed after the handler has returned. New context is created if not given.
+    :rtype: RequestDataContext
+    """
+    current_context = get_request_context()
+    if current_context is not None:
+        yield current_context
+        return
+
+    _local.context = context if context is not None else RequestDataContext()
+    try:
+        yield _local.context
+        _local.context.run_deferred()
+    finally:
+        _local.context = None
+
+
+def request_scoped(func):
+    """
+    Decorator running the function in request scope - see `request_scope`
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with request_scope():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def request_cached(key, factory):
+    """
+    Returns value computed once per request. Outside of request scope value is computed on every call.
+
+    :param collections.Hashable key: Value key
+    :param callable factory: Parameterless callable computing the value
+    """
+    context = get_request_context()
+    if context is None:
+        return factory()
+    return context.get_or_compute(key, factory)
+
+
+def invalidate_request_cached(key):
+    """
+    Drops value computed in current request, if any - to be used by write paths
+    """
+    context = get_request_context()
+    if context is not None:
+        context.invalidate(key)
+
+
+def update_request_cached(key, value):
+    """
+    Replaces value computed in current request, if any - to be used by write paths that know the value after the write.
+    If value is None, it is dropped instead, and computed again when requested.
+    """
+    context = get_request_context()
+    if context is None:
+        return
+    if value is None:
+        context.invalidate(key)
+    else:
+        context.set(key, value)
+
+
+def defer_to_request_end(key, func):
+    """
+    Defers a call until the end of request (see `run_deferred`), so that repeated calls made while handling a request
+    are coalesced: of calls deferred with the same key, only the last one is run. Outside of request scope `func` is
+    called right away.
+
+    :param collections.Hashable key: Call key
+    :param callable func: Parameterless callable
+    """
+    context = get_request_context()
+    if context is None:
+        func()
+    else:
+        context.defer(key, func)
+
+
+def run_deferred():
+    """
+    Runs calls deferred in current request so far - handlers call it once they are done with writes, so that errors
+    are reported in their response. Calls that are still deferred when request scope is closed are run then.
+    """
+    context = get_request_context()
+    if context is not None:
+        context.run_deferred()
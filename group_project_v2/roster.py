@@ -0,0 +1,236 @@
+""" Project roster, review assignments and review items - immutable snapshots of project data """
+from collections import OrderedDict
+from types import MappingProxyType
+
+
+class ProjectRoster(object):
+    """
+    Immutable snapshot of project workgroups and their members. Intended to be built once per request (see
+    `DashboardRootXBlockMixin.project_roster`) and passed to everything that needs project membership data.
+
+    Iterating the roster yields workgroups, so it can be used wherever an iterable of workgroups is expected.
+    """
+    __slots__ = ('_workgroups', '_users', '_workgroup_by_user_id', '_user_ids', '_workgroup_ids', '_project_roster')
+
+    def __init__(self, workgroups, project_roster=None):
+        """
+        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Project workgroups
+        :param ProjectRoster project_roster: Roster of the whole project, if this roster only holds part of project
+            workgroups (i.e. a page of them) - see `subset`
+        """
+        self._project_roster = project_roster
+        self._workgroups = tuple(workgroups)
+        self._users = tuple(user for workgroup in self._workgroups for user in workgroup.users)
+        self._workgroup_by_user_id = MappingProxyType({
+            user.id: workgroup for workgroup in self._workgroups for user in workgroup.users
+        })
+        self._user_ids = frozenset(self._workgroup_by_user_id)
+        self._workgroup_ids = frozenset(workgroup.id for workgroup in self._workgroups)
+
+    def __iter__(self):
+        return iter(self._workgroups)
+
+    def __len__(self):
+        return len(self._workgroups)
+
+    @property
+    def workgroups(self):
+        """
+        :rtype: tuple[group_project_v2.project_api.dtos.WorkgroupDetails]
+        """
+        return self._workgroups
+
+    @property
+    def project_roster(self):
+        """
+        Roster of the whole project - data that depend on other workgroups (i.e. review assignments) must be
+        built from it, rather than from a subset.
+
+        :rtype: ProjectRoster
+        """
+        return self._project_roster if self._project_roster is not None else self
+
+    def subset(self, workgroups):
+        """
+        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Project workgroups
+        :return: Roster of given workgroups, that keeps reference to the whole project roster
+        :rtype: ProjectRoster
+        """
+        return ProjectRoster(workgroups, project_roster=self.project_roster)
+
+    @property
+    def users(self):
+        """
+        Members of all workgroups, in workgroup order
+
+        :rtype: tuple[group_project_v2.project_api.dtos.ReducedUserDetails]
+        """
+        return self._users
+
+    @property
+    def user_ids(self):
+        """
+        :rtype: frozenset[int]
+        """
+        return self._user_ids
+
+    @property
+    def workgroup_ids(self):
+        """
+        :rtype: frozenset[int]
+        """
+        return self._workgroup_ids
+
+    @property
+    def workgroup_by_user_id(self):
+        """
+        :rtype: collections.Mapping[int, group_project_v2.project_api.dtos.WorkgroupDetails]
+        """
+        return self._workgroup_by_user_id
+
+    def get_user_workgroup(self, user_id):
+        """
+        :param int user_id: User ID
+        :return: Workgroup user belongs to, or None if user is not a member of any project workgroup
+        :rtype: group_project_v2.project_api.dtos.WorkgroupDetails|None
+        """
+        return self._workgroup_by_user_id.get(user_id)
+
+
+class ReviewAssignmentGraph(object):
+    """
+    Immutable snapshot of peer review assignments of an activity: which workgroups each reviewer is assigned to
+    review, and which reviewers are assigned to each workgroup.
+    """
+    __slots__ = ('_review_subjects_by_reviewer', '_reviewer_ids_by_workgroup')
+
+    def __init__(self, assignments):
+        """
+        :param collections.Iterable[(collections.Iterable[int], collections.Iterable[WorkgroupDetails])] assignments:
+            Review assignments - pairs of (reviewer IDs, workgroups assigned to these reviewers)
+        """
+        review_subjects_by_reviewer, reviewer_ids_by_workgroup = {}, {}
+        for reviewer_ids, workgroups in assignments:
+            reviewer_ids, workgroups = list(reviewer_ids), list(workgroups)
+            for reviewer_id in reviewer_ids:
+                subjects = review_subjects_by_reviewer.setdefault(reviewer_id, OrderedDict())
+                for workgroup in workgroups:
+                    subjects.setdefault(workgroup.id, workgroup)
+            for workgroup in workgroups:
+                reviewers = reviewer_ids_by_workgroup.setdefault(workgroup.id, OrderedDict())
+                reviewers.update((reviewer_id, None) for reviewer_id in reviewer_ids)
+
+        self._review_subjects_by_reviewer = MappingProxyType({
+            reviewer_id: tuple(subjects.values()) for reviewer_id, subjects in review_subjects_by_reviewer.items()
+        })
+        self._reviewer_ids_by_workgroup = MappingProxyType({
+            workgroup_id: tuple(reviewers) for workgroup_id, reviewers in reviewer_ids_by_workgroup.items()
+        })
+
+    def get_review_subjects(self, reviewer_id):
+        """
+        :param int reviewer_id: Reviewer user ID
+        :return: Workgroups assigned to reviewer, without duplicates
+        :rtype: tuple[group_project_v2.project_api.dtos.WorkgroupDetails]
+        """
+        return self._review_subjects_by_reviewer.get(reviewer_id, ())
+
+    def get_reviewer_ids(self, workgroup_id):
+        """
+        :param int workgroup_id: Workgroup ID
+        :return: IDs of users assigned to review the workgroup, without duplicates
+        :rtype: tuple[int]
+        """
+        return self._reviewer_ids_by_workgroup.get(workgroup_id, ())
+
+
+def _normalize_id(value):
+    """
+    Review items API is not consistent about ID types - numeric IDs might come both as numbers and strings
+    """
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+class ReviewItemIndex(object):
+    """
+    Immutable index of review items (peer review or workgroup review items) fetched for a workgroup, that allows
+    looking up items by reviewer, review subject (teammate or workgroup) and question without scanning all of them.
+    Reviewer and subject IDs are normalized for lookups, so numeric IDs match regardless of their type - reviewer IDs
+    are still listed as they come in review items.
+
+    Looked up items are returned in the order of the indexed list. Intended to be built once per request for each
+    workgroup (see `ProjectAPI.get_peer_review_item_index`).
+    """
+    __slots__ = (
+        '_subject_key', '_items', '_reviewer_ids', '_by_key', '_by_reviewer', '_by_subject', '_by_question'
+    )
+
+    def __init__(self, review_items, subject_key):
+        """
+        :param collections.Iterable[dict] review_items: Review items
+        :param str subject_key: Review item key holding review subject ID - `user` or `workgroup`
+        """
+        self._subject_key = subject_key
+        by_key, by_reviewer, by_subject, by_question = {}, {}, {}, {}
+        items, reviewer_ids = [], OrderedDict()
+        for item in review_items:
+            items.append(item)
+            reviewer_id, subject_id = _normalize_id(item['reviewer']), _normalize_id(item[subject_key])
+            reviewer_ids.setdefault(reviewer_id, item['reviewer'])
+            by_key.setdefault((reviewer_id, subject_id, item['question']), []).append(item)
+            by_reviewer.setdefault(reviewer_id, []).append(item)
+            by_subject.setdefault(subject_id, []).append(item)
+            by_question.setdefault(item['question'], []).append(item)
+
+        def freeze(index):
+            return MappingProxyType({key: tuple(bucket) for key, bucket in index.items()})
+
+        self._items = tuple(items)
+        self._reviewer_ids = tuple(reviewer_ids.values())
+        self._by_key = freeze(by_key)
+        self._by_reviewer = freeze(by_reviewer)
+        self._by_subject = freeze(by_subject)
+        self._by_question = freeze(by_question)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def reviewer_ids(self):
+        """
+        :return: Distinct reviewer IDs, not normalized - i.e. to be resolved to user IDs
+        :rtype: tuple
+        """
+        return self._reviewer_ids
+
+    def get_items(self, reviewer_id=None, subject_id=None, question_id=None):
+        """
+        :param reviewer_id: Reviewer (anonymous) ID - if None, items of all reviewers are returned
+        :param subject_id: Review subject ID - if None, items for all subjects are returned
+        :param str question_id: Question ID - if None, items for all questions are returned
+        :return: Matching review items
+        :rtype: tuple[dict]
+        """
+        reviewer_id, subject_id = _normalize_id(reviewer_id), _normalize_id(subject_id)
+        if reviewer_id is not None and subject_id is not None and question_id is not None:
+            return self._by_key.get((reviewer_id, subject_id, question_id), ())
+
+        if reviewer_id is not None:
+            candidates = self._by_reviewer.get(reviewer_id, ())
+        elif subject_id is not None:
+            candidates = self._by_subject.get(subject_id, ())
+        elif question_id is not None:
+            candidates = self._by_question.get(question_id, ())
+        else:
+            return self._items
+
+        return tuple(
+            item for item in candidates
+            if (subject_id is None or _normalize_id(item[self._subject_key]) == subject_id) and
+            (question_id is None or item['question'] == question_id)
+        )
@@ -20,6 +20,7 @@ from group_project_v2.mixins import (
     XBlockWithUrlNameDisplayMixin,
 )
 from group_project_v2.notifications import StageNotificationsMixin
+from group_project_v2.stage.completion import StageCompletionTable
 from group_project_v2.stage.utils import StageState
 from group_project_v2.stage_components import (
     GroupProjectResourceXBlock,
@@ -140,17 +141,23 @@ class BaseGroupActivityStage(
         """
         Returns teammates to review. May throw `class`: OutsiderDisallowedError
         """
+        return self.get_team_members()
+
+    def get_team_members(self, include_current_user=False):
+        """
+        Returns workgroup members with organizations resolved, fetched in a single batch. Current user goes first,
+        if included. May throw `class`: OutsiderDisallowedError
+
+        :param bool include_current_user: Include current user along with their teammates
+        :rtype: list[group_project_v2.project_api.dtos.UserDetails]
+        """
         if not self.is_group_member:
             return []
 
+        member_ids = [self.user_id] if include_current_user else []
+        member_ids.extend(user.id for user in self.workgroup.users if self.user_id != int(user.id))
         try:
-            result = []
-            for team_member in self.workgroup.users:
-                team_member_id = team_member.id
-                if self.user_id == int(team_member_id):
-                    continue
-                result.append(self.project_api.get_member_data(team_member_id))
-            return result
+            return self.project_api.get_members_data(member_ids)
         except ApiError:
             return []
 
@@ -303,6 +310,7 @@ class BaseGroupActivityStage(
     def mark_complete(self, user_id=None):
         user_id = user_id if user_id is not None else self.user_id
         self.runtime.publish(self, 'progress', {'user_id': user_id})
+        self.completion_table.set_user_states({user_id: StageState.COMPLETED})
 
     def get_stage_state(self):
         raise NotImplementedError(MUST_BE_OVERRIDDEN)
@@ -339,9 +347,7 @@ class BaseGroupActivityStage(
                 StageState.NOT_STARTED: None
             }
 
-        target_user_count = float(len(target_user_ids))
-
-        completed_users_ids, partially_completed_users_ids = self.get_users_completion(
+        completed_users_ids, partially_completed_users_ids = self.get_materialized_users_completion(
             target_workgroups, target_students
         )
         log_format_data = dict(
@@ -350,6 +356,7 @@ class BaseGroupActivityStage(
         )
         log.info(STAGE_STATS_LOG_TPL, log_format_data)
 
+        target_user_count = float(len(target_user_ids))
         completed_ratio = len(completed_users_ids & target_user_ids) / target_user_count
         partially_completed_ratio = len(partially_completed_users_ids & target_user_ids) / target_user_count
 
@@ -368,11 +375,64 @@ class BaseGroupActivityStage(
         """
         raise NotImplementedError(MUST_BE_OVERRIDDEN)
 
-    def get_external_group_status(self, group):  # pylint: disable=unused-argument, no-self-use
+    @property
+    def completion_table(self):
+        """
+        :rtype: group_project_v2.stage.completion.StageCompletionTable
+        """
+        return StageCompletionTable(self.content_id)
+
+    def get_materialized_users_completion(self, target_workgroups, target_users):
+        """
+        Same as `get_users_completion`, but served from stage completion table: only users missing from the table
+        are calculated (and stored in the table).
+
+        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] target_workgroups:
+        :param collections.Iterable[group_project_v2.project_api.dtos.ReducedUserDetails] target_users:
+        :rtype: (set[int], set[int])
+        """
+        target_users = list(target_users)
+        user_states = self.completion_table.get_user_states(user.id for user in target_users)
+        missing_users = [user for user in target_users if user.id not in user_states]
+        if missing_users:
+            user_states.update(self.rebuild_users_completion(target_workgroups, missing_users))
+
+        completed_users = set(user_id for user_id, state in user_states.items() if state == StageState.COMPLETED)
+        partially_completed_users = set(
+            user_id for user_id, state in user_states.items() if state == StageState.INCOMPLETE
+        )
+        return completed_users, partially_completed_users
+
+    def rebuild_users_completion(self, target_workgroups, target_users):
+        """
+        Calculates completion of given users and stores it in stage completion table
+
+        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] target_workgroups:
+        :param collections.Iterable[group_project_v2.project_api.dtos.ReducedUserDetails] target_users:
+        :return: User ID to StageState mapping
+        :rtype: dict[int, str]
+        """
+        target_users = list(target_users)
+        completed_users, partially_completed_users = self.get_users_completion(target_workgroups, target_users)
+
+        user_states = {}
+        for user in target_users:
+            state = StageState.NOT_STARTED
+            if user.id in completed_users:
+                state = StageState.COMPLETED
+            elif user.id in partially_completed_users:
+                state = StageState.INCOMPLETE
+            user_states[user.id] = state
+
+        self.completion_table.set_user_states(user_states)
+        return user_states
+
+    def get_external_group_status(self, group, roster=None):  # pylint: disable=unused-argument, no-self-use
         """
         Calculates external group status for the Stage.
         Meaning of external status varies by Stage - see actual implementations docstrings.
         :param group_project_v2.project_api.dtos.WorkgroupDetails group: workgroup
+        :param group_project_v2.roster.ProjectRoster roster: Project roster, if known
         :rtype: StageState
         """
         return StageState.NOT_AVAILABLE
@@ -163,16 +163,21 @@ class SubmissionStage(BaseGroupActivityStage):
 
     @property
     def has_some_submissions(self):
-        return any(submission.upload is not None for submission in self.submissions)
+        uploaded_ids = self.get_latest_workgroup_submissions(self.workgroup.id)
+        return any(submission.upload_id in uploaded_ids for submission in self.submissions)
 
     @property
     def has_all_submissions(self):
-        return all(submission.upload is not None for submission in self.submissions)
+        uploaded_ids = self.get_latest_workgroup_submissions(self.workgroup.id)
+        return all(submission.upload_id in uploaded_ids for submission in self.submissions)
 
     def check_submissions_and_mark_complete(self):
         if self.has_all_submissions:
             for user in self.workgroup.users:
                 self.mark_complete(user.id)
+        else:
+            stage_state = self.get_stage_state()
+            self.completion_table.set_user_states({user.id: stage_state for user in self.workgroup.users})
 
     def get_stage_state(self):
         # pylint: disable=no-else-return
@@ -223,15 +228,16 @@ class SubmissionStage(BaseGroupActivityStage):
 
         return set(completed_users), set(partially_completed_users)  # removing duplicates - just in case
 
-    def get_external_group_status(self, group):
+    def get_external_group_status(self, group, roster=None):  # pylint: disable=unused-argument
         """
         Calculates external group status for the Stage.
         For Submissions stage, external status is the same as internal one: "have workgroup submitted all uploads?"
         :param group_project_v2.project_api.dtos.WorkgroupDetails group: workgroup
+        :param group_project_v2.roster.ProjectRoster roster: Project roster - not used
         :rtype: StageState
         """
         upload_ids = set(submission.upload_id for submission in self.submissions)
-        group_submissions = self.project_api.get_latest_workgroup_submissions_by_id(group.id)
+        group_submissions = self.get_latest_workgroup_submissions(group.id)
         uploaded_submissions = set(group_submissions.keys())
 
         has_all = uploaded_submissions >= upload_ids
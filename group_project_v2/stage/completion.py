@@ -0,0 +1,243 @@
+"""
+Stage completion data structures backing dashboard stage statistics.
+
+`CompletionMatrix` is a compact users x stages completion matrix. Each stage is stored as a `bytearray` column
+holding one state code per user, and workgroup membership is stored as a flat array of user indices, so per-stage
+counts and group statuses are computed by C-level `bytes` operations (`count`, gather via `itemgetter`) rather than
+by building per-user dictionaries and sets.
+
+`StageCompletionTable` is a materialized per-stage completion table, kept in a shared Django cache and updated by
+stage write paths, so that dashboards don't have to recalculate completion of the whole cohort on every page load.
+"""
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+from datetime import timedelta
+from operator import itemgetter
+
+from django.conf import settings
+
+from group_project_v2.stage.utils import StageState
+
+log = logging.getLogger(__name__)
+
+COMPLETION_TABLE_SETTING = 'GROUP_PROJECT_V2_COMPLETION_CACHE'
+COMPLETION_TABLE_KEY_PREFIX = 'group_project_v2:completion:v1'
+# Rows not covered by write paths (i.e. after review assignments or workgroup membership change) are recalculated
+# at least this often
+COMPLETION_TABLE_EXPIRATION = timedelta(hours=12)
+
+NOT_STARTED, INCOMPLETE, COMPLETED, UNKNOWN = range(4)
+
+STATE_BY_CODE = {
+    NOT_STARTED: StageState.NOT_STARTED,
+    INCOMPLETE: StageState.INCOMPLETE,
+    COMPLETED: StageState.COMPLETED,
+    UNKNOWN: StageState.UNKNOWN,
+}
+
+
+class CompletionMatrix(object):
+    """
+    Users x stages completion state matrix.
+
+    Users not in the matrix (i.e. workgroup members that are not among target users) have UNKNOWN state.
+    """
+    def __init__(self, user_ids, workgroups=()):
+        """
+        :param collections.Iterable[int] user_ids: Target user IDs - duplicates are ignored
+        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] workgroups: Target workgroups
+        """
+        self._user_ids = tuple(OrderedDict.fromkeys(user_ids))
+        self._user_index = {user_id: index for index, user_id in enumerate(self._user_ids)}
+
+        # Membership index: members of i-th workgroup are _member_indices[_group_offsets[i]:_group_offsets[i + 1]].
+        # Members that are not target users point to the extra UNKNOWN cell at the end of each column
+        unknown_index = len(self._user_ids)
+        self._group_ids = []
+        self._member_indices = array('l')
+        self._group_offsets = array('l', [0])
+        for workgroup in workgroups:
+            self._group_ids.append(workgroup.id)
+            self._member_indices.extend(self._user_index.get(user.id, unknown_index) for user in workgroup.users)
+            self._group_offsets.append(len(self._member_indices))
+
+        self._columns = {}
+
+    def __len__(self):
+        return len(self._user_ids)
+
+    @property
+    def user_ids(self):
+        """
+        :rtype: tuple[int]
+        """
+        return self._user_ids
+
+    def add_stage(self, stage_id, completed_user_ids, partially_completed_user_ids):
+        """
+        Adds (or replaces) stage column. Users in neither of the sets have not started the stage.
+
+        :param str stage_id: Stage ID
+        :param collections.Iterable[int] completed_user_ids: Users completed the stage
+        :param collections.Iterable[int] partially_completed_user_ids: Users partially completed the stage
+        """
+        column = bytearray(len(self._user_ids) + 1)
+        column[-1] = UNKNOWN
+        for code, user_ids in ((INCOMPLETE, partially_completed_user_ids), (COMPLETED, completed_user_ids)):
+            for user_id in user_ids:
+                index = self._user_index.get(user_id)
+                if index is not None:
+                    column[index] = code
+        self._columns[stage_id] = column
+
+    def _get_user_column(self, stage_id):
+        return memoryview(self._columns[stage_id])[:-1]
+
+    def get_user_state(self, stage_id, user_id):
+        """
+        :rtype: str
+        """
+        index = self._user_index.get(user_id)
+        if index is None:
+            return StageState.UNKNOWN
+        return STATE_BY_CODE[self._columns[stage_id][index]]
+
+    def get_user_states(self, stage_id):
+        """
+        :return: User ID to StageState mapping
+        :rtype: dict[int, str]
+        """
+        return dict(zip(self._user_ids, map(STATE_BY_CODE.__getitem__, self._get_user_column(stage_id))))
+
+    def get_state_counts(self, stage_id):
+        """
+        :return: Number of users completed, partially completed and not started the stage
+        :rtype: dict[str, int]
+        """
+        column = self._get_user_column(stage_id).tobytes()
+        return {
+            StageState.COMPLETED: column.count(COMPLETED),
+            StageState.INCOMPLETE: column.count(INCOMPLETE),
+            StageState.NOT_STARTED: column.count(NOT_STARTED),
+        }
+
+    def get_group_states(self, stage_id):
+        """
+        Aggregates member states into workgroup states: all members completed - completed, some members
+        started (or have unknown state) - partially completed, otherwise - not started.
+
+        :return: Workgroup ID to StageState mapping
+        :rtype: dict[int, str]
+        """
+        column = self._columns[stage_id]
+        if len(self._member_indices) == 1:
+            member_states = bytes([column[self._member_indices[0]]])
+        elif self._member_indices:
+            member_states = bytes(itemgetter(*self._member_indices)(column))
+        else:
+            member_states = b''
+
+        offsets = self._group_offsets
+        # workgroups are small, so there are few distinct combinations of member states - each is aggregated once
+        state_by_pattern = {}
+        group_states = {}
+        for position, group_id in enumerate(self._group_ids):
+            pattern = member_states[offsets[position]:offsets[position + 1]]
+            state = state_by_pattern.get(pattern)
+            if state is None:
+                state = state_by_pattern[pattern] = self._aggregate_group_state(pattern)
+            group_states[group_id] = state
+        return group_states
+
+    @staticmethod
+    def _aggregate_group_state(member_states):
+        if member_states.count(COMPLETED) == len(member_states):
+            return StageState.COMPLETED
+        if member_states.count(NOT_STARTED) != len(member_states):
+            return StageState.INCOMPLETE
+        return StageState.NOT_STARTED
+
+
+class StageCompletionTable(object):
+    """
+    Materialized completion of a single stage: StageState of each user, stored as one entry per user in a Django
+    cache (one of `CACHES`) pointed to by `GROUP_PROJECT_V2_COMPLETION_CACHE` setting.
+
+    The table must be visible to all processes serving the course, so it is disabled unless the setting points to a
+    shared cache (i.e. memcached) - when disabled, it never returns any rows and ignores updates. Cache errors are
+    logged and treated as missing rows.
+    """
+    def __init__(self, stage_content_id):
+        """
+        :param str stage_content_id: Stage content ID
+        """
+        self.stage_content_id = stage_content_id
+        # memcached keys are limited to 250 characters without spaces, so content id is hashed
+        self._key_prefix = ':'.join([
+            COMPLETION_TABLE_KEY_PREFIX, hashlib.md5(stage_content_id.encode('utf-8')).hexdigest()
+        ])
+
+    @property
+    def cache(self):
+        """
+        :return: Django cache holding the table, or None if table is disabled
+        """
+        alias = getattr(settings, COMPLETION_TABLE_SETTING, None)
+        if not alias:
+            return None
+
+        from django.core.cache import caches
+        return caches[alias]
+
+    def _make_key(self, user_id):
+        return '{prefix}:{user_id}'.format(prefix=self._key_prefix, user_id=user_id)
+
+    def get_user_states(self, user_ids):
+        """
+        :param collections.Iterable[int] user_ids: User IDs
+        :return: User ID to StageState mapping - users missing from the table are omitted
+        :rtype: dict[int, str]
+        """
+        cache = self.cache
+        if cache is None:
+            return {}
+
+        user_ids_by_key = {self._make_key(user_id): user_id for user_id in user_ids}
+        try:
+            rows = cache.get_many(list(user_ids_by_key.keys()))
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to read completion table for %s", self.stage_content_id)
+            return {}
+
+        return {user_ids_by_key[key]: state for key, state in rows.items()}
+
+    def set_user_states(self, user_states):
+        """
+        :param dict[int, str] user_states: User ID to StageState mapping
+        """
+        cache = self.cache
+        if cache is None or not user_states:
+            return
+
+        rows = {self._make_key(user_id): state for user_id, state in user_states.items()}
+        try:
+            cache.set_many(rows, COMPLETION_TABLE_EXPIRATION.total_seconds())
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to update completion table for %s", self.stage_content_id)
+
+    def invalidate_users(self, user_ids):
+        """
+        Drops rows of given users - they will be recalculated on next read
+
+        :param collections.Iterable[int] user_ids: User IDs
+        """
+        cache = self.cache
+        if cache is None:
+            return
+
+        try:
+            cache.delete_many([self._make_key(user_id) for user_id in user_ids])
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to invalidate completion table for %s", self.stage_content_id)
@@ -1,7 +1,8 @@
+import functools
 import itertools
 import json
 import logging
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 import webob
 from lazy.lazy import lazy
@@ -11,6 +12,15 @@ from xblock.validation import ValidationMessage
 
 from group_project_v2 import messages
 from group_project_v2.api_error import ApiError
+from group_project_v2.request_context import (
+    defer_to_request_end,
+    invalidate_request_cached,
+    request_cached,
+    request_scoped,
+    run_deferred,
+    update_request_cached,
+)
+from group_project_v2.roster import ProjectRoster, ReviewItemIndex
 from group_project_v2.stage.base import BaseGroupActivityStage
 from group_project_v2.stage.utils import DISPLAY_NAME_HELP, DISPLAY_NAME_NAME, ReviewState, StageState
 from group_project_v2.stage_components import (
@@ -21,13 +31,7 @@ from group_project_v2.stage_components import (
 )
 from group_project_v2.utils import MUST_BE_OVERRIDDEN, conversion_protected_handler
 from group_project_v2.utils import gettext as _
-from group_project_v2.utils import (
-    groupwork_protected_handler,
-    key_error_protected_handler,
-    loader,
-    make_key,
-    memoize_with_expiration,
-)
+from group_project_v2.utils import groupwork_protected_handler, key_error_protected_handler, loader, make_key
 
 log = logging.getLogger(__name__)
 
@@ -103,10 +107,11 @@ class ReviewBaseStage(BaseGroupActivityStage):
         )
 
     def _make_required_keys(self, items_to_grade):
+        required_question_ids = [question.question_id for question in self.required_questions]
         return set(
-            make_key(item_id, question.question_id)
+            make_key(item_id, question_id)
             for item_id in items_to_grade
-            for question in self.required_questions
+            for question_id in required_question_ids
         )
 
     def _calculate_review_status(self, review_subject_ids, review_items):
@@ -118,11 +123,54 @@ class ReviewBaseStage(BaseGroupActivityStage):
         """
         required_keys = self._make_required_keys(review_subject_ids)
         review_item_keys = self._convert_review_items_to_keys(review_items)
+        return self._get_review_state(required_keys, review_item_keys)
+
+    def _get_review_state(self, required_keys, review_item_keys):
         has_all = bool(required_keys) and review_item_keys >= required_keys
         has_some = bool(review_item_keys & required_keys)
 
         return self.REVIEW_STATE_CONDITIONS.get((has_some, has_all))
 
+    def get_review_state(self, review_subject_id):
+        """
+        :param int review_subject_id: ID of review subject (teammate or other group)
+        :return: Current user's review state of the review subject
+        :rtype: ReviewState
+        """
+        raise NotImplementedError(MUST_BE_OVERRIDDEN)
+
+    def get_review_states(self, review_subject_ids):
+        """
+        Calculates review states of multiple review subjects at once - same as `get_review_state` for each of them,
+        except that review items are fetched once for all subjects.
+
+        :param collections.Iterable[int] review_subject_ids: IDs of review subjects (teammates or other groups)
+        :return: Review subject ID to current user's ReviewState mapping
+        :rtype: dict[int, str]
+        """
+        review_subject_ids = list(review_subject_ids)
+        review_items = [
+            item for item in self._get_review_subjects_review_items(review_subject_ids)
+            if item['reviewer'] == self.anonymous_student_id
+        ]
+        review_item_keys = self._convert_review_items_to_keys(review_items)
+        required_question_ids = [question.question_id for question in self.required_questions]
+
+        return {
+            review_subject_id: self._get_review_state(
+                {make_key(review_subject_id, question_id) for question_id in required_question_ids}, review_item_keys
+            )
+            for review_subject_id in review_subject_ids
+        }
+
+    def _get_review_subjects_review_items(self, review_subject_ids):
+        """
+        :param list[int] review_subject_ids: IDs of review subjects
+        :return: Up-to-date review items of all reviewers that cover (at least) given review subjects
+        :rtype: collections.Iterable[dict]
+        """
+        raise NotImplementedError(MUST_BE_OVERRIDDEN)
+
     def get_stage_state(self):
         review_status = self.review_status()
 
@@ -137,6 +185,7 @@ class ReviewBaseStage(BaseGroupActivityStage):
         """
         return {pi['question']: pi['answer'] for pi in feedback}
 
+    @request_scoped
     def get_users_completion(self, target_workgroups, target_users):
         """
         :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] target_workgroups:
@@ -144,9 +193,10 @@ class ReviewBaseStage(BaseGroupActivityStage):
         :rtype: (set[int], set[int])
         """
         completed_users, partially_completed_users = set(), set()
+        roster = target_workgroups if isinstance(target_workgroups, ProjectRoster) else None
 
         for user in target_users:
-            review_subjects_ids, review_items = self.get_review_data(user.id)
+            review_subjects_ids, review_items = self.get_review_data(user.id, roster)
             review_status = self._calculate_review_status(review_subjects_ids, review_items)
 
             if review_status == ReviewState.COMPLETED:
@@ -156,17 +206,49 @@ class ReviewBaseStage(BaseGroupActivityStage):
 
         return completed_users, partially_completed_users
 
-    def get_review_data(self, user_id):
+    def get_review_data(self, user_id, roster=None):
         """
         :param gint user_id:
+        :param group_project_v2.roster.ProjectRoster roster: Project roster, if known
         :rtype: (set[int], dict)
         """
         raise NotImplementedError(MUST_BE_OVERRIDDEN)
 
-    def _get_reviews_by_user(self, review_items, user_id):
+    def _get_review_items_for_group(self, workgroup_id):
+        """
+        :param int workgroup_id: Workgroup ID
+        :rtype: list[dict]
+        """
+        raise NotImplementedError(MUST_BE_OVERRIDDEN)
+
+    def _get_review_item_index(self, workgroup_id):
+        """
+        Index of workgroup review items - built once per request, and dropped when review items are replaced on
+        submission (see `do_submit_review`).
+
+        :param int workgroup_id: Workgroup ID
+        :rtype: group_project_v2.roster.ReviewItemIndex
+        """
+        return request_cached(
+            self._make_review_item_index_key(workgroup_id),
+            lambda: ReviewItemIndex(self._get_review_items_for_group(workgroup_id), self.REVIEW_ITEM_KEY)
+        )
+
+    def _make_review_item_index_key(self, workgroup_id):
+        return 'review_item_index', self.REVIEW_ITEM_KEY, workgroup_id, self.activity_content_id
+
+    def _get_reviews_by_user(self, workgroup_ids, user_id):
+        """
+        :param collections.Iterable[int] workgroup_ids: IDs of workgroups review items are fetched for
+        :param int user_id: Reviewer ID
+        :rtype: list[dict]
+        """
+        indexes = [self._get_review_item_index(workgroup_id) for workgroup_id in workgroup_ids]
         return [
-            item for item in review_items
-            if self.real_user_id(item['reviewer']) == user_id
+            item
+            for index in indexes
+            for reviewer_id in index.reviewer_ids if self.real_user_id(reviewer_id) == user_id
+            for item in index.get_items(reviewer_id=reviewer_id)
         ]
 
     @XBlock.json_handler
@@ -186,7 +268,16 @@ class ReviewBaseStage(BaseGroupActivityStage):
             return {'result': 'error', 'msg': reason.format(action=self._(self.STAGE_ACTION))}
 
         try:
-            self.do_submit_review(submissions)
+            try:
+                self.do_submit_review(submissions)
+            finally:
+                # review stage completion only depends on reviews the user made, so only reviewer's completion is
+                # recalculated on next dashboard load (unless review is complete - see mark_complete), even if some
+                # of the review items failed to save
+                self.completion_table.invalidate_users([self.user_id])
+
+            # deferred grade recalculations are run before response is built, so that their errors are reported
+            run_deferred()
 
             if self.can_mark_complete and self.review_status() == ReviewState.COMPLETED:
                 self.mark_complete()
@@ -241,20 +332,22 @@ class TeamEvaluationStage(ReviewBaseStage):
 
     def review_status(self):
         review_subjects_ids = [user.id for user in self.review_subjects]
-        all_review_items = self.project_api.get_peer_review_items_for_group(self.workgroup.id, self.activity_content_id)
+        all_review_items = self._get_review_items_for_group(self.workgroup.id)
         review_items = [item for item in all_review_items if item['reviewer'] == self.anonymous_student_id]
 
         return self._calculate_review_status(review_subjects_ids, review_items)
 
-    def get_review_data(self, user_id):
+    def get_review_data(self, user_id, roster=None):
         """
         :param int user_id: User ID
+        :param group_project_v2.roster.ProjectRoster roster: Project roster - used to look up user workgroup
         :rtype: (set[int], dict)
         """
-        workgroup = self.project_api.get_user_workgroup_for_course(user_id, self.course_id)
+        workgroup = roster.get_user_workgroup(user_id) if roster is not None else None
+        if workgroup is None:
+            workgroup = self.project_api.get_user_workgroup_for_course(user_id, self.course_id)
         review_subjects_ids = set(user.id for user in workgroup.users) - {user_id}
-        review_items = self._get_review_items_for_group(self.project_api, workgroup.id, self.activity_content_id)
-        review_items_by_user = self._get_reviews_by_user(review_items, user_id)
+        review_items_by_user = self._get_reviews_by_user([workgroup.id], user_id)
         return review_subjects_ids, review_items_by_user
 
     def get_review_state(self, review_subject_id):
@@ -263,10 +356,15 @@ class TeamEvaluationStage(ReviewBaseStage):
         )
         return self._calculate_review_status([review_subject_id], review_items)
 
-    @staticmethod
-    @memoize_with_expiration()
-    def _get_review_items_for_group(project_api, workgroup_id, activity_content_id):
-        return project_api.get_peer_review_items_for_group(workgroup_id, activity_content_id)
+    def _get_review_subjects_review_items(self, review_subject_ids):
+        # all teammates are reviewed within current user's group
+        return self.project_api.get_peer_review_items_for_group(self.group_id, self.activity_content_id)
+
+    def _get_review_items_for_group(self, workgroup_id):
+        return request_cached(
+            ('peer_review_items', workgroup_id, self.activity_content_id),
+            lambda: self.project_api.get_peer_review_items_for_group(workgroup_id, self.activity_content_id)
+        )
 
     def validate(self):
         violations = super(TeamEvaluationStage, self).validate()
@@ -313,13 +411,16 @@ class TeamEvaluationStage(ReviewBaseStage):
         peer_id = int(submissions["review_subject_id"])
         del submissions["review_subject_id"]
 
-        self.project_api.submit_peer_review_items(
+        review_items = self.project_api.submit_peer_review_items(
             self.anonymous_student_id,
             peer_id,
             self.workgroup.id,
             self.activity_content_id,
             submissions,
         )
+        # review status is then calculated from review items known after submission, rather than fetched again
+        update_request_cached(('peer_review_items', self.workgroup.id, self.activity_content_id), review_items)
+        invalidate_request_cached(self._make_review_item_index_key(self.workgroup.id))
 
 
 @XBlock.wants('user')
@@ -394,36 +495,57 @@ class PeerReviewStage(ReviewBaseStage):
     def review_groups(self):
         return self.review_subjects
 
-    def get_review_subjects(self, user_id):
+    def get_review_subjects(self, user_id, roster=None):
         """
         Gets a list of workgroups to review for selected user
         :param int user_id: User ID
+        :param group_project_v2.roster.ProjectRoster roster: Project roster - if given, review subjects are taken from
+            activity review assignment graph, shared by all users in the roster
         :return: list[WorkgroupDetails]
         """
+        if roster is not None:
+            return list(self.get_review_assignment_graph(roster).get_review_subjects(user_id))
         return self.project_api.get_workgroups_to_review(user_id, self.course_id, self.activity_content_id)
 
-    def _get_review_items(self, review_groups, with_caching=False):
+    def get_review_assignment_graph(self, roster):
         """
-        Gets review items for a list of groups
-        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] review_groups: Target groups
-        :param bool with_caching:
-            Underlying implementation uses get_workgroup_review_items_for_group for both cached and non-cached version.
-            However, one of the users of this method (get_review_data) might benefit from caching,
-            while the other (review_status) is affected by the issue outlined in get_workgroup_review_items_for_group
-            comment (i.e. cached value is not updated when new feedback is posted).
-            So, caching is conditionally enabled here to serve both users of this method as efficiently as possible.
-        :return:
+        Review assignments for all project workgroups - fetched once per request.
+
+        :param group_project_v2.roster.ProjectRoster roster: Project roster, or its subset
+        :rtype: group_project_v2.roster.ReviewAssignmentGraph
         """
-        def do_get_items(group_id):
-            if with_caching:
-                return self._get_review_items_for_group(self.project_api, group_id, self.activity_content_id)
-            return self.project_api.get_workgroup_review_items_for_group(group_id, self.activity_content_id)
+        project_roster = roster.project_roster
+        return request_cached(
+            ('review_assignment_graph', self.activity_content_id, project_roster.workgroup_ids),
+            lambda: self.project_api.get_review_assignment_graph(project_roster.workgroups, self.activity_content_id)
+        )
 
-        return list(itertools.chain.from_iterable(do_get_items(group.id) for group in review_groups))
+    def get_workgroup_reviewer_ids(self, group_id, roster=None):
+        """
+        :param int group_id: Workgroup ID
+        :param group_project_v2.roster.ProjectRoster roster: Project roster, if known - see `get_review_subjects`
+        :rtype: list[int]
+        """
+        if roster is not None and group_id in roster.project_roster.workgroup_ids:
+            return list(self.get_review_assignment_graph(roster).get_reviewer_ids(group_id))
+        return [user['id'] for user in self.project_api.get_workgroup_reviewers(group_id, self.activity_content_id)]
+
+    def _get_review_items(self, review_groups):
+        """
+        Gets review items for a list of groups. Review items are kept for the whole request - write path
+        (`do_submit_review`) replaces them with review items known after submission, so that review status sees
+        feedback that has just been posted (see get_workgroup_review_items_for_group comment).
+
+        :param collections.Iterable[group_project_v2.project_api.dtos.WorkgroupDetails] review_groups: Target groups
+        :rtype: list[dict]
+        """
+        return list(itertools.chain.from_iterable(
+            self._get_review_items_for_group(group.id) for group in review_groups
+        ))
 
     def review_status(self):
         review_subjects_ids = [group.id for group in self.review_groups]
-        all_review_items = self._get_review_items(self.review_groups, with_caching=False)
+        all_review_items = self._get_review_items(self.review_groups)
         review_items = [item for item in all_review_items if item['reviewer'] == self.anonymous_student_id]
 
         return self._calculate_review_status(review_subjects_ids, review_items)
@@ -434,8 +556,14 @@ class PeerReviewStage(ReviewBaseStage):
         )
         return self._calculate_review_status([review_subject_id], review_items)
 
+    def _get_review_subjects_review_items(self, review_subject_ids):
+        return list(itertools.chain.from_iterable(
+            self.project_api.get_workgroup_review_items_for_group(group_id, self.activity_content_id)
+            for group_id in OrderedDict.fromkeys(review_subject_ids)
+        ))
+
     def _get_ta_reviews(self, target_workgroup):
-        review_items = self._get_review_items([target_workgroup], with_caching=True)
+        review_items = self._get_review_items([target_workgroup])
 
         grouped_items = defaultdict(list)
         for item in review_items:
@@ -448,20 +576,18 @@ class PeerReviewStage(ReviewBaseStage):
         }
         return ta_reviews
 
-    def get_external_group_status(self, group):
+    def get_external_group_status(self, group, roster=None):
         """
         Calculates external group status for the Stage.
         For Peer Grading stage, external status means "have students in other groups provided grades to this group?"
         :param group_project_v2.project_api.dtos.WorkgroupDetails group: workgroup
+        :param group_project_v2.roster.ProjectRoster roster: Project roster, if known - see `get_review_subjects`
         :rtype: StageState
         """
         if not self.activity.is_ta_graded:
-            reviewer_ids = [
-                user['id'] for user in self.project_api.get_workgroup_reviewers(group.id, self.activity_content_id)
-            ]
-            reviews_for_group = self._get_review_items([group], with_caching=True)
+            reviewer_ids = self.get_workgroup_reviewer_ids(group.id, roster)
             review_results = [
-                self._calculate_review_status([group.id], self._get_reviews_by_user(reviews_for_group, reviewer_id))
+                self._calculate_review_status([group.id], self._get_reviews_by_user([group.id], reviewer_id))
                 for reviewer_id in reviewer_ids
             ]
             # if review_results is empty (e.g. no reviewers are configured) all will return True, and any will return
@@ -482,20 +608,21 @@ class PeerReviewStage(ReviewBaseStage):
         review_state = self.REVIEW_STATE_CONDITIONS.get((has_some, has_all))
         return self.STAGE_STATE_REVIEW_STATE_MAPPING.get(review_state)
 
-    def get_review_data(self, user_id):
+    def get_review_data(self, user_id, roster=None):
         """
         :param int user_id:
+        :param group_project_v2.roster.ProjectRoster roster: Project roster, if known - see `get_review_subjects`
         :rtype: (set[int], dict)
         """
-        review_subjects = self.get_review_subjects(user_id)
-        review_items = self._get_review_items(review_subjects, with_caching=True)
-        reviews_by_user = self._get_reviews_by_user(review_items, user_id)
+        review_subjects = self.get_review_subjects(user_id, roster)
+        reviews_by_user = self._get_reviews_by_user([group.id for group in review_subjects], user_id)
         return set(group.id for group in review_subjects), reviews_by_user
 
-    @staticmethod
-    @memoize_with_expiration()
-    def _get_review_items_for_group(project_api, workgroup_id, activity_content_id):
-        return project_api.get_workgroup_review_items_for_group(workgroup_id, activity_content_id)
+    def _get_review_items_for_group(self, workgroup_id):
+        return request_cached(
+            ('workgroup_review_items', workgroup_id, self.activity_content_id),
+            lambda: self.project_api.get_workgroup_review_items_for_group(workgroup_id, self.activity_content_id)
+        )
 
     def validate(self):
         violations = super(PeerReviewStage, self).validate()
@@ -574,12 +701,16 @@ class PeerReviewStage(ReviewBaseStage):
         group_id = int(submissions["review_subject_id"])
         del submissions["review_subject_id"]
 
-        self.project_api.submit_workgroup_review_items(
+        review_items = self.project_api.submit_workgroup_review_items(
             reviewer_id,
             group_id,
             self.activity_content_id,
             submissions
         )
+        # review status and grade are then calculated from review items known after submission, rather than fetched
+        # again
+        update_request_cached(('workgroup_review_items', group_id, self.activity_content_id), review_items)
+        invalidate_request_cached(self._make_review_item_index_key(group_id))
 
         for question_id in self.grade_questions:
             if question_id in submissions:
@@ -597,4 +728,8 @@ class PeerReviewStage(ReviewBaseStage):
                     }
                 )
 
-        self.activity.calculate_and_send_grade(group_id)
+        # grade is recalculated once per request, however many reviews of the group the request submits
+        defer_to_request_end(
+            ('calculate_and_send_grade', self.activity_content_id, group_id),
+            functools.partial(self.activity.calculate_and_send_grade, group_id)
+        )
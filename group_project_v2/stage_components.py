@@ -18,6 +18,7 @@ from xblockutils.studio_editable import StudioEditableXBlockMixin, XBlockWithPre
 
 from group_project_v2 import messages
 from group_project_v2.api_error import ApiError
+from group_project_v2.direct_uploads import DirectUploadXBlockMixin
 from group_project_v2.mixins import (
     CompletionMixin,
     NoStudioEditableSettingsMixin,
@@ -27,7 +28,7 @@ from group_project_v2.mixins import (
 )
 from group_project_v2.project_api import ProjectAPIXBlockMixin
 from group_project_v2.project_navigator import ResourcesViewXBlock, SubmissionsViewXBlock
-from group_project_v2.upload_file import UploadFile
+from group_project_v2.upload_file import UploadFile, direct_uploads_enabled
 from group_project_v2.utils import (
     MUST_BE_OVERRIDDEN,
     FieldValuesContextManager,
@@ -237,7 +238,8 @@ SubmissionUpload = namedtuple("SubmissionUpload", "location file_name submission
 @XBlock.needs('user')
 @XBlock.wants('notifications')
 class GroupProjectSubmissionXBlock(
-        BaseStageComponentXBlock, ProjectAPIXBlockMixin, StudioEditableXBlockMixin, XBlockWithPreviewMixin
+        BaseStageComponentXBlock, ProjectAPIXBlockMixin, StudioEditableXBlockMixin, XBlockWithPreviewMixin,
+        DirectUploadXBlockMixin
 ):
     CATEGORY = "gp-v2-submission"
     STUDIO_LABEL = _(u"Submission")
@@ -290,7 +292,7 @@ class GroupProjectSubmissionXBlock(
     )
 
     def get_upload(self, group_id):
-        submission_map = self.project_api.get_latest_workgroup_submissions_by_id(group_id)
+        submission_map = self.get_latest_workgroup_submissions(group_id)
         submission_data = submission_map.get(self.upload_id, None)
 
         if submission_data is None:
@@ -321,7 +323,10 @@ class GroupProjectSubmissionXBlock(
         fragment = Fragment()
         # pylint: disable=consider-using-ternary
         uploading_allowed = (self.stage.available_now and self.stage.is_group_member) or self.stage.is_admin_grader
-        render_context = {'submission': self, 'upload': self.upload, 'disabled': not uploading_allowed}
+        render_context = {
+            'submission': self, 'upload': self.upload, 'disabled': not uploading_allowed,
+            'direct_upload': direct_uploads_enabled(),
+        }
         render_context.update(context)
         fragment.add_content(loader.render_django_template(
             self.PROJECT_NAVIGATOR_VIEW_TEMPLATE,
@@ -346,7 +351,7 @@ class GroupProjectSubmissionXBlock(
         # element
         return fragment
 
-    def _validate_upload(self, request):
+    def _validate_upload_access(self):
         if not self.stage.available_now:
             if self.stage.is_open:
                 template = self._(messages.STAGE_CLOSED_TEMPLATE)
@@ -359,15 +364,96 @@ class GroupProjectSubmissionXBlock(
             # 403 - forbidden
             return 403, {'result': 'error', 'message': self._(messages.NON_GROUP_MEMBER_UPLOAD)}
 
+        return None, None
+
+    def _validate_upload(self, request):
+        failure_code, response_data = self._validate_upload_access()
+        if failure_code is not None:
+            return failure_code, response_data
+
         try:
             self.validator(request.params[self.upload_id].file)
         except ValidationError as validationError:
-            message = validationError.message % validationError.params
             # 400 - BAD REQUEST
-            return 400, {'result': 'error', 'message': message}
+            return 400, {'result': 'error', 'message': self._format_validation_error(validationError)}
 
         return None, None
 
+    def _format_validation_error(self, validation_error):
+        if validation_error.params:
+            return validation_error.message % validation_error.params
+        return self._(validation_error.message)
+
+    @staticmethod
+    def _make_response(failure_code, response_data):
+        response = webob.response.Response(body=json.dumps(response_data))
+        if failure_code:
+            response.status_code = failure_code
+
+        return response
+
+    def _make_upload_context(self, activity):
+        return {
+            "user_id": activity.user_id,
+            "group_id": activity.workgroup.id,
+            "project_api": self.project_api,
+            "course_id": activity.course_id
+        }
+
+    def _record_upload(self, store_upload):
+        """
+        Stores and submits uploaded file, marks stage as completed if all submissions in stage have uploads and
+        builds upload handler response.
+
+        :param callable store_upload: Takes target activity and upload context, returns stored and submitted
+            `group_project_v2.upload_file.BaseUploadFile`
+        :return: Failure code (0 if succeeded) and response data
+        :rtype: (int, dict)
+        """
+        target_activity = self.stage.activity
+        response_data = {
+            "title": self._(messages.SUCCESSFUL_UPLOAD_TITLE),
+            "message": self._(messages.SUCCESSFUL_UPLOAD_MESSAGE_TPL).format(icon='fa fa-paperclip')
+        }
+        failure_code = 0
+        try:
+            uploaded_file = store_upload(target_activity, self._make_upload_context(target_activity))
+
+            response_data["submissions"] = {uploaded_file.submission_id: uploaded_file.location}
+
+            try:
+                self.stage.check_submissions_and_mark_complete()
+            except Exception:
+                # submission is stored anyway, so workgroup completion might have changed
+                self.stage.completion_table.invalidate_users(user.id for user in target_activity.workgroup.users)
+                raise
+            response_data["new_stage_states"] = [self.stage.get_new_stage_state_data()]
+
+            response_data['user_label'] = self.project_api.get_user_details(target_activity.user_id).user_label
+            response_data['submission_date'] = format_date(date.today())
+
+        except ValidationError as validation_error:
+            failure_code = 400
+            response_data.update({
+                "title": self._(messages.FAILED_UPLOAD_TITLE),
+                "message": self._format_validation_error(validation_error)
+            })
+        except Exception as exception:  # pylint: disable=broad-except
+            log.exception(exception)
+            failure_code = 500
+            if isinstance(exception, ApiError):
+                failure_code = exception.code
+            error_message = str(exception).strip()
+            if error_message == '':
+                error_message = self._(messages.UNKNOWN_ERROR)
+
+            response_data.update({
+                "title": self._(messages.FAILED_UPLOAD_TITLE),
+                "message": self._(messages.FAILED_UPLOAD_MESSAGE_TPL).format(error_goes_here=error_message)
+            })
+
+        return failure_code, response_data
+
     @XBlock.handler
     def upload_submission(self, request, _suffix=''):
         """
@@ -378,58 +464,13 @@ class GroupProjectSubmissionXBlock(
         failure_code, response_data = self._validate_upload(request)
 
         if failure_code is None and response_data is None:
-            target_activity = self.stage.activity
-            response_data = {
-                "title": self._(messages.SUCCESSFUL_UPLOAD_TITLE),
-                "message": self._(messages.SUCCESSFUL_UPLOAD_MESSAGE_TPL).format(icon='fa fa-paperclip')
-            }
-            failure_code = 0
-            try:
-                context = {
-                    "user_id": target_activity.user_id,
-                    "group_id": target_activity.workgroup.id,
-                    "project_api": self.project_api,
-                    "course_id": target_activity.course_id
-                }
-
-                uploaded_file = self.persist_and_submit_file(
-                    target_activity, context, request.params[self.upload_id].file
+            failure_code, response_data = self._record_upload(
+                lambda activity, context: self.persist_and_submit_file(
+                    activity, context, request.params[self.upload_id].file
                 )
+            )
 
-                response_data["submissions"] = {
-                    uploaded_file.submission_id: make_s3_link_temporary(
-                        uploaded_file.group_id,
-                        uploaded_file.sha1,
-                        uploaded_file.file.name,
-                        uploaded_file.file_url,
-                    )
-                }
-
-                self.stage.check_submissions_and_mark_complete()
-                response_data["new_stage_states"] = [self.stage.get_new_stage_state_data()]
-
-                response_data['user_label'] = self.project_api.get_user_details(target_activity.user_id).user_label
-                response_data['submission_date'] = format_date(date.today())
-
-            except Exception as exception:  # pylint: disable=broad-except
-                log.exception(exception)
-                failure_code = 500
-                if isinstance(exception, ApiError):
-                    failure_code = exception.code
-                error_message = str(exception).strip()
-                if error_message == '':
-                    error_message = self._(messages.UNKNOWN_ERROR)
-
-                response_data.update({
-                    "title": self._(messages.FAILED_UPLOAD_TITLE),
-                    "message": self._(messages.FAILED_UPLOAD_MESSAGE_TPL).format(error_goes_here=error_message)
-                })
-
-        response = webob.response.Response(body=json.dumps(response_data))
-        if failure_code:
-            response.status_code = failure_code
-
-        return response
+        return self._make_response(failure_code, response_data)
 
     def persist_and_submit_file(self, activity, context, file_stream):
         """
@@ -448,18 +489,7 @@ class GroupProjectSubmissionXBlock(
         # It have been saved... note the submission
         try:
             uploaded_file.submit()
-            # Emit analytics event...
-            self.runtime.publish(
-                self,
-                self.SUBMISSION_RECEIVED_EVENT,
-                {
-                    "submission_id": uploaded_file.submission_id,
-                    "filename": uploaded_file.file.name,
-                    "content_id": activity.content_id,
-                    "group_id": activity.workgroup.id,
-                    "user_id": activity.user_id,
-                }
-            )
+            self._publish_submission(activity, uploaded_file.submission_id, uploaded_file.file.name)
         except Exception as save_record_error:  # pylint: disable=broad-except
             original_message = save_record_error.message if hasattr(save_record_error, "message") else ""
             save_record_error.message = _("Error recording file information {} - {}").format(
@@ -467,6 +497,25 @@ class GroupProjectSubmissionXBlock(
             )
             raise
 
+        self._notify_file_upload()
+        return uploaded_file
+
+    def _publish_submission(self, activity, submission_id, file_name):
+        self.invalidate_latest_workgroup_submissions(activity.workgroup.id)
+        # Emit analytics event...
+        self.runtime.publish(
+            self,
+            self.SUBMISSION_RECEIVED_EVENT,
+            {
+                "submission_id": submission_id,
+                "filename": file_name,
+                "content_id": activity.content_id,
+                "group_id": activity.workgroup.id,
+                "user_id": activity.user_id,
+            }
+        )
+
+    def _notify_file_upload(self):
         # See if the xBlock Notification Service is available, and - if so -
         # dispatch a notification to the entire workgroup that a file has been uploaded
         # Note that the NotificationService can be disabled, so it might not be available
@@ -475,8 +524,6 @@ class GroupProjectSubmissionXBlock(
         if notifications_service:
             self.stage.fire_file_upload_notification(notifications_service)
 
-        return uploaded_file
-
 
 class ReviewSubjectSeletorXBlockBase(BaseStageComponentXBlock, XBlockWithPreviewMixin, NoStudioEditableSettingsMixin):
     """
@@ -488,10 +535,7 @@ class ReviewSubjectSeletorXBlockBase(BaseStageComponentXBlock, XBlockWithPreview
 
     @XBlock.handler
     def get_statuses(self, _request, _suffix=''):
-        response_data = {
-            review_subject.id: self.stage.get_review_state(review_subject.id)
-            for review_subject in self.review_subjects
-        }
+        response_data = self.stage.get_review_states(review_subject.id for review_subject in self.review_subjects)
         return webob.response.Response(body=json.dumps(response_data))
 
     def student_view(self, context):
@@ -831,13 +875,8 @@ class GroupProjectTeamEvaluationDisplayXBlock(GroupProjectBaseFeedbackDisplayXBl
         return self.stage.activity.team_evaluation_questions
 
     def get_feedback(self):
-        all_feedback = self.project_api.get_user_peer_review_items(
-            self.user_id,
-            self.group_id,
-            self.stage.activity_content_id,
-        )
-
-        return [item for item in all_feedback if item["question"] == self.question_id]
+        index = self.project_api.get_peer_review_item_index(self.group_id, self.stage.activity_content_id)
+        return list(index.get_items(subject_id=self.user_id, question_id=self.question_id))
 
 
 class GroupProjectGradeEvaluationDisplayXBlock(GroupProjectBaseFeedbackDisplayXBlock):
@@ -849,11 +888,8 @@ class GroupProjectGradeEvaluationDisplayXBlock(GroupProjectBaseFeedbackDisplayXB
         return self.stage.activity.peer_review_questions
 
     def get_feedback(self):
-        all_feedback = self.project_api.get_workgroup_review_items_for_group(
-            self.group_id,
-            self.stage.activity_content_id,
-        )
-        return [item for item in all_feedback if item["question"] == self.question_id]
+        index = self.project_api.get_workgroup_review_item_index(self.group_id, self.stage.activity_content_id)
+        return list(index.get_items(question_id=self.question_id))
 
 
 class ProjectTeamXBlock(
@@ -866,13 +902,9 @@ class ProjectTeamXBlock(
 
     def student_view(self, context):
         fragment = Fragment()
-        # Could be a TA not in the group.
-        if self.stage.is_group_member:
-            user_details = [self.stage.project_api.get_member_data(self.stage.user_id)]
-        else:
-            user_details = []
+        # Could be a TA not in the group - then there are no team members to show
         render_context = {
-            'team_members': user_details + self.stage.team_members,
+            'team_members': self.stage.get_team_members(include_current_user=True),
             'course_id': self.stage.course_id,
             'group_id': self.stage.workgroup.id
         }
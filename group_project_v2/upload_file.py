@@ -1,25 +1,75 @@
+import base64
 import hashlib
 import logging
 import mimetypes
+import os
+import re
+import uuid
 
+from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.files import File
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from lazy.lazy import lazy
+from django.utils.text import get_valid_filename
+from storages.backends.s3boto import S3BotoStorage
+from upload_validator import READ_SIZE
 
-from group_project_v2.utils import get_storage
+from group_project_v2 import messages
+from group_project_v2.utils import MUST_BE_OVERRIDDEN, get_s3_client, get_storage, make_s3_link_temporary
 
 log = logging.getLogger(__name__)
 
+DIRECT_UPLOADS_SETTING = 'GROUP_PROJECT_V2_DIRECT_UPLOADS'
+MAX_UPLOAD_SIZE_SETTING = 'GROUP_PROJECT_V2_MAX_UPLOAD_SIZE'
+DEFAULT_MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+DIRECT_UPLOAD_POLICY_TIMEOUT = 60 * 15
+# direct uploads that are not confirmed yet - objects under this prefix are expected to be expired by a storage
+# lifecycle rule, so that abandoned uploads are cleaned up (see docs/deployment.md)
+UNCONFIRMED_UPLOADS_PREFIX = 'group_work/uploads/'
+DIRECT_UPLOAD_KEY_PATTERN = (
+    '^' + re.escape(UNCONFIRMED_UPLOADS_PREFIX) + r'{group_id}/(?P<token>[0-9a-f]{{32}})/(?P<file_name>[^/]+)$'
+)
 
-class UploadFile(object):
-    _sha1_hash = None
 
-    def __init__(self, file_stream, submission_id, project_context):
+def save_s3_file(storage, path, file_stream, md5):
+    """
+    Writes file to S3 storage in a single request - unlike `S3BotoStorage.save`, it neither checks the path is
+    available nor fetches the existing key first, and passes precalculated MD5, so the file is not read again to
+    calculate it.
 
-        self.file = file_stream
-        self.mimetype = mimetypes.guess_type(self.file.name)[0]
+    :param S3BotoStorage storage: Storage
+    :param str path: Path to store the file to - existing file is overwritten
+    :param file_stream: File to store
+    :param md5: `hashlib.md5` of the file content
+    """
+    # pylint: disable=protected-access
+    cleaned_name = storage._clean_name(path)
+    encoded_name = storage._encode_name(storage._normalize_name(cleaned_name))
+    content_type, encoding = mimetypes.guess_type(cleaned_name)
+    content_type = content_type or storage.key_class.DefaultContentType
+    headers = dict(storage.headers, **{'Content-Type': content_type})
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    key = storage.bucket.new_key(encoded_name)
+    key.set_metadata('Content-Type', content_type)
+    key.set_contents_from_file(
+        file_stream, headers=headers, policy=storage.default_acl, reduced_redundancy=storage.reduced_redundancy,
+        rewind=True, encrypt_key=storage.encryption,
+        md5=(md5.hexdigest(), base64.b64encode(md5.digest()).decode('ascii'))
+    )
 
+
+class BaseUploadFile(object):
+    """
+    Uploaded submission file - subclasses store the file (or check it is stored) at `file_storage_path`
+    """
+    file_name = None
+    mimetype = None
+
+    def __init__(self, submission_id, project_context):
         self.submission_id = submission_id
         self.project_context = project_context
         self.storage = get_storage()
@@ -43,21 +93,9 @@ class UploadFile(object):
     def project_api(self):
         return self._get_project_context_key("project_api")
 
-    @lazy
-    def sha1(self):
-        if self._sha1_hash is None:
-            self.file.seek(0)
-
-            hash_sha1 = hashlib.sha1()
-            # Can read chunks from uploaded file
-            for chunk in self.file.chunks():
-                hash_sha1.update(chunk)
-
-            self._sha1_hash = hash_sha1.hexdigest()
-
-            self.file.seek(0)
-
-        return self._sha1_hash
+    @property
+    def file_storage_path(self):
+        raise NotImplementedError(MUST_BE_OVERRIDDEN)
 
     @property
     def file_url(self):
@@ -70,27 +108,184 @@ class UploadFile(object):
 
         return location
 
+    @property
+    def location(self):
+        """
+        URL of the stored file, to be sent to user - see `make_s3_link_temporary`
+        """
+        return make_s3_link_temporary(
+            self.group_id, self.file_storage_path.split('/')[-2], self.file_name, self.file_url
+        )
+
+    def submit(self):
+        submit_hash = {
+            "document_id": self.submission_id,
+            "document_url": self.file_url,
+            "document_filename": self.file_name,
+            "document_mime_type": self.mimetype,
+            "user": self.user_id,
+            "workgroup": self.group_id,
+        }
+        self.project_api.create_submission(submit_hash)
+
+
+class UploadFile(BaseUploadFile):
+    """
+    File uploaded through LMS - stored by `save_file`
+    """
+    _sha1_hash = None
+
+    def __init__(self, file_stream, submission_id, project_context):
+        super(UploadFile, self).__init__(submission_id, project_context)
+        self.file = file_stream
+        self.file_name = self.file.name
+        self.mimetype = mimetypes.guess_type(self.file.name)[0]
+
+    @property
+    def sha1(self):
+        """
+        SHA1 of the file content - calculated by `save_file`
+        """
+        return self._sha1_hash
+
     @property
     def file_storage_path(self):
         return "group_work/{}/{}/{}".format(self.group_id, self.sha1, self.file.name)
 
     def save_file(self):
-        path = self.file_storage_path
+        """
+        Stores the file to its content addressed path, in a single write. File is hashed first - SHA1 makes the path,
+        and MD5 is what S3 checks the upload against. S3 storage writes the path without checking it first: file already
+        stored there has the same content, so it is just overwritten. Other storages keep the file already stored, as
+        they would store it under another name otherwise.
+        """
+        hash_sha1, hash_md5 = hashlib.sha1(), hashlib.md5()
+        self.file.seek(0)
+        for chunk in self.file.chunks():
+            hash_sha1.update(chunk)
+            hash_md5.update(chunk)
+        self._sha1_hash = hash_sha1.hexdigest()
 
-        if not self.storage.exists(path):
+        path = self.file_storage_path
+        if isinstance(self.storage, S3BotoStorage):
+            log.debug("Storing to %s", path)
+            save_s3_file(self.storage, path, self.file, hash_md5)
+            log.debug("Successfully stored file to %s", path)
+        elif not self.storage.exists(path):
             log.debug("Storing to %s", path)
             self.storage.save(path, File(self.file))
             log.debug("Successfully stored file to %s", path)
         else:
             log.debug("File already stored at %s", path)
 
-    def submit(self):
-        submit_hash = {
-            "document_id": self.submission_id,
-            "document_url": self.file_url,
-            "document_filename": self.file.name,
-            "document_mime_type": self.mimetype,
-            "user": self.user_id,
-            "workgroup": self.group_id,
-        }
-        self.project_api.create_submission(submit_hash)
+
+def direct_uploads_enabled():
+    """
+    Direct uploads are opt-in (see `DIRECT_UPLOADS_SETTING`) and only supported for S3 storage
+    """
+    return bool(getattr(settings, DIRECT_UPLOADS_SETTING, False)) and isinstance(get_storage(), S3BotoStorage)
+
+
+def get_max_upload_size():
+    return getattr(settings, MAX_UPLOAD_SIZE_SETTING, None) or DEFAULT_MAX_UPLOAD_SIZE
+
+
+class DirectUpload(BaseUploadFile):
+    """
+    File uploaded by the browser straight to S3 with presigned POST policy (see `make_policy`), so that transfer does
+    not tie up LMS workers. Uploaded object is checked by `validate` and moved to `file_storage_path` by `save_file`
+    before it is submitted.
+
+    Browser uploads under `UNCONFIRMED_UPLOADS_PREFIX`, so that uploads that are never confirmed expire. Object keys
+    are unique per upload, in place of content hash segment of `UploadFile` paths.
+    """
+    KEY_TEMPLATE = UNCONFIRMED_UPLOADS_PREFIX + "{group_id}/{token}/{file_name}"
+    STORED_KEY_TEMPLATE = "group_work/{group_id}/{token}/{file_name}"
+
+    def __init__(self, key, submission_id, project_context):
+        """
+        :param str key: Object key - must be made by `make_key` for the same workgroup
+        :raises ValidationError: if key is not a direct upload key of the workgroup
+        """
+        super(DirectUpload, self).__init__(submission_id, project_context)
+        match = re.match(DIRECT_UPLOAD_KEY_PATTERN.format(group_id=re.escape(str(self.group_id))), key or '')
+        if not match:
+            raise ValidationError(messages.INVALID_DIRECT_UPLOAD)
+        self.key = key
+        self.token = match.group('token')
+        self.file_name = match.group('file_name')
+        self.mimetype = mimetypes.guess_type(self.file_name)[0]
+
+    @classmethod
+    def make_key(cls, group_id, file_name):
+        """
+        :param int group_id: Workgroup ID
+        :param str file_name: Uploaded file name, as reported by the browser
+        :rtype: str
+        """
+        file_name = get_valid_filename(os.path.basename(file_name))
+        return cls.KEY_TEMPLATE.format(group_id=group_id, token=uuid.uuid4().hex, file_name=file_name)
+
+    @property
+    def file_storage_path(self):
+        return self.STORED_KEY_TEMPLATE.format(group_id=self.group_id, token=self.token, file_name=self.file_name)
+
+    def make_policy(self, max_size, expires_in=DIRECT_UPLOAD_POLICY_TIMEOUT):
+        """
+        Presigned POST policy that only allows uploading file of given max size and upload's mime type to upload's
+        key, with the same ACL and encryption storage uses.
+
+        :param int max_size: Max file size, in bytes
+        :param int expires_in: Policy expiration time, in seconds
+        :return: URL and form fields browser must POST the file with
+        :rtype: dict
+        """
+        fields = {'acl': self.storage.default_acl, 'Content-Type': self.mimetype}
+        if self.storage.encryption:
+            fields['x-amz-server-side-encryption'] = 'AES256'
+        conditions = [{name: value} for name, value in sorted(fields.items())]
+        conditions.append(['content-length-range', 1, max_size])
+
+        return get_s3_client().generate_presigned_post(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=self.key,
+            Fields=fields, Conditions=conditions, ExpiresIn=expires_in
+        )
+
+    def validate(self, validator):
+        """
+        Checks uploaded object exists and passes `validator`, that inspects the first bytes of the object - same
+        `FileTypeValidator` reads from uploaded files. Invalid objects are deleted.
+
+        :param callable validator: File validator
+        :raises ValidationError: if object is missing or invalid
+        """
+        s3_client, bucket = get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=self.key, Range='bytes=0-{}'.format(READ_SIZE - 1))
+        except ClientError as client_error:
+            log.warning("Direct upload %s is not available: %s", self.key, client_error)
+            raise ValidationError(messages.DIRECT_UPLOAD_NOT_FOUND) from client_error
+
+        try:
+            validator(ContentFile(response['Body'].read(), name=self.file_name))
+        except ValidationError:
+            s3_client.delete_object(Bucket=bucket, Key=self.key)
+            raise
+
+    def save_file(self):
+        """
+        Moves validated object from unconfirmed uploads to `file_storage_path` - server-side copy, with the same ACL
+        and encryption storage uses. Uploaded object is then discarded; if that fails, lifecycle rule expires it.
+        """
+        s3_client, bucket = get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME
+        copy_parameters = {'ACL': self.storage.default_acl}
+        if self.storage.encryption:
+            copy_parameters['ServerSideEncryption'] = 'AES256'
+        s3_client.copy_object(
+            Bucket=bucket, Key=self.file_storage_path, CopySource={'Bucket': bucket, 'Key': self.key}, **copy_parameters
+        )
+        try:
+            s3_client.delete_object(Bucket=bucket, Key=self.key)
+        except (BotoCoreError, ClientError):
+            log.exception("Failed to delete confirmed direct upload %s", self.key)
+        log.debug("Successfully stored direct upload to %s", self.file_storage_path)
@@ -2,10 +2,12 @@
 import csv
 import functools
 import logging
+import threading
+import time
 import urllib.parse
 import xml.etree.ElementTree as ET
-from collections import namedtuple
-from datetime import date, datetime, timedelta
+from collections import OrderedDict, namedtuple
+from datetime import date, timedelta
 from decimal import Decimal
 
 import boto3
@@ -20,8 +22,12 @@ from web_fragments.fragment import Fragment
 from xblockutils.resources import ResourceLoader
 
 DEFAULT_EXPIRATION_TIME = timedelta(seconds=10)
+DEFAULT_MEMOIZE_MAX_SIZE = 1000
 
 S3_FILE_URL_TIMEOUT = 60 * 30
+# presigned file URLs are reused while they stay valid for at least this long
+S3_FILE_URL_MIN_VALIDITY = 60 * 5
+S3_FILE_URL_CACHE_MAX_SIZE = 10000
 
 
 log = logging.getLogger(__name__)
@@ -263,34 +269,98 @@ def get_link_to_block(block):
     )
 
 
-def memoize_with_expiration(expires_after=DEFAULT_EXPIRATION_TIME):
+class ExpiringLRUCache(object):
     """
-    This memoization decorator provides lightweight caching mechanism. It is not thread-safe and contain
-    no cache invalidation features except cache expiration - use only on data that are unlikely to be changed
-    within single request (i.e. workgroup and user data, assigned reviews, etc.)
+    Thread-safe cache with limited number of entries and entry expiration.
+    When cache is full, least recently used entries are evicted first.
+    """
+    MISSING = object()
+
+    def __init__(self, max_size=DEFAULT_MEMOIZE_MAX_SIZE, expires_after=DEFAULT_EXPIRATION_TIME):
+        """
+        :param int max_size: Max number of entries
+        :param timedelta expires_after: Entry time to live
+        """
+        self.max_size = max_size
+        self.expires_after = expires_after
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, self.MISSING)
+            if entry is self.MISSING:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_after=None):
+        """
+        :param timedelta expires_after: Overrides entry time to live set for the cache
+        """
+        expires_after = expires_after or self.expires_after
+        with self._lock:
+            now = time.monotonic()
+            self._entries[key] = (now + expires_after.total_seconds(), value)
+            self._entries.move_to_end(key)
+
+            # least recently used entries are likely to be expired - dropping them first
+            while self._entries:
+                oldest_key = next(iter(self._entries))
+                if self._entries[oldest_key][0] > now and len(self._entries) <= self.max_size:
+                    break
+                del self._entries[oldest_key]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def memoize_with_expiration(expires_after=DEFAULT_EXPIRATION_TIME, max_size=DEFAULT_MEMOIZE_MAX_SIZE):
+    """
+    This memoization decorator provides lightweight caching mechanism. It contains no cache invalidation features
+    except cache expiration - use only on data that are unlikely to be changed within single request (i.e. workgroup
+    and user data, assigned reviews, etc.)
+
+    Results are cached by positional and keyword arguments, so all of them must be hashable; calls with unhashable
+    arguments are not cached. Cache is exposed as `cache` attribute of decorated function.
+
     :param timedelta expires_after: Caching period
+    :param int max_size: Max number of cached results
     """
     def decorator(func):
-        cache = func.cache = {}
+        cache = ExpiringLRUCache(max_size, expires_after)
 
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            key_list = (
-                tuple([func.__name__]) + tuple(args) + tuple(
-                    "{}:{}".format(key, value) for key, value in kwargs.items()
-                )
-            )
-            key = make_key(key_list)
-            if key not in cache or cache[key]['timestamp'] + expires_after <= datetime.now():
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                result = cache.get(key, ExpiringLRUCache.MISSING)
+            except TypeError:
+                log.warning("Arguments of %s are not hashable - skipping cache", func.__name__)
+                return func(*args, **kwargs)
+
+            if result is ExpiringLRUCache.MISSING:
                 result = func(*args, **kwargs)
-                log.info("Updating cached value for key %s", key)
-                cache[key] = {
-                    'timestamp': datetime.now(),
-                    'result': result
-                }
+                log.debug("Updating cached value for key %s", key)
+                cache.set(key, result)
 
-            return cache[key]['result']
+            return result
 
+        wrapper.cache = cache
         return wrapper
 
     return decorator
@@ -376,6 +446,31 @@ def export_to_csv(data, target, headers=None):
         writer.writerow(row)
 
 
+class _CSVLineBuffer(object):
+    """
+    File-like object that returns written data instead of storing it - lets `csv.writer` produce one line at a time
+    """
+    def write(self, value):  # pylint: disable=no-self-use
+        return value
+
+
+def iter_csv(data, headers=None, encoding='utf-8'):
+    """
+    Lazily converts rows into encoded csv lines - suitable for streaming responses (i.e. webob `app_iter`)
+
+    :param collections.Iterable[list] data: Data to write to csv - consumed as lines are produced
+    :param list[str] headers: Optional csv headers
+    :param str encoding: Encoding of produced lines
+    :rtype: collections.Iterator[bytes]
+    """
+    writer = csv.writer(_CSVLineBuffer())
+    if headers:
+        yield writer.writerow(headers).encode(encoding)
+
+    for row in data:
+        yield writer.writerow(row).encode(encoding)
+
+
 def named_tuple_with_docstring(type_name, field_names, docstring, rename=False):
     named_tuple_type = namedtuple(type_name + "_", field_names, rename=rename)
 
@@ -411,11 +506,44 @@ class PrivateMediaStorage(S3BotoStorage):
         )
 
 
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+_s3_file_urls = ExpiringLRUCache(
+    S3_FILE_URL_CACHE_MAX_SIZE, timedelta(seconds=S3_FILE_URL_TIMEOUT - S3_FILE_URL_MIN_VALIDITY)
+)
+
+
+def get_s3_client():
+    """
+    Returns process-wide S3 client for configured credentials. Building a client is expensive (credentials resolution,
+    loading service model), while built clients are thread-safe - so they are shared by all threads.
+
+    Optional AWS_S3_ENDPOINT_URL setting points the client to S3 compatible service, i.e. local S3 stand-in.
+    """
+    endpoint_url = getattr(settings, 'AWS_S3_ENDPOINT_URL', None)
+    client_key = (settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, endpoint_url)
+    s3_client = _s3_clients.get(client_key)
+    if s3_client is None:
+        with _s3_clients_lock:
+            s3_client = _s3_clients.get(client_key)
+            if s3_client is None:
+                s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    endpoint_url=endpoint_url
+                )
+                _s3_clients[client_key] = s3_client
+    return s3_client
+
+
 def make_s3_link_temporary(group_id, file_sha1, file_name, file_url):
     """
     It will pre-sign url so that it can be accessible for limited time period
     i,e: S3_FILE_URL_TIMEOUT publicly.
 
+    Signed URLs are reused while they stay valid for at least S3_FILE_URL_MIN_VALIDITY.
+
     :param group_id: Workgroup
     :param file_sha1: Calculated when file is uploaded and append to its url
     :param file_name: name of the uploaded file
@@ -424,23 +552,21 @@ def make_s3_link_temporary(group_id, file_sha1, file_name, file_url):
     """
 
     if settings.DEFAULT_FILE_STORAGE == 'storages.backends.s3boto.S3BotoStorage':
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
-        )
-        signed_url = s3_client.generate_presigned_url(
-            ClientMethod='get_object',
-            ExpiresIn=S3_FILE_URL_TIMEOUT,
-            Params={
-                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                'Key': "group_work/{}/{}/{}".format(
-                    group_id,
-                    file_sha1,
-                    file_name
-                )
-            }
+        bucket = settings.AWS_STORAGE_BUCKET_NAME
+        key = "group_work/{}/{}/{}".format(
+            group_id,
+            file_sha1,
+            file_name
         )
+        cache_key = (settings.AWS_ACCESS_KEY_ID, bucket, key, S3_FILE_URL_TIMEOUT)
+        signed_url = _s3_file_urls.get(cache_key)
+        if signed_url is None:
+            signed_url = get_s3_client().generate_presigned_url(
+                ClientMethod='get_object',
+                ExpiresIn=S3_FILE_URL_TIMEOUT,
+                Params={'Bucket': bucket, 'Key': key}
+            )
+            _s3_file_urls.set(cache_key, signed_url)
         return signed_url
     return file_url
 
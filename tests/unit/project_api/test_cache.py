@@ -0,0 +1,168 @@
+from datetime import timedelta
+from unittest import TestCase
+
+import ddt
+import mock
+from django.test import override_settings
+
+import tests.unit.project_api.canned_responses as canned_responses  # pylint: disable=useless-import-alias
+from group_project_v2.project_api import TypedProjectAPI
+from group_project_v2.project_api.api_implementation import WORKGROUP_API
+from group_project_v2.project_api.cache import (
+    API_CACHE_KEY_PREFIX,
+    DjangoCacheBackend,
+    deserialize,
+    get_api_cache_backend,
+    make_api_cache_key,
+    serialize,
+)
+from group_project_v2.project_api.dtos import OrganisationDetails, UserDetails, WorkgroupDetails
+from group_project_v2.utils import ExpiringLRUCache
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'api': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'group-project-v2-api'},
+}
+
+
+@ddt.ddt
+class TestSerialization(TestCase):
+    @ddt.data(
+        None, 1, 'text', [1, 'two', None], {'key': [1, {'nested': True}]}, {'a', 'b'},
+    )
+    def test_json_values(self, value):
+        self.assertEqual(deserialize(serialize(value)), value)
+
+    def test_tuple_is_restored_as_list(self):
+        self.assertEqual(deserialize(serialize((1, 2))), [1, 2])
+
+    def test_workgroup_details(self):
+        workgroup = WorkgroupDetails(**canned_responses.Workgroups.workgroup1)
+
+        restored = deserialize(serialize(workgroup))
+
+        self.assertIsInstance(restored, WorkgroupDetails)
+        self.assertEqual(restored.id, 20)
+        self.assertEqual(restored.groups, workgroup.groups)
+        self.assertEqual([user.username for user in restored.users], ['Alice', 'Derek'])
+        self.assertEqual([user.full_name for user in restored.users], [user.full_name for user in workgroup.users])
+
+    def test_post_processed_attributes_are_kept(self):
+        user = UserDetails(id=1, first_name='Alice', profile_image={'image_url_medium': '/image.png'})
+        organisation = OrganisationDetails(display_name='Org', users=[1, 2])
+
+        restored_user, restored_organisation = deserialize(serialize([user, organisation]))
+
+        self.assertEqual(restored_user.profile_image_url, '/image.png')
+        self.assertEqual(restored_user.full_name, 'Alice')
+        self.assertEqual(restored_organisation.user_ids, {1, 2})
+
+    @ddt.data(object(), {1: 'non-string key'}, [mock.Mock()])
+    def test_unsupported_values(self, value):
+        with self.assertRaises(TypeError):
+            serialize(value)
+
+
+class TestCacheKey(TestCase):
+    def test_key_format(self):
+        key = make_api_cache_key('http://localhost|live', 'get_user_details', (1,), {})
+
+        self.assertTrue(key.startswith(API_CACHE_KEY_PREFIX + ':get_user_details:'))
+        self.assertNotIn(' ', key)
+        self.assertLess(len(key), 250)
+
+    def test_keys_are_unique(self):
+        keys = {
+            make_api_cache_key('http://localhost|live', 'get_user_details', (1,), {}),
+            make_api_cache_key('http://localhost|live', 'get_user_details', ('1',), {}),
+            make_api_cache_key('http://localhost|dry_run', 'get_user_details', (1,), {}),
+            make_api_cache_key('http://localhost|live', 'get_user_groups', (1,), {}),
+            make_api_cache_key('http://localhost|live', 'get_user_groups', (1,), {'group_type': 'permission'}),
+        }
+        self.assertEqual(len(keys), 5)
+
+
+class TestApiCaching(TestCase):
+    def setUp(self):
+        get_api_cache_backend().clear()
+
+    @staticmethod
+    def _patch_send_request(api):
+        return mock.patch.object(
+            api, 'send_request', mock.Mock(return_value=canned_responses.Workgroups.workgroup1)
+        )
+
+    def test_local_cache_by_default(self):
+        self.assertIsInstance(get_api_cache_backend(), ExpiringLRUCache)
+
+    def test_cache_is_shared_between_instances(self):
+        api1, api2 = TypedProjectAPI('http://localhost'), TypedProjectAPI('http://localhost')
+
+        with self._patch_send_request(api1) as send1, self._patch_send_request(api2) as send2:
+            self.assertEqual(api1.get_workgroup_by_id(20).id, 20)
+            self.assertEqual(api2.get_workgroup_by_id(20).id, 20)
+
+        send1.assert_called_once_with(mock.ANY, (WORKGROUP_API, 20))
+        send2.assert_not_called()
+
+    def test_refresh_bypasses_cache(self):
+        api = TypedProjectAPI('http://localhost')
+
+        with self._patch_send_request(api) as send:
+            api.get_workgroup_by_id(20)
+            api.get_workgroup_by_id.refresh(api, 20)
+            api.get_workgroup_by_id(20)
+
+        # refreshed response replaces cached one
+        self.assertEqual(send.call_count, 2)
+
+    def test_dry_run_responses_are_not_shared(self):
+        api, dry_run_api = TypedProjectAPI('http://localhost'), TypedProjectAPI('http://localhost', dry_run=True)
+
+        with self._patch_send_request(api) as send, self._patch_send_request(dry_run_api) as dry_run_send:
+            api.get_workgroup_by_id(20)
+            dry_run_api.get_workgroup_by_id(20)
+
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(dry_run_send.call_count, 1)
+
+    @override_settings(CACHES=SHARED_CACHES, GROUP_PROJECT_V2_API_CACHE='api')
+    def test_django_cache_backend(self):
+        backend = get_api_cache_backend()
+        self.assertIsInstance(backend, DjangoCacheBackend)
+        self.assertEqual(backend.alias, 'api')
+        api = TypedProjectAPI('http://localhost')
+
+        with self._patch_send_request(api) as send:
+            first = api.get_workgroup_by_id(20)
+            second = api.get_workgroup_by_id(20)
+
+        send.assert_called_once_with(mock.ANY, (WORKGROUP_API, 20))
+        # each read deserializes stored entry, so callers can't modify cached value
+        self.assertIsNot(first, second)
+        self.assertEqual(second.id, 20)
+        self.assertEqual([user.id for user in second.users], [17, 20])
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_django_cache_backend_stores_none(self):
+        backend = DjangoCacheBackend('api')
+        backend.set('key', None, timedelta(seconds=10))
+
+        self.assertIsNone(backend.get('key', 'missing'))
+        backend.delete('key')
+        self.assertEqual(backend.get('key', 'missing'), 'missing')
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_django_cache_backend_errors_are_cache_misses(self):
+        backend = DjangoCacheBackend('api')
+        with mock.patch('django.core.cache.backends.locmem.LocMemCache.get', mock.Mock(side_effect=IOError)):
+            self.assertEqual(backend.get('key', 'missing'), 'missing')
+        with mock.patch('django.core.cache.backends.locmem.LocMemCache.set', mock.Mock(side_effect=IOError)):
+            backend.set('key', 'value', timedelta(seconds=10))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_django_cache_backend_skips_unsupported_values(self):
+        backend = DjangoCacheBackend('api')
+        backend.set('key', object(), timedelta(seconds=10))
+
+        self.assertEqual(backend.get('key', 'missing'), 'missing')
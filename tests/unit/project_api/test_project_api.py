@@ -6,9 +6,20 @@ import ddt
 import mock
 
 import tests.unit.project_api.canned_responses as canned_responses  # pylint: disable=useless-import-alias
-from group_project_v2.json_requests import GET
+from group_project_v2.json_requests import DELETE, GET, POST, PUT
 from group_project_v2.project_api import TypedProjectAPI
-from group_project_v2.project_api.api_implementation import COURSES_API, PROJECTS_API, WORKGROUP_API
+from group_project_v2.project_api.api_implementation import (
+    COURSES_API,
+    GROUP_API,
+    PROJECTS_API,
+    SUBMISSION_API,
+    USERS_API,
+    WORKGROUP_API,
+    WORKGROUP_REVIEW_API,
+)
+from group_project_v2.project_api.cache import get_api_cache_backend
+from group_project_v2.project_api.dtos import WorkgroupDetails
+from group_project_v2.request_context import request_scope
 from tests.utils import TestWithPatchesMixin, find_url
 from tests.utils import make_review_item as mri
 
@@ -20,6 +31,8 @@ class TestProjectApi(TestCase, TestWithPatchesMixin):
 
     def setUp(self):
         self.project_api = TypedProjectAPI(self.api_server_address, dry_run=False)
+        # cached responses are shared by all API instances talking to the same server
+        get_api_cache_backend().clear()
 
     def _patch_send_request(self, calls_and_results, missing_callback=None):
         # pylint: disable=unused-argument
@@ -142,7 +155,8 @@ class TestProjectApi(TestCase, TestWithPatchesMixin):
             response = self.project_api.get_workgroups_to_review(user_id, course_id, xblock_id)
 
             review_assignment_groups.assert_called_once_with(user_id, course_id, xblock_id)
-            self.assertEqual(
+            # assignments are fetched concurrently, so calls can be made in any order
+            self.assertCountEqual(
                 workgroups_for_assignment.mock_calls,
                 [mock.call(assignment_id) for assignment_id in assignment_ids]
             )
@@ -182,6 +196,38 @@ class TestProjectApi(TestCase, TestWithPatchesMixin):
 
             self.assertEqual(response, [1, 2, 3] * len(expected_urls))
 
+    def test_get_review_assignment_graph(self):
+        def assignment(assignment_id, content_id):
+            return {'id': assignment_id, 'url': '/url/{}/'.format(assignment_id), 'data': {'xblock_id': content_id}}
+
+        def workgroups(*workgroup_ids):
+            return {'results': [{'id': workgroup_id, 'users': []} for workgroup_id in workgroup_ids]}
+
+        roster_workgroups = [
+            WorkgroupDetails(id=1, groups=[assignment(101, 'content'), assignment(201, 'other_content')]),
+            WorkgroupDetails(id=2, groups=[assignment(101, 'content'), assignment(102, 'content')]),
+            WorkgroupDetails(id=3, groups=[]),
+        ]
+        calls_and_results = {
+            ('url/101', 'users'): {'users': [{'id': 11}, {'id': 12}]},
+            ('url/101', 'workgroups'): workgroups(1, 2),
+            ('url/102', 'users'): {'users': [{'id': 12}]},
+            ('url/102', 'workgroups'): workgroups(2),
+        }
+
+        with self._patch_send_request(calls_and_results) as patched_send_request:
+            graph = self.project_api.get_review_assignment_graph(roster_workgroups, 'content')
+
+        # assignments are taken from workgroup details - only their members are requested
+        requested_urls = [call[1][1] for call in patched_send_request.mock_calls]
+        self.assertCountEqual(requested_urls, list(calls_and_results.keys()))
+
+        self.assertEqual([group.id for group in graph.get_review_subjects(11)], [1, 2])
+        self.assertEqual([group.id for group in graph.get_review_subjects(12)], [1, 2])
+        self.assertEqual(graph.get_reviewer_ids(1), (11, 12))
+        self.assertEqual(graph.get_reviewer_ids(2), (11, 12))
+        self.assertEqual(graph.get_reviewer_ids(3), ())
+
     @ddt.data(
         (1, 2, [mri(1, 'qwe', peer=2), mri(1, 'asd', peer=3)], [mri(1, 'qwe', peer=2)]),
         (
@@ -273,6 +319,33 @@ class TestProjectApi(TestCase, TestWithPatchesMixin):
         self.assert_project_data(project1, canned_responses.Projects.project1['results'][0])
         self.assert_project_data(project2, canned_responses.Projects.project2['results'][0])
 
+    def test_get_latest_workgroup_submissions_by_id(self):
+        submissions = [
+            {'document_id': 'doc1', 'user': 1, 'modified': '2016-01-01T10:00:00Z', 'document_url': 'old'},
+            {'document_id': 'doc1', 'user': 2, 'modified': '2016-01-02T10:00:00Z', 'document_url': 'new'},
+            {'document_id': 'doc2', 'user': 2, 'modified': '2016-01-01T10:00:00Z', 'document_url': 'other'},
+            {'document_id': 'doc3', 'user': None, 'modified': '2016-01-01T10:00:00Z', 'document_url': 'anon'},
+        ]
+
+        def missing_callback(url_parts):
+            return {'id': url_parts[1], 'username': 'user{}'.format(url_parts[1])}
+
+        with self._patch_send_request({(WORKGROUP_API, 20, 'submissions'): submissions}, missing_callback) as patched:
+            result = self.project_api.get_latest_workgroup_submissions_by_id(20)
+
+        self.assertEqual(
+            {doc_id: submission['document_url'] for doc_id, submission in result.items()},
+            {'doc1': 'new', 'doc2': 'other', 'doc3': 'anon'}
+        )
+        self.assertEqual(result['doc1']['user_details'].username, 'user2')
+        self.assertNotIn('user_details', result['doc3'])
+        # details are fetched once per distinct submitting user; cached submissions are not modified
+        self.assertEqual(
+            [call[1][1] for call in patched.mock_calls],
+            [(WORKGROUP_API, 20, 'submissions'), (USERS_API, 2)]
+        )
+        self.assertTrue(all('user_details' not in submission for submission in submissions))
+
     @ddt.data(
         ('course1', 'content1'),
         ('course2', 'content2'),
@@ -325,6 +398,232 @@ class TestProjectApi(TestCase, TestWithPatchesMixin):
         self.assertEqual(len(workgroup.users), len(expected_result['users']))
         self.assertEqual([user.id for user in workgroup.users], [user['id'] for user in expected_result['users']])
 
+    @ddt.data(
+        ([1, 2], [1, 2]),
+        ([2, 1], [2, 1]),
+        ([2, 1, 2, 1], [2, 1]),
+        ([1], [1]),
+        ([], []),
+    )
+    @ddt.unpack
+    def test_get_workgroups_by_ids(self, group_ids, expected_requested_ids):
+        workgroups = {1: canned_responses.Workgroups.workgroup1, 2: canned_responses.Workgroups.workgroup2}
+        calls_and_results = {(WORKGROUP_API, group_id): workgroup for group_id, workgroup in workgroups.items()}
+
+        with self._patch_send_request(calls_and_results) as patched_send_request:
+            result = self.project_api.get_workgroups_by_ids(group_ids)
+            self.assertCountEqual(
+                patched_send_request.mock_calls,
+                [mock.call(GET, (WORKGROUP_API, group_id)) for group_id in expected_requested_ids]
+            )
+
+            # results are memoized, so fetching them individually does not send requests
+            for group_id in expected_requested_ids:
+                self.project_api.get_workgroup_by_id(group_id)
+            self.assertEqual(len(patched_send_request.mock_calls), len(expected_requested_ids))
+
+        expected_ids = {
+            1: canned_responses.Workgroups.workgroup1['id'], 2: canned_responses.Workgroups.workgroup2['id']
+        }
+        self.assertEqual([workgroup.id for workgroup in result], [expected_ids[group_id] for group_id in group_ids])
+
+    def test_get_users_by_ids(self):
+        def missing_callback(url_parts):
+            return {'id': url_parts[1], 'username': 'user{}'.format(url_parts[1])}
+
+        with self._patch_send_request({}, missing_callback):
+            result = self.project_api.get_users_by_ids([3, 1, 2])
+
+        self.assertEqual([user.username for user in result], ['user3', 'user1', 'user2'])
+
+    def test_get_members_data(self):
+        def missing_callback(url_parts):
+            if url_parts[-1] == 'organizations':
+                return [{'display_name': 'Org {}'.format(url_parts[1])}] if url_parts[1] != 2 else []
+            return {'id': url_parts[1], 'username': 'user{}'.format(url_parts[1]), 'organization': 42}
+
+        with self._patch_send_request({}, missing_callback) as patched_send_request:
+            result = self.project_api.get_members_data([3, 1, 2, 3])
+            user_details = self.project_api.get_user_details(3)
+
+        self.assertEqual([user.username for user in result], ['user3', 'user1', 'user2', 'user3'])
+        self.assertEqual([user.organization for user in result], ['Org 3', 'Org 1', 42, 'Org 3'])
+        # each distinct user is resolved once, and resolving organization does not modify cached user details
+        self.assertEqual(len(patched_send_request.mock_calls), 6)
+        self.assertEqual(user_details.organization, 42)
+
+    def test_get_organizations_by_ids(self):
+        def missing_callback(url_parts):
+            return {'display_name': 'Org {}'.format(url_parts[1]), 'users': [url_parts[1]]}
+
+        with self._patch_send_request({}, missing_callback):
+            result = self.project_api.get_organizations_by_ids([7, 5])
+
+        self.assertEqual([org.display_name for org in result], ['Org 7', 'Org 5'])
+        self.assertEqual([org.user_ids for org in result], [{7}, {5}])
+
+    def test_workgroup_review_items_are_cached_until_review_is_submitted(self):
+        review_items = [mri('reviewer', 'q1', content_id='content', answer='1', group=20)]
+        review_items_url = (WORKGROUP_API, 20, 'workgroup_reviews')
+
+        with self._patch_send_request({review_items_url: review_items, 'default': {}}) as patched_send_request:
+            self.assertEqual(self.project_api.get_workgroup_review_items_for_group(20, 'content'), review_items)
+            self.project_api.get_workgroup_review_items_for_group(20, 'content')
+            self.assertEqual(len(patched_send_request.mock_calls), 1)
+
+            self.project_api.submit_workgroup_review_items('reviewer', 20, 'content', {'q1': '1', 'q2': '2'})
+            self.assertEqual(patched_send_request.mock_calls[-1], mock.call(POST, (WORKGROUP_REVIEW_API,), data={
+                "question": 'q2', "answer": '2', "workgroup": 20, "reviewer": 'reviewer', "content_id": 'content'
+            }))
+
+            self.project_api.get_workgroup_review_items_for_group(20, 'content')
+            # submitted review is diffed against review items fetched bypassing the cache
+            self.assertEqual(
+                [call for call in patched_send_request.mock_calls if call[1][1] == review_items_url],
+                [mock.call(GET, review_items_url, query_params={'content_id': 'content'})] * 3
+            )
+
+    def test_workgroup_review_items_invalidated_if_submit_fails(self):
+        with mock.patch.object(self.project_api, 'send_request', mock.Mock(return_value=[])) as patched_send_request:
+            self.project_api.get_workgroup_review_items_for_group(20, 'content')
+
+            patched_send_request.side_effect = IOError
+            with self.assertRaises(IOError):
+                self.project_api.submit_workgroup_review_items('reviewer', 20, 'content', {'q1': '1'})
+
+            patched_send_request.side_effect = None
+            self.project_api.get_workgroup_review_items_for_group(20, 'content')
+
+        self.assertEqual(len(patched_send_request.mock_calls), 3)
+
+    def test_submit_workgroup_review_items(self):
+        def review_item(item_id, question, answer):
+            return dict(mri('reviewer', question, content_id='content', answer=answer, group=20), id=item_id)
+
+        other_review_item = dict(mri('other', 'q1', content_id='content', answer='9', group=20), id=9)
+        review_items = [
+            review_item(1, 'q1', '1'), review_item(2, 'q2', '2'), review_item(3, 'q3', '3'), other_review_item
+        ]
+        for item in review_items:
+            item.update(created='yesterday', modified='yesterday')
+
+        def send_request(method, url_parts, data=None, query_params=None):  # pylint: disable=unused-argument
+            if method == GET:
+                return review_items
+            if method == POST:
+                return dict(data, id=4)
+            if method == PUT:
+                return data
+            return None
+
+        with mock.patch.object(self.project_api, 'send_request', mock.Mock(side_effect=send_request)) as patched:
+            result = self.project_api.submit_workgroup_review_items(
+                'reviewer', 20, 'content', {'q1': '1', 'q2': '5', 'q3': '', 'q4': '4'}
+            )
+
+        new_item_data = {
+            "question": 'q4', "answer": '4', "workgroup": 20, "reviewer": 'reviewer', "content_id": 'content'
+        }
+        self.assertCountEqual(patched.mock_calls[1:], [
+            mock.call(PUT, (WORKGROUP_REVIEW_API, 2), data=review_item(2, 'q2', '5')),
+            mock.call(DELETE, (WORKGROUP_REVIEW_API, 3)),
+            mock.call(POST, (WORKGROUP_REVIEW_API,), data=new_item_data),
+        ])
+        # review items after submission are derived from responses
+        self.assertEqual(result, [
+            other_review_item, review_items[0], review_item(2, 'q2', '5'), dict(new_item_data, id=4)
+        ])
+
+    def test_submit_review_items_fetches_group_items_once(self):
+        own_item = dict(mri('reviewer', 'q1', peer=17, answer='1', group=20), id=1, created='', modified='')
+        other_item = dict(mri('other', 'q1', peer=17, answer='3', group=20), id=2, created='', modified='')
+
+        def send_request(method, url_parts, data=None, query_params=None):  # pylint: disable=unused-argument
+            return [own_item, other_item] if method == GET else data
+
+        with mock.patch.object(self.project_api, 'send_request', mock.Mock(side_effect=send_request)) as patched:
+            result = self.project_api.submit_peer_review_items('reviewer', 17, 20, 'content', {'q1': '2'})
+
+        self.assertEqual([call[1][0] for call in patched.mock_calls], [GET, PUT])
+        self.assertEqual(result, [other_item, dict(mri('reviewer', 'q1', peer=17, answer='2', group=20), id=1)])
+
+    def test_submit_review_items_failure(self):
+        def send_request(method, url_parts, data=None, query_params=None):  # pylint: disable=unused-argument
+            if method == GET:
+                return []
+            if data['question'] == 'q1':
+                raise IOError("API is down")
+            return dict(data, id=1)
+
+        with mock.patch.object(self.project_api, 'send_request', mock.Mock(side_effect=send_request)) as patched:
+            with self.assertRaises(IOError):
+                self.project_api.submit_peer_review_items('reviewer', 17, 20, 'content', {'q1': '1', 'q2': '2'})
+
+        # all changes are attempted
+        self.assertEqual(len([call for call in patched.mock_calls if call[1][0] == POST]), 2)
+
+    def test_submit_review_items_dry_run(self):
+        with self._patch_send_request({'default': {}}):
+            result = self.project_api.submit_peer_review_items('reviewer', 17, 20, 'content', {'q1': '1'})
+
+        self.assertIsNone(result)
+
+    def test_peer_review_items_are_cached_until_review_is_submitted(self):
+        with self._patch_send_request({'default': []}) as patched_send_request:
+            self.project_api.get_peer_review_items_for_group(20, 'content')
+            self.project_api.get_peer_review_items_for_group(20, 'content')
+            self.project_api.submit_peer_review_items('reviewer', 17, 20, 'content', {'q1': '1'})
+            self.project_api.get_peer_review_items_for_group(20, 'content')
+
+        self.assertEqual([call[1][0] for call in patched_send_request.mock_calls], [GET, GET, POST, GET])
+
+    def test_review_item_index_is_built_once_per_request(self):
+        with self._patch_send_request({'default': []}):
+            with request_scope():
+                index = self.project_api.get_peer_review_item_index(20, 'content')
+                self.assertIs(self.project_api.get_peer_review_item_index(20, 'content'), index)
+                self.assertIsNot(self.project_api.get_peer_review_item_index(21, 'content'), index)
+                self.assertIsNot(self.project_api.get_workgroup_review_item_index(20, 'content'), index)
+
+                self.project_api.submit_peer_review_items('reviewer', 17, 20, 'content', {'q1': '1'})
+                self.assertIsNot(self.project_api.get_peer_review_item_index(20, 'content'), index)
+
+            # outside of request scope, index is built on every call
+            index = self.project_api.get_peer_review_item_index(20, 'content')
+            self.assertIsNot(self.project_api.get_peer_review_item_index(20, 'content'), index)
+
+    def test_submit_review_items_ignores_stale_cache(self):
+        # i.e. review was submitted by other LMS worker since review items were cached in this one
+        stored_item = dict(mri('reviewer', 'q1', peer=17, answer='1', group=20), id=1, created='', modified='')
+        with self._patch_send_request({'default': []}):
+            self.project_api.get_peer_review_items_for_group(20, 'content')
+
+        with self._patch_send_request({'default': [stored_item]}) as patched_send_request:
+            result = self.project_api.submit_peer_review_items('reviewer', 17, 20, 'content', {'q1': '1'})
+
+        # answer has not changed, so nothing is written - no duplicate review item is created
+        self.assertEqual([call[1][0] for call in patched_send_request.mock_calls], [GET])
+        self.assertEqual(result, [stored_item])
+
+    def test_workgroup_submissions_are_cached_until_submission_is_created(self):
+        with self._patch_send_request({'default': []}) as patched_send_request:
+            self.project_api.get_workgroup_submissions(20)
+            self.project_api.get_workgroup_submissions(20)
+            self.project_api.get_workgroup_submissions(21)
+            self.project_api.create_submission({'document_id': 'doc', 'workgroup': 20})
+            self.project_api.get_workgroup_submissions(20)
+            self.project_api.get_workgroup_submissions(21)
+
+        self.assertEqual(
+            [call[1][:2] for call in patched_send_request.mock_calls],
+            [
+                (GET, (WORKGROUP_API, 20, 'submissions')),
+                (GET, (WORKGROUP_API, 21, 'submissions')),
+                (POST, (SUBMISSION_API,)),
+                (GET, (WORKGROUP_API, 20, 'submissions')),
+            ]
+        )
+
     @ddt.data(
         ('course1', 'content1'),
         ('course1', 'content2'),
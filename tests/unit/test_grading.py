@@ -0,0 +1,292 @@
+from datetime import datetime
+from unittest import TestCase
+
+import ddt
+import mock
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from freezegun import freeze_time
+
+from group_project_v2.grading import (
+    GRADE_CACHE_EXPIRATION,
+    ActivityGradeRecalculation,
+    GradeCache,
+    GradeCalculator,
+    GradingCheckpoint,
+    GradingPlan,
+    _grading_plans,
+    get_grading_plan,
+)
+from group_project_v2.group_project import GroupActivityXBlock
+from group_project_v2.project_api import TypedProjectAPI
+from group_project_v2.request_context import request_scope
+from tests.utils import make_review_item, make_workgroup
+
+GRADE_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'grades': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'grades'},
+}
+
+
+def _make_question(question_id, required=True):
+    return mock.Mock(question_id=question_id, required=required)
+
+
+class TestGradingPlan(TestCase):
+    def setUp(self):
+        _grading_plans.clear()
+        self.activity = mock.Mock(spec=GroupActivityXBlock, content_id='activity', content_version='v1')
+        self.activity.grade_questions = [_make_question('q1'), _make_question('q2', required=False)]
+
+    def test_plan(self):
+        plan = GradingPlan(self.activity.grade_questions)
+
+        self.assertEqual(len(plan), 2)
+        self.assertEqual(plan.question_ids, ('q1', 'q2'))
+        self.assertEqual(plan.required, (True, False))
+        self.assertEqual(plan.get_question_index('q2'), 1)
+        self.assertIsNone(plan.get_question_index('other_question'))
+        with self.assertRaises(AttributeError):
+            plan.extra = 1  # pylint: disable=assigning-non-slot
+
+    def test_plan_is_cached_per_content_version(self):
+        plan = get_grading_plan(self.activity)
+        self.activity.grade_questions = [_make_question('q3')]
+
+        self.assertIs(get_grading_plan(self.activity), plan)
+
+        self.activity.content_version = 'v2'
+        self.assertEqual(get_grading_plan(self.activity).question_ids, ('q3',))
+
+    def test_no_content_version(self):
+        self.activity.content_version = None
+        plan = get_grading_plan(self.activity)
+        self.activity.grade_questions = [_make_question('q3')]
+
+        # outside of request scope plans are not cached at all
+        self.assertIsNot(get_grading_plan(self.activity), plan)
+
+        with request_scope():
+            plan = get_grading_plan(self.activity)
+            self.activity.grade_questions = []
+            self.assertIs(get_grading_plan(self.activity), plan)
+
+
+@ddt.ddt
+class TestGradeCalculator(TestCase):
+    def setUp(self):
+        self.calculator = GradeCalculator(GradingPlan([_make_question('q1'), _make_question('q2')]))
+
+    def _calculate(self, reviews, group_reviewer_ids):
+        review_items = [make_review_item(reviewer, question, answer=answer) for reviewer, question, answer in reviews]
+        answer_matrix = self.calculator.build_answer_matrix(review_items, lambda reviewer_id: reviewer_id)
+        return self.calculator.calculate(answer_matrix, group_reviewer_ids)
+
+    def test_build_answer_matrix(self):
+        review_items = [
+            make_review_item('anon1', 'q2', answer=20),
+            make_review_item('anon1', 'q1', answer=10),
+            make_review_item('anon2', 'other_question', answer=100),
+        ]
+        matrix = self.calculator.build_answer_matrix(review_items, lambda reviewer_id: reviewer_id[-1])
+
+        self.assertEqual(matrix, {'1': [10, 20], '2': [None, None]})
+
+    @ddt.data(
+        ([], [1], None),  # no reviews
+        ([(1, 'q1', 10)], [1], None),  # incomplete review
+        ([(1, 'q1', 10), (1, 'q2', 20)], [1], 15),
+        ([(1, 'q1', 10), (1, 'q2', 20), (2, 'q1', 30), (2, 'q2', 60)], [1, 2], 30),
+        ([(1, 'q1', 1), (1, 'q2', 2)], [1], 2),  # rounding half up
+        ([(10, 'q1', 20), (10, 'q2', 40)], [], 30),  # admin review only
+        ([(10, 'q1', 20), (10, 'q2', 40), (20, 'q1', 40), (20, 'q2', 60)], [], 40),  # mean of admin reviews
+        ([(1, 'q1', 100), (1, 'q2', 100), (10, 'q1', 20), (10, 'q2', 40)], [1, 2], 65),  # admin fills in for 2
+        ([(1, 'q1', 100), (1, 'q2', 100), (10, 'q1', 20)], [1, 2], None),  # incomplete admin review is ignored
+    )
+    @ddt.unpack
+    def test_calculate(self, reviews, group_reviewer_ids, expected_grade):
+        self.assertEqual(self._calculate(reviews, group_reviewer_ids), expected_grade)
+
+    def test_no_grade_questions(self):
+        calculator = GradeCalculator(GradingPlan([]))
+        matrix = calculator.build_answer_matrix([make_review_item(1, 'q1', answer=10)], lambda reviewer_id: reviewer_id)
+
+        self.assertIsNone(calculator.calculate(matrix, [1]))
+
+
+@override_settings(CACHES=GRADE_CACHES, GROUP_PROJECT_V2_GRADE_CACHE='grades')
+class TestGradeCache(SimpleTestCase):
+    def setUp(self):
+        caches['grades'].clear()
+        self.grade_cache = GradeCache('block-v1:course+type@gp-v2-activity+block@activity')
+
+    def test_sent_grades(self):
+        self.assertFalse(self.grade_cache.is_sent(1, 15, 100))
+
+        self.grade_cache.mark_sent(1, 15, 100)
+
+        self.assertTrue(self.grade_cache.is_sent(1, 15, 100))
+        self.assertFalse(self.grade_cache.is_sent(1, 15, 50))
+        self.assertFalse(self.grade_cache.is_sent(1, 20, 100))
+        self.assertFalse(self.grade_cache.is_sent(2, 15, 100))
+
+    def test_sent_grades_expire(self):
+        with freeze_time(datetime(2020, 1, 1, 12)) as frozen_time:
+            self.grade_cache.mark_sent(1, 15, 100)
+            frozen_time.tick(GRADE_CACHE_EXPIRATION)
+            self.assertFalse(self.grade_cache.is_sent(1, 15, 100))
+
+    def test_clear_sent(self):
+        self.grade_cache.mark_sent(1, 15, 100)
+        self.grade_cache.mark_sent(2, 20, 100)
+        self.grade_cache.mark_sent(3, 25, 100)
+
+        self.grade_cache.clear_sent([1, 2])
+
+        self.assertFalse(self.grade_cache.is_sent(1, 15, 100))
+        self.assertFalse(self.grade_cache.is_sent(2, 20, 100))
+        self.assertTrue(self.grade_cache.is_sent(3, 25, 100))
+
+    @override_settings(GROUP_PROJECT_V2_GRADE_CACHE=None)
+    def test_disabled_by_default(self):
+        self.grade_cache.mark_sent(1, 15, 100)
+        self.assertFalse(self.grade_cache.is_sent(1, 15, 100))
+
+    def test_cache_errors_are_missing_entries(self):
+        with mock.patch('django.core.cache.backends.locmem.LocMemCache.set', mock.Mock(side_effect=IOError)):
+            self.grade_cache.mark_sent(1, 15, 100)
+        self.assertFalse(self.grade_cache.is_sent(1, 15, 100))
+        with mock.patch('django.core.cache.backends.locmem.LocMemCache.get', mock.Mock(side_effect=IOError)):
+            self.assertFalse(self.grade_cache.is_sent(1, 15, 100))
+
+
+class TestGradingCheckpoint(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.checkpoint = GradingCheckpoint('block-v1:course+type@gp-v2-activity+block@activity')
+
+    def test_save_and_load(self):
+        self.assertIsNone(self.checkpoint.load())
+
+        self.checkpoint.save({'processed': 10})
+        self.assertEqual(self.checkpoint.load(), {'processed': 10})
+        self.assertIsNone(GradingCheckpoint('other_activity').load())
+
+        self.checkpoint.clear()
+        self.assertIsNone(self.checkpoint.load())
+
+
+class TestActivityGradeRecalculation(TestCase):
+    # group ID -> (reviews, reviewer IDs)
+    REVIEWS = {
+        1: ([(1, 'q1', 10), (1, 'q2', 20)], [1]),
+        2: ([(2, 'q1', 10)], [2]),
+        3: ([(3, 'q1', 50), (3, 'q2', 50)], [3]),
+        4: ([(4, 'q1', 100), (4, 'q2', 80)], [4]),
+    }
+
+    def setUp(self):
+        caches['default'].clear()
+        self.api = mock.Mock(spec=TypedProjectAPI)
+        self.api.get_workgroup_review_items_for_group.side_effect = lambda group_id, _content_id: [
+            make_review_item(reviewer, question, answer=answer)
+            for reviewer, question, answer in self.REVIEWS[group_id][0]
+        ]
+        self.api.get_workgroup_reviewers.side_effect = lambda group_id, _content_id: [
+            {'id': reviewer_id} for reviewer_id in self.REVIEWS[group_id][1]
+        ]
+        self.api.get_workgroup_by_id.side_effect = lambda group_id: make_workgroup(group_id, [{'id': group_id}])
+
+        self.activity = mock.Mock(spec=GroupActivityXBlock, content_id='activity', course_id='course')
+        self.activity.project_api = self.api
+        self.activity.grading_plan = GradingPlan([_make_question('q1'), _make_question('q2')])
+        self.activity.max_score.return_value = 100
+        self.activity.grade_cache = GradeCache('activity')
+        self.activity.real_user_id.side_effect = lambda reviewer_id: reviewer_id
+
+        self.recalculation = ActivityGradeRecalculation(self.activity, max_workers=2)
+
+    def _sent_grades(self):
+        return {
+            args[0]: args[3] for args, _kwargs in self.api.set_group_grade.call_args_list
+        }
+
+    def test_batches(self):
+        progress = self.recalculation.run_batch([4, 3, 2, 1], batch_size=3)
+
+        self.assertEqual(progress, {
+            'total': 4, 'processed': 3, 'graded': 2, 'ungraded': 1, 'failed': [], 'done': False
+        })
+        self.assertEqual(self._sent_grades(), {1: 15, 3: 50})
+        self.api.set_group_grade.assert_any_call(1, 'course', 'activity', 15, 100)
+        self.assertEqual(
+            self.activity.publish_group_grade.call_args_list,
+            [mock.call(1, 15, mock.ANY), mock.call(3, 50, mock.ANY)]
+        )
+
+        # second run resumes from saved checkpoint
+        progress = ActivityGradeRecalculation(self.activity).run_batch([1, 2, 3, 4], batch_size=3)
+
+        self.assertEqual(progress, {
+            'total': 4, 'processed': 4, 'graded': 3, 'ungraded': 1, 'failed': [], 'done': True
+        })
+        self.assertEqual(self._sent_grades(), {1: 15, 3: 50, 4: 90})
+
+    @override_settings(CACHES=GRADE_CACHES, GROUP_PROJECT_V2_GRADE_CACHE='grades')
+    def test_unchanged_grades_are_not_sent_again(self):
+        caches['grades'].clear()
+        self.activity.grade_cache.mark_sent(1, 15, 100)
+        self.activity.grade_cache.mark_sent(3, 40, 100)
+
+        self.recalculation.run_batch([1, 3])
+
+        self.assertEqual(self._sent_grades(), {3: 50})
+        self.assertEqual(self.activity.publish_group_grade.call_args_list, [mock.call(3, 50, mock.ANY)])
+        # members of a group with unchanged grade are still marked complete
+        self.activity.mark_complete.assert_called_once_with(1)
+        self.assertTrue(self.activity.grade_cache.is_sent(3, 50, 100))
+
+    @override_settings(CACHES=GRADE_CACHES, GROUP_PROJECT_V2_GRADE_CACHE='grades')
+    def test_restart_sends_grades_again(self):
+        caches['default'].clear()
+        caches['grades'].clear()
+        self.recalculation.run_batch([1, 3])
+        self.recalculation.run_batch([1, 3])
+        self.assertEqual(self.api.set_group_grade.call_count, 2)
+
+        self.recalculation.run_batch([1, 3], restart=True)
+
+        self.assertEqual(self.api.set_group_grade.call_count, 4)
+        caches['default'].clear()
+
+    def test_restart(self):
+        self.recalculation.run_batch([1, 2, 3, 4], batch_size=3)
+
+        progress = self.recalculation.run_batch([1, 2, 3, 4], batch_size=1, restart=True)
+
+        self.assertEqual(progress['processed'], 1)
+        self.assertEqual(progress['graded'], 1)
+
+    def test_changed_workgroups_restart_recalculation(self):
+        self.recalculation.run_batch([1, 2, 3], batch_size=3)
+
+        progress = self.recalculation.run_batch([1, 2, 3, 4], batch_size=1)
+
+        self.assertEqual(progress['processed'], 1)
+
+    def test_failures(self):
+        self.api.get_workgroup_reviewers.side_effect = lambda group_id, _content_id: (
+            [{'id': group_id}] if group_id != 3 else self.fail_request()
+        )
+        self.api.set_group_grade.side_effect = lambda group_id, *_args: 1 / (group_id - 4)
+
+        progress = self.recalculation.run_batch([1, 2, 3, 4])
+
+        self.assertEqual(progress['failed'], [3, 4])
+        self.assertEqual(progress['graded'], 2)
+        self.assertTrue(progress['done'])
+        self.assertEqual([args[0] for args, _kwargs in self.activity.publish_group_grade.call_args_list], [1])
+
+    @staticmethod
+    def fail_request():
+        raise IOError("API is down")
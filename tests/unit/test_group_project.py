@@ -1,22 +1,36 @@
 import csv
+import json
 from datetime import datetime
 from unittest import TestCase
 
 import ddt
 import mock
 import pytz
+import webob
+from django.core.cache import caches
+from django.test import override_settings
 from freezegun import freeze_time
 from xblock.field_data import DictFieldData
 from xblock.fields import ScopeIds
 from xblock.runtime import Runtime
 
+from group_project_v2.api_error import ApiError
+from group_project_v2.dashboard import DashboardDetailPage
+from group_project_v2.grading import ActivityGradeRecalculation
 from group_project_v2.group_project import GroupActivityXBlock, GroupProjectXBlock
 from group_project_v2.project_api import TypedProjectAPI
 from group_project_v2.project_api.dtos import ProjectDetails, ReducedUserDetails, WorkgroupDetails
+from group_project_v2.roster import ProjectRoster
 from group_project_v2.stage import BaseGroupActivityStage, PeerReviewStage, TeamEvaluationStage
+from group_project_v2.stage.utils import StageState
 from group_project_v2.stage_components import GroupProjectReviewQuestionXBlock
 from group_project_v2.utils import Constants
-from tests.utils import TestWithPatchesMixin, make_review_item, parse_datetime
+from tests.utils import TestWithPatchesMixin, make_api_error, make_review_item, parse_datetime
+
+GRADE_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'grades': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'grades'},
+}
 
 
 def _make_question(question_id):
@@ -36,6 +50,15 @@ def _make_workgroup(user_ids):
     return WorkgroupDetails(users=[{'id': user_id} for user_id in user_ids])
 
 
+def _make_roster(users, group_size=1):
+    workgroups = []
+    for index in range(0, len(users), group_size):
+        workgroup = WorkgroupDetails(id=index // group_size + 1)
+        workgroup.users = users[index:index + group_size]
+        workgroups.append(workgroup)
+    return ProjectRoster(workgroups)
+
+
 @ddt.ddt
 class TestGroupProjectXBlock(TestWithPatchesMixin, TestCase):
     def setUp(self):
@@ -82,7 +105,7 @@ class TestGroupProjectXBlock(TestWithPatchesMixin, TestCase):
 
         target_stage = mock.Mock(spec=BaseGroupActivityStage)
         target_stage.display_name = 'Stage 1'
-        target_stage.get_users_completion.return_value = (set(completed_users_ids), {'irrelevant'})
+        target_stage.get_materialized_users_completion.return_value = (set(completed_users_ids), {'irrelevant'})
 
         self.runtime_mock.get_block.return_value = target_stage
 
@@ -93,10 +116,10 @@ class TestGroupProjectXBlock(TestWithPatchesMixin, TestCase):
         )
         with mock.patch.object(self.block, 'export_users', mock.Mock(wraps=self.block.export_users)) as export_users, \
                 mock.patch.object(self.block, 'get_workgroups_and_students') as patched_dashboard_params:
-            patched_dashboard_params.return_value = (
-                ['irrelevant'],
-                [ReducedUserDetails(id=uid, first_name="irrelevant", last_name="irrelevant") for uid in all_users_ids]
-            )
+            all_users = [
+                ReducedUserDetails(id=uid, first_name="irrelevant", last_name="irrelevant") for uid in all_users_ids
+            ]
+            patched_dashboard_params.return_value = (_make_roster(all_users), all_users)
 
             response = self.block.download_incomplete_list(request_mock)
             actual_parameters = export_users.call_args_list
@@ -110,13 +133,92 @@ class TestGroupProjectXBlock(TestWithPatchesMixin, TestCase):
         self.assertEqual({user.id for user in args[0]}, set(users_to_export_ids))
         self.assertEqual(args[1], expected_filename)
 
+    def test_reset_completion_tables(self):
+        stages = [mock.Mock(spec=BaseGroupActivityStage, completion_table=mock.Mock()) for _ in range(3)]
+        activities = [mock.Mock(stages=stages[:2]), mock.Mock(stages=stages[2:])]
+        workgroups, users = ['workgroups'], [ReducedUserDetails(id=1), ReducedUserDetails(id=2)]
+        request = webob.Request.blank('/', method='POST', body=b'{}')
+
+        self.make_patch(self.block, 'get_workgroups_and_students', mock.Mock(return_value=(workgroups, users)))
+
+        with mock.patch.object(self.block, 'can_access_dashboard', mock.Mock(return_value=True)), \
+                mock.patch.object(GroupProjectXBlock, 'activities', mock.PropertyMock(return_value=activities)):
+            response = self.block.reset_completion_tables(request)
+
+        self.assertEqual(json.loads(response.body.decode('utf-8')), {'result': 'success', 'stages': 3, 'users': 2})
+        for stage in stages:
+            stage.completion_table.invalidate_users.assert_called_once_with([1, 2])
+            # completion is not recalculated within the request
+            stage.rebuild_users_completion.assert_not_called()
+
+    def test_reset_completion_tables_access_denied(self):
+        stage = mock.Mock(spec=BaseGroupActivityStage, completion_table=mock.Mock())
+        request = webob.Request.blank('/', method='POST', body=b'{}')
+
+        with mock.patch.object(self.block, 'can_access_dashboard', mock.Mock(return_value=False)), \
+                mock.patch.object(GroupProjectXBlock, 'activities', mock.PropertyMock(return_value=[stage])):
+            response = self.block.reset_completion_tables(request)
+
+        self.assertEqual(json.loads(response.body.decode('utf-8'))['result'], 'error')
+        stage.completion_table.invalidate_users.assert_not_called()
+
+    def _call_dashboard_detail_groups(self, data, activities):
+        request = webob.Request.blank('/', method='POST', body=json.dumps(data).encode('utf-8'))
+        self.make_patch(self.block, '_add_students_and_workgroups_to_context')
+        with mock.patch.object(self.block, 'can_access_dashboard', mock.Mock(return_value=True)), \
+                mock.patch.object(GroupProjectXBlock, 'activities', mock.PropertyMock(return_value=activities)):
+            response = self.block.dashboard_detail_groups(request)
+        return json.loads(response.body.decode('utf-8'))
+
+    def test_dashboard_detail_groups(self):
+        activity = mock.Mock(spec=GroupActivityXBlock, id='activity_2')
+        activity.get_dashboard_detail_page.return_value = DashboardDetailPage(
+            groups=[], page=2, num_pages=3, total_groups=120, filtered_out_workgroups=0
+        )
+        activity.render_dashboard_detail_rows.return_value = '<tr></tr>'
+
+        response = self._call_dashboard_detail_groups(
+            {
+                'activity_id': 'activity_2', 'client_filter_id': '7', 'page': '2', 'sort_stage_id': 'stage',
+                'sort_descending': True, 'filter_stage_id': '', 'filter_state': '', 'search': 'bob'
+            },
+            [mock.Mock(spec=GroupActivityXBlock, id='activity_1'), activity]
+        )
+
+        self.assertEqual(
+            response, {'result': 'success', 'html': '<tr></tr>', 'page': 2, 'num_pages': 3, 'total_groups': 120}
+        )
+        expected_context = {Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME: None,
+                            Constants.CURRENT_CLIENT_FILTER_ID_PARAMETER_NAME: 7}
+        activity.get_dashboard_detail_page.assert_called_once_with(
+            expected_context, page=2, sort_stage_id='stage', sort_descending=True,
+            filter_stage_id=None, filter_state=None, search='bob'
+        )
+        activity.render_dashboard_detail_rows.assert_called_once_with(
+            activity.get_dashboard_detail_page.return_value
+        )
+
+    @ddt.data(
+        {'activity_id': 'missing'},
+        {'activity_id': 'activity', 'filter_stage_id': 'stage', 'filter_state': 'bogus'},
+        {'activity_id': 'activity', 'page': 'first'},
+        {},
+    )
+    def test_dashboard_detail_groups_invalid_request(self, data):
+        activity = mock.Mock(spec=GroupActivityXBlock, id='activity')
+
+        response = self._call_dashboard_detail_groups(data, [activity])
+
+        self.assertEqual(response['result'], 'error')
+        activity.get_dashboard_detail_page.assert_not_called()
+
     def test_download_incomplete_list_csv_contents(self):
         request_mock = mock.Mock()
         request_mock.GET = {Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME: 'target_stage_id'}
 
         target_stage = mock.Mock(spec=BaseGroupActivityStage)
         target_stage.display_name = 'Stage 1'
-        target_stage.get_users_completion.return_value = ({1}, {'irrelevant'})
+        target_stage.get_materialized_users_completion.return_value = ({1}, {'irrelevant'})
         all_users = [
             ReducedUserDetails(id=1, first_name="U1", last_name="U1", username='U1', email="u1@example.org"),
             ReducedUserDetails(id=2, first_name="U2", last_name="U2", username='U2', email="u2@example.org"),
@@ -129,7 +231,7 @@ class TestGroupProjectXBlock(TestWithPatchesMixin, TestCase):
         self.runtime_mock.get_block.return_value = target_stage
 
         with mock.patch.object(self.block, 'get_workgroups_and_students') as patched_dashboard_params:
-            patched_dashboard_params.return_value = (['irrelevant'], all_users)
+            patched_dashboard_params.return_value = (_make_roster(all_users), all_users)
 
             response = self.block.download_incomplete_list(request_mock)
 
@@ -141,6 +243,83 @@ class TestGroupProjectXBlock(TestWithPatchesMixin, TestCase):
         self.assertEqual(lines[0], csv_repr(all_users[1]))
         self.assertEqual(lines[1], csv_repr(all_users[2]))
 
+    def test_download_incomplete_list_streamed_in_chunks(self):
+        request_mock = mock.Mock()
+        request_mock.GET = {Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME: 'target_stage_id'}
+        target_stage = mock.Mock(spec=BaseGroupActivityStage, display_name='Stage 1')
+        target_stage.get_materialized_users_completion.return_value = ({1, 4}, set())
+        all_users = [ReducedUserDetails(id=uid, username='U{}'.format(uid)) for uid in range(1, 6)]
+
+        self.runtime_mock.get_block.return_value = target_stage
+        self.make_patch(
+            self.block, 'get_workgroups_and_students', mock.Mock(return_value=(_make_roster(all_users), all_users))
+        )
+        self.make_patch(GroupProjectXBlock, 'EXPORT_CHUNK_SIZE', 2)
+
+        response = self.block.download_incomplete_list(request_mock)
+        # completion is read while response is streamed
+        target_stage.get_materialized_users_completion.assert_not_called()
+
+        lines = list(csv.reader(response.text.splitlines()))
+        self.assertEqual([line[1] for line in lines], ['Username', 'U2', 'U3', 'U5'])
+        chunks = [
+            [user.id for user in users] for (_roster, users), _kwargs in
+            target_stage.get_materialized_users_completion.call_args_list
+        ]
+        self.assertEqual(chunks, [[1, 2], [3, 4], [5]])
+
+    def test_download_incomplete_list_api_error(self):
+        request_mock = mock.Mock()
+        request_mock.GET = {Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME: 'target_stage_id'}
+        target_stage = mock.Mock(spec=BaseGroupActivityStage, display_name='Stage 1')
+        target_stage.get_materialized_users_completion.side_effect = make_api_error(500, "API is down")
+        all_users = [ReducedUserDetails(id=uid, username='U{}'.format(uid)) for uid in range(1, 6)]
+
+        self.runtime_mock.get_block.return_value = target_stage
+        self.make_patch(
+            self.block, 'get_workgroups_and_students', mock.Mock(return_value=(_make_roster(all_users), all_users))
+        )
+
+        response = self.block.download_incomplete_list(request_mock)
+
+        # error is raised while response is streamed, so the server aborts it
+        with self.assertRaises(ApiError):
+            response.body  # pylint: disable=pointless-statement
+
+    def test_download_incomplete_list_all_activity_stages(self):
+        request_mock = mock.Mock()
+        request_mock.GET = {Constants.ACTIVATE_BLOCK_ID_PARAMETER_NAME: 'activity_id'}
+        stages = [
+            mock.Mock(spec=BaseGroupActivityStage, display_name='Stage 1'),
+            mock.Mock(spec=BaseGroupActivityStage, display_name='Stage 2'),
+        ]
+        stages[0].get_materialized_users_completion.return_value = ({1, 2}, set())
+        stages[1].get_materialized_users_completion.return_value = ({1}, {2})
+        activity = mock.Mock(spec=GroupActivityXBlock, display_name='Activity 1', detail_view_stages=stages)
+        all_users = [
+            ReducedUserDetails(id=uid, username='U{}'.format(uid), email='u{}@example.org'.format(uid))
+            for uid in (1, 2, 3)
+        ]
+
+        self.runtime_mock.get_block.return_value = activity
+        self.make_patch(self.block, '_', mock.Mock(side_effect=lambda text: text))
+        self.make_patch(
+            self.block, 'get_workgroups_and_students', mock.Mock(return_value=(_make_roster(all_users), all_users))
+        )
+
+        response = self.block.download_incomplete_list(request_mock)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('_activity_Activity 1_', response.headers['Content-Disposition'])
+        lines = list(csv.reader(response.text.splitlines()))
+        self.assertEqual(lines, [
+            ['Name', 'Username', 'Email', 'Stage 1', 'Stage 2'],
+            ['', 'U2', 'u2@example.org', 'Complete', 'Partially complete'],
+            ['', 'U3', 'u3@example.org', 'Not started', 'Not started'],
+        ])
+        for stage in stages:
+            stage.get_materialized_users_completion.assert_called_once()
+
 
 @ddt.ddt
 class TestGroupActivityXBlock(TestWithPatchesMixin, TestCase):
@@ -259,6 +438,153 @@ class TestGroupActivityXBlock(TestWithPatchesMixin, TestCase):
             )
 
 
+class TestRecalculateGrades(TestWithPatchesMixin, TestCase):
+    def setUp(self):
+        super(TestRecalculateGrades, self).setUp()
+        self.block = GroupActivityXBlock(mock.Mock(spec=Runtime), field_data=DictFieldData({}), scope_ids=mock.Mock())
+        project = mock.Mock(spec=GroupProjectXBlock)
+        project.project_roster = _make_roster([ReducedUserDetails(id=1), ReducedUserDetails(id=2)])
+        self.make_patch(GroupActivityXBlock, 'project', mock.PropertyMock(return_value=project))
+        self.make_patch(self.block, 'can_access_dashboard', mock.Mock(return_value=True))
+        patcher = mock.patch(
+            'group_project_v2.group_project.ActivityGradeRecalculation', mock.Mock(spec=ActivityGradeRecalculation)
+        )
+        self.recalculation_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.recalculation_mock.return_value.run_batch.return_value = {'processed': 2, 'done': True}
+
+    def _call_handler(self, data):
+        request = webob.Request.blank('/', method='POST', body=json.dumps(data).encode('utf-8'))
+        return json.loads(self.block.recalculate_grades(request).body.decode('utf-8'))
+
+    def test_recalculate_grades(self):
+        response = self._call_handler({'batch_size': 20, 'restart': True})
+
+        self.assertEqual(response, {'result': 'success', 'processed': 2, 'done': True})
+        self.recalculation_mock.assert_called_once_with(self.block)
+        self.recalculation_mock.return_value.run_batch.assert_called_once_with({1, 2}, batch_size=20, restart=True)
+
+    def test_recalculate_grades_invalid_batch_size(self):
+        for batch_size in (0, 'all'):
+            self.assertEqual(self._call_handler({'batch_size': batch_size})['result'], 'error')
+        self.recalculation_mock.return_value.run_batch.assert_not_called()
+
+
+@ddt.ddt
+class TestDashboardDetailPage(TestWithPatchesMixin, TestCase):
+    def setUp(self):
+        super(TestDashboardDetailPage, self).setUp()
+        self.block = GroupActivityXBlock(mock.Mock(spec=Runtime), field_data=DictFieldData({}), scope_ids=mock.Mock())
+        self.make_patch(self.block, 'get_ta_review_link', mock.Mock(return_value='ta_link'))
+        self.roster = ProjectRoster([
+            WorkgroupDetails(id=group_id, users=[
+                {'id': group_id * 10 + index, 'email': 'user{}{}@example.com'.format(group_id, index)}
+                for index in (1, 2)
+            ])
+            for group_id in (1, 2, 3, 4, 5)
+        ])
+        self.context = {
+            Constants.TARGET_WORKGROUPS: self.roster,
+            Constants.TARGET_STUDENTS: self.roster.users,
+            Constants.FILTERED_STUDENTS: set(),
+        }
+        # stage1: groups 1 and 4 completed, group 2 partially completed; stage2 - nobody started
+        self.stages = [
+            self._make_stage('stage1', completed={11, 12, 21, 41, 42}),
+            self._make_stage('stage2', completed=set()),
+        ]
+        self.make_patch(GroupActivityXBlock, 'stages', mock.PropertyMock(return_value=self.stages))
+
+    @staticmethod
+    def _make_stage(stage_id, completed):
+        stage = mock.Mock(spec=BaseGroupActivityStage)
+        stage.id = stage_id
+        stage.shown_on_detail_view = True
+        stage.get_materialized_users_completion.side_effect = lambda workgroups, users: (
+            {user.id for user in users} & completed, set()
+        )
+        stage.get_external_group_status.return_value = StageState.NOT_AVAILABLE
+        stage.get_external_status_label.return_value = ''
+        return stage
+
+    @staticmethod
+    def _group_ids(detail_page):
+        return [group['id'] for group in detail_page.groups]
+
+    @ddt.data(
+        (1, 1, [1, 2]),
+        (3, 3, [5]),
+        (42, 3, [5]),
+        (0, 1, [1, 2]),
+    )
+    @ddt.unpack
+    def test_pagination(self, page, expected_page, expected_group_ids):
+        detail_page = self.block.get_dashboard_detail_page(self.context, page=page, page_size=2)
+
+        self.assertEqual(self._group_ids(detail_page), expected_group_ids)
+        self.assertEqual(detail_page.page, expected_page)
+        self.assertEqual(detail_page.num_pages, 3)
+        self.assertEqual(detail_page.total_groups, 5)
+        self.assertEqual(detail_page.filtered_out_workgroups, 0)
+
+    def test_stats_are_computed_for_page_groups(self):
+        detail_page = self.block.get_dashboard_detail_page(self.context, page=2, page_size=2)
+
+        self.assertEqual(self._group_ids(detail_page), [3, 4])
+        self.assertEqual(detail_page.groups[1]['stage_states']['stage1']['internal_status'], StageState.COMPLETED)
+        self.assertEqual(detail_page.groups[0]['users'][0]['stage_states']['stage1'], StageState.NOT_STARTED)
+        for stage in self.stages:
+            (workgroups, users), _kwargs = stage.get_materialized_users_completion.call_args
+            self.assertEqual(workgroups.workgroup_ids, {3, 4})
+            self.assertEqual([user.id for user in users], [31, 32, 41, 42])
+
+    def test_filtered_out_groups(self):
+        self.context[Constants.FILTERED_STUDENTS] = {11, 12, 21}
+
+        detail_page = self.block.get_dashboard_detail_page(self.context)
+
+        self.assertEqual(self._group_ids(detail_page), [2, 3, 4, 5])
+        self.assertEqual(detail_page.filtered_out_workgroups, 1)
+        self.assertEqual(detail_page.total_groups, 4)
+
+    @ddt.data(
+        (False, [3, 5, 2, 1, 4]),
+        (True, [4, 1, 2, 5, 3]),
+    )
+    @ddt.unpack
+    def test_sort_by_stage_state(self, descending, expected_group_ids):
+        detail_page = self.block.get_dashboard_detail_page(
+            self.context, sort_stage_id='stage1', sort_descending=descending
+        )
+
+        self.assertEqual(self._group_ids(detail_page), expected_group_ids)
+
+    @ddt.data(
+        ('stage1', StageState.COMPLETED, [1, 4]),
+        ('stage1', StageState.INCOMPLETE, [2]),
+        ('stage2', StageState.COMPLETED, []),
+        ('stage2', StageState.NOT_STARTED, [1, 2, 3, 4, 5]),
+    )
+    @ddt.unpack
+    def test_filter_by_stage_state(self, stage_id, state, expected_group_ids):
+        detail_page = self.block.get_dashboard_detail_page(
+            self.context, filter_stage_id=stage_id, filter_state=state
+        )
+
+        self.assertEqual(self._group_ids(detail_page), expected_group_ids)
+        self.assertEqual(detail_page.total_groups, len(expected_group_ids))
+        self.assertEqual(detail_page.num_pages, 1)
+
+    def test_search(self):
+        detail_page = self.block.get_dashboard_detail_page(self.context, search='USER3')
+
+        self.assertEqual(self._group_ids(detail_page), [3])
+
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            self.block.get_dashboard_detail_page(self.context, sort_stage_id='missing')
+
+
 @ddt.ddt
 class TestGetDashboardURL(TestWithPatchesMixin, TestCase):
     def setUp(self):
@@ -508,3 +834,20 @@ class TestEventsAndCompletionGroupActivityXBlock(TestWithPatchesMixin, TestCase)
                 grades_posted_mock.assert_called_once_with(
                     group_id, notifications_service_mock
                 )
+
+    @override_settings(CACHES=GRADE_CACHES, GROUP_PROJECT_V2_GRADE_CACHE='grades')
+    def test_unchanged_grade_is_not_sent_again(self):
+        caches['grades'].clear()
+        self.calculate_grade_mock.return_value = 100
+        self.project_api_mock.get_workgroup_by_id.return_value = _make_workgroup([1])
+
+        self.block.calculate_and_send_grade(1)
+        self.block.calculate_and_send_grade(1)
+
+        self.project_api_mock.set_group_grade.assert_called_once()
+        self.assertEqual(self.runtime_mock.publish.call_count, 1)
+        self.assertEqual(self.mark_complete.call_args_list, [mock.call(1), mock.call(1)])
+
+        self.calculate_grade_mock.return_value = 90
+        self.block.calculate_and_send_grade(1)
+        self.assertEqual(self.project_api_mock.set_group_grade.call_count, 2)
@@ -0,0 +1,187 @@
+import json
+import socket
+import threading
+from http.client import IncompleteRead, RemoteDisconnected
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import TestCase
+from urllib.error import HTTPError, URLError
+
+import ddt
+import mock
+
+from group_project_v2 import json_requests
+from group_project_v2.json_requests import DELETE, GET, POST, PUT, ConnectionPool
+
+
+class StubApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _respond(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in (extra_headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        self.server.client_ports.add(self.client_address[1])
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length).decode('utf-8')) if length else None
+
+        if self.path.startswith('/missing'):
+            self._respond(404, {'message': 'Not found'})
+        elif self.path.startswith('/redirect'):
+            self._respond(301, {}, {'Location': '/target/'})
+        else:
+            self._respond(200, {'method': self.command, 'path': self.path, 'data': data})
+            # emulates server dropping keep-alive connection without telling the client
+            self.close_connection = self.path.startswith('/drop')
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+class StubApiServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubApiRequestHandler)
+        self.client_ports = set()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+@ddt.ddt
+class TestJsonRequests(TestCase):
+    def setUp(self):
+        self.server = StubApiServer()
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+        self.pool = ConnectionPool(max_connections_per_host=2, idle_timeout=30)
+        patcher = mock.patch.object(json_requests, 'connection_pool', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    @ddt.data(
+        (GET, (), 'GET', None),
+        (DELETE, (), 'DELETE', None),
+        (POST, ({'answer': 1},), 'POST', {'answer': 1}),
+        (PUT, ({'answer': 2},), 'PUT', {'answer': 2}),
+    )
+    @ddt.unpack
+    def test_methods(self, method, args, expected_method, expected_data):
+        response = method(self.server.url + "/api/server/items/?page=1", *args)
+
+        self.assertEqual(response.code, 200)
+        self.assertEqual(
+            json.loads(response.read().decode('utf-8')),
+            {'method': expected_method, 'path': '/api/server/items/?page=1', 'data': expected_data}
+        )
+
+    @ddt.data((GET, ()), (DELETE, ()), (PUT, ({},)))
+    @ddt.unpack
+    def test_connection_is_reused(self, method, args):
+        for _ in range(10):
+            method(self.server.url + "/api/server/items/", *args)
+
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_post_opens_fresh_connection(self):
+        for _ in range(3):
+            POST(self.server.url + "/api/server/items/", {})
+
+        self.assertEqual(len(self.server.client_ports), 3)
+        # connections are still pooled for idempotent requests, up to the host limit
+        idle_connections = self.pool._idle_connections.values()  # pylint: disable=protected-access
+        self.assertEqual(sum(len(connections) for connections in idle_connections), 2)
+
+    def test_concurrent_requests_respect_host_limit(self):
+        threads = [
+            threading.Thread(target=GET, args=(self.server.url + "/api/server/items/",))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(len(self.server.client_ports), self.pool.max_connections_per_host)
+
+    def test_idle_connections_are_evicted(self):
+        self.pool.idle_timeout = 0
+        GET(self.server.url + "/api/server/items/")
+        GET(self.server.url + "/api/server/items/")
+
+        self.assertEqual(len(self.server.client_ports), 2)
+
+    def test_stale_connection_is_replaced(self):
+        GET(self.server.url + "/drop/")
+
+        response = GET(self.server.url + "/api/server/items/")
+        self.assertEqual(response.code, 200)
+        self.assertEqual(len(self.server.client_ports), 2)
+
+    @ddt.data(
+        (RemoteDisconnected('closed'), 2),
+        (ConnectionResetError(), 2),
+        (BrokenPipeError(), 2),
+        (socket.timeout('timed out'), 1),
+        (IncompleteRead(b''), 1),
+    )
+    @ddt.unpack
+    def test_only_stale_connection_errors_are_retried(self, error, expected_attempts):
+        GET(self.server.url + "/api/server/items/")
+        original_send = self.pool._send  # pylint: disable=protected-access
+        attempts = []
+
+        def send(connection, *args):
+            attempts.append(connection)
+            if len(attempts) == 1:
+                raise error
+            return original_send(connection, *args)
+
+        with mock.patch.object(self.pool, '_send', send):
+            if expected_attempts == 1:
+                with self.assertRaises(URLError):
+                    GET(self.server.url + "/api/server/items/")
+            else:
+                self.assertEqual(GET(self.server.url + "/api/server/items/").code, 200)
+
+        self.assertEqual(len(attempts), expected_attempts)
+
+    def test_error_response_raises_http_error(self):
+        with self.assertRaises(HTTPError) as raised:
+            GET(self.server.url + "/missing/")
+
+        self.assertEqual(raised.exception.code, 404)
+        self.assertEqual(json.loads(raised.exception.read().decode('utf-8')), {'message': 'Not found'})
+
+        # connection is still usable after error response
+        self.assertEqual(GET(self.server.url + "/api/server/items/").code, 200)
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_redirects_are_followed(self):
+        response = GET(self.server.url + "/redirect/")
+        self.assertEqual(json.loads(response.read().decode('utf-8'))['path'], '/target/')
+
+    def test_put_redirect_is_not_followed(self):
+        with self.assertRaises(HTTPError) as raised:
+            PUT(self.server.url + "/redirect/", {})
+
+        self.assertEqual(raised.exception.code, 301)
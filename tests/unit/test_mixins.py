@@ -14,11 +14,14 @@ from group_project_v2.mixins import (
     ChildrenNavigationXBlockMixin,
     CourseAwareXBlockMixin,
     DashboardRootXBlockMixin,
+    RequestScopedXBlockMixin,
     UserAwareXBlockMixin,
     WorkgroupAwareXBlockMixin,
 )
 from group_project_v2.project_api import TypedProjectAPI
-from group_project_v2.project_api.dtos import UserGroupDetails, WorkgroupDetails
+from group_project_v2.project_api.dtos import OrganisationDetails, UserGroupDetails, WorkgroupDetails
+from group_project_v2.request_context import get_request_context, request_scope
+from group_project_v2.roster import ProjectRoster
 from group_project_v2.utils import Constants, GroupworkAccessDeniedError
 from tests.utils import MockedAuthXBlockMixin, TestWithPatchesMixin, get_mock_project_api, raise_api_error
 
@@ -162,6 +165,41 @@ class TestChildrenNavigationXBlockMixin(TestWithPatchesMixin, TestCase):
         self.assertFalse(child2.render.called)
 
 
+class RenderingGuineaPig(object):
+    def render(self, view, context=None):
+        return view, context, get_request_context()
+
+    def handle(self, handler_name, request, suffix=''):
+        return handler_name, request, suffix, get_request_context()
+
+
+class RequestScopedXBlockMixinGuineaPig(RequestScopedXBlockMixin, RenderingGuineaPig):
+    pass
+
+
+class TestRequestScopedXBlockMixin(TestCase):
+    def setUp(self):
+        self.block = RequestScopedXBlockMixinGuineaPig()
+
+    def test_render_runs_in_request_scope(self):
+        view, context, request_context = self.block.render('student_view', {'key': 'value'})
+
+        self.assertEqual((view, context), ('student_view', {'key': 'value'}))
+        self.assertIsNotNone(request_context)
+        self.assertIsNone(get_request_context())
+
+    def test_handle_runs_in_request_scope(self):
+        handler_name, request, suffix, request_context = self.block.handle('handler', 'request', 'suffix')
+
+        self.assertEqual((handler_name, request, suffix), ('handler', 'request', 'suffix'))
+        self.assertIsNotNone(request_context)
+        self.assertIsNone(get_request_context())
+
+    def test_nested_render_joins_request_scope(self):
+        with request_scope() as request_context:
+            self.assertIs(self.block.render('student_view')[2], request_context)
+
+
 class CourseAwareXBlockMixinGuineaPig(CommonMixinGuineaPig, CourseAwareXBlockMixin):
     pass
 
@@ -309,6 +347,26 @@ class TestWorkgroupAwareXBlockMixin(TestCase, TestWithPatchesMixin):
             user_id, course_id
         )
 
+    def test_workgroup_shared_by_blocks_in_request_scope(self):
+        self.user_id_mock.return_value = 1
+        self.course_id_mock.return_value = 'course'
+        self.project_api_mock.get_user_preferences.return_value = {}
+        self.project_api_mock.get_user_workgroup_for_course.return_value = {'users': [1], 'id': 12}
+        other_block = WorkgroupAwareXBlockMixinGuineaPig()
+
+        with request_scope():
+            self.assertEqual(self.block.workgroup, {'users': [1], 'id': 12})
+            self.assertEqual(self.block.workgroup, other_block.workgroup)
+            self.assertEqual(self.block.user_preferences, other_block.user_preferences)
+
+        self.project_api_mock.get_user_preferences.assert_called_once_with(1)
+        self.project_api_mock.get_user_workgroup_for_course.assert_called_once_with(1, 'course')
+
+        # nothing is kept between requests
+        with request_scope():
+            self.assertEqual(self.block.workgroup, {'users': [1], 'id': 12})
+        self.assertEqual(self.project_api_mock.get_user_workgroup_for_course.call_count, 2)
+
     @ddt.data(
         (1, {'users': [1], 'id': 12}),
         (2, {'users': [1, 2, 3, 4], 'id': 1})
@@ -521,6 +579,8 @@ class TestAuthXBlockMixinSettings(TestCase, TestWithPatchesMixin):
 @ddt.ddt
 class TestDashboardRootXBlockMixin(TestCase, TestWithPatchesMixin):
     class DashboardRootXBlockMixinGuineaPig(MockedAuthXBlockMixin, DashboardRootXBlockMixin):
+        content_id = 'content_id'
+
         def __init__(self):
             self._project_details = mock.Mock()
 
@@ -577,17 +637,68 @@ class TestDashboardRootXBlockMixin(TestCase, TestWithPatchesMixin):
 
         self.assertEqual([user.id for user in users], expected_user_ids)
 
+    def test_project_roster_built_once_per_request(self):
+        self.block.project_details.workgroups = [1, 2]
+        self.project_api_mock.get_workgroup_by_id.side_effect = lambda group_id: WorkgroupDetails(
+            id=group_id, users=[{'id': group_id * 10}]
+        )
+
+        with request_scope():
+            workgroups, students = self.block.get_workgroups_and_students()
+            self.assertIs(self.block.project_roster, workgroups)
+            self.assertEqual(list(self.block.all_users_in_workgroups), list(students))
+
+        self.assertEqual([workgroup.id for workgroup in workgroups], [1, 2])
+        self.assertEqual([user.id for user in students], [10, 20])
+        self.assertEqual(self.project_api_mock.get_workgroups_by_ids.call_count, 1)
+
+    @ddt.data(
+        # user can access organization 1 only
+        (False, None, {1: [1, 2], 2: [3]}, [1], {3, 4}),
+        # ... or organizations 1 and 2
+        (False, None, {1: [1, 2], 2: [3]}, [1, 2], {4}),
+        # filtering by accessible organization
+        (False, 2, {1: [1, 2], 2: [3]}, [1, 2], {1, 2, 4}),
+        # filtering by organization user can't access
+        (False, 2, {1: [1, 2], 2: [3]}, [1], {1, 2, 3, 4}),
+        # user can access all organizations - nothing is filtered
+        (True, None, {1: [1, 2], 2: [3]}, [1], set()),
+        (True, None, {1: [1, 2], 2: [3]}, [], set()),
+        (True, 1, {1: [1, 2], 2: [3]}, [], {3, 4}),
+    )
+    @ddt.unpack
+    def test_add_students_and_workgroups_to_context_filtering(
+            self, access_all_orgs, filter_org_id, org_members, user_org_ids, expected_filtered
+    ):
+        context = {Constants.CURRENT_CLIENT_FILTER_ID_PARAMETER_NAME: filter_org_id}
+        workgroup_value = [
+            WorkgroupDetails(id=1, users=[{'id': 1}, {'id': 4}]),
+            WorkgroupDetails(id=2, users=[{'id': 2}, {'id': 3}])
+        ]
+        self.make_patch(type(self.block), 'workgroups', mock.PropertyMock(return_value=workgroup_value))
+        self.make_patch(type(self.block), '_can_user_access_all_orgs', mock.Mock(return_value=access_all_orgs))
+        self.project_api_mock.get_user_organizations.return_value = [{'id': org_id} for org_id in user_org_ids]
+        self.project_api_mock.get_organizations_by_ids.side_effect = lambda org_ids: [
+            OrganisationDetails(users=org_members[org_id]) for org_id in org_ids
+        ]
+
+        self.block._add_students_and_workgroups_to_context(context)
+        self.assertIsInstance(context[Constants.TARGET_WORKGROUPS], ProjectRoster)
+        self.assertEqual(list(context[Constants.TARGET_WORKGROUPS]), workgroup_value)
+        self.assertEqual([user.id for user in context[Constants.TARGET_STUDENTS]], [1, 4, 2, 3])
+        self.assertEqual(context[Constants.FILTERED_STUDENTS], expected_filtered)
+        # organization membership is fetched in bulk
+        self.assertLessEqual(self.project_api_mock.get_organizations_by_ids.call_count, 1)
+
     def test_add_students_and_workgroups_to_context(self):
         context = {}
         workgroup_value = [
             WorkgroupDetails(id=1, users=[{'id': 1}]),
             WorkgroupDetails(id=2, users=[{'id': 2}, {'id': 3}])
         ]
-        users_value = ['user_sentinel']
         self.make_patch(type(self.block), 'workgroups', mock.PropertyMock(return_value=workgroup_value))
-        self.make_patch(type(self.block), 'all_users_in_workgroups', mock.PropertyMock(return_value=users_value))
 
         self.block._add_students_and_workgroups_to_context(context)
-        self.assertEqual(context[Constants.TARGET_WORKGROUPS], workgroup_value)
-        self.assertEqual(context[Constants.TARGET_STUDENTS], users_value)
+        self.assertEqual(list(context[Constants.TARGET_WORKGROUPS]), workgroup_value)
+        self.assertEqual([user.id for user in context[Constants.TARGET_STUDENTS]], [1, 2, 3])
         self.assertEqual(context[Constants.FILTERED_STUDENTS], set())
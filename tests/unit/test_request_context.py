@@ -0,0 +1,135 @@
+from unittest import TestCase
+
+import mock
+
+from group_project_v2.request_context import (
+    defer_to_request_end,
+    get_request_context,
+    invalidate_request_cached,
+    request_cached,
+    request_scope,
+    request_scoped,
+    run_deferred,
+    update_request_cached,
+)
+
+
+class TestRequestContext(TestCase):
+    def setUp(self):
+        self.factory = mock.Mock(side_effect=lambda: object())
+
+    def test_outside_of_request_scope(self):
+        self.assertIsNone(get_request_context())
+        self.assertIsNot(request_cached('key', self.factory), request_cached('key', self.factory))
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_values_computed_once_per_request(self):
+        with request_scope():
+            first = request_cached('key', self.factory)
+            self.assertIs(request_cached('key', self.factory), first)
+            request_cached('other_key', self.factory)
+
+        with request_scope():
+            self.assertIsNot(request_cached('key', self.factory), first)
+
+        self.assertEqual(self.factory.call_count, 3)
+
+    def test_nested_scopes_share_context(self):
+        with request_scope() as outer_context:
+            value = request_cached('key', self.factory)
+            with request_scope() as inner_context:
+                self.assertIs(inner_context, outer_context)
+                self.assertIs(request_cached('key', self.factory), value)
+
+            # closing nested scope does not discard the context
+            self.assertIs(get_request_context(), outer_context)
+
+        self.assertIsNone(get_request_context())
+        self.factory.assert_called_once_with()
+
+    def test_reopen_context(self):
+        with request_scope() as context:
+            value = request_cached('key', self.factory)
+
+        # i.e. generator consumed after the request returned
+        with request_scope(context) as reopened_context:
+            self.assertIs(reopened_context, context)
+            self.assertIs(request_cached('key', self.factory), value)
+
+        self.assertIsNone(get_request_context())
+        self.factory.assert_called_once_with()
+
+    def test_deferred_calls_are_coalesced(self):
+        calls = []
+        with request_scope():
+            defer_to_request_end('first', lambda: calls.append('first: 1'))
+            defer_to_request_end('second', lambda: calls.append('second'))
+            defer_to_request_end('first', lambda: calls.append('first: 2'))
+            self.assertEqual(calls, [])
+
+            run_deferred()
+            self.assertEqual(calls, ['second', 'first: 2'])
+
+            # calls deferred after that are run when the scope is closed
+            defer_to_request_end('first', lambda: calls.append('first: 3'))
+
+        self.assertEqual(calls, ['second', 'first: 2', 'first: 3'])
+
+    def test_deferred_calls_dropped_on_error(self):
+        func = mock.Mock()
+        with self.assertRaises(ValueError):
+            with request_scope():
+                defer_to_request_end('key', func)
+                raise ValueError()
+
+        func.assert_not_called()
+
+    def test_deferred_call_outside_of_request_scope(self):
+        func = mock.Mock()
+        defer_to_request_end('key', func)
+        func.assert_called_once_with()
+
+    def test_context_discarded_on_error(self):
+        with self.assertRaises(ValueError):
+            with request_scope():
+                raise ValueError()
+
+        self.assertIsNone(get_request_context())
+
+    def test_failed_computation_is_not_cached(self):
+        self.factory.side_effect = [ValueError(), 'value']
+        with request_scope():
+            with self.assertRaises(ValueError):
+                request_cached('key', self.factory)
+            self.assertEqual(request_cached('key', self.factory), 'value')
+
+    def test_invalidate(self):
+        with request_scope():
+            first = request_cached('key', self.factory)
+            invalidate_request_cached('key')
+            self.assertIsNot(request_cached('key', self.factory), first)
+
+        # noop outside of request scope
+        invalidate_request_cached('key')
+
+    def test_update(self):
+        with request_scope():
+            request_cached('key', self.factory)
+            update_request_cached('key', 'updated')
+            self.assertEqual(request_cached('key', self.factory), 'updated')
+
+            update_request_cached('key', None)
+            self.assertIsNot(request_cached('key', self.factory), 'updated')
+
+        # noop outside of request scope
+        update_request_cached('key', 'updated')
+        self.assertIsNot(request_cached('key', self.factory), 'updated')
+
+    def test_request_scoped(self):
+        @request_scoped
+        def get_values():
+            return request_cached('key', self.factory), request_cached('key', self.factory)
+
+        first, second = get_values()
+        self.assertIs(first, second)
+        self.assertIsNone(get_request_context())
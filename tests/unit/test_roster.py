@@ -0,0 +1,119 @@
+from unittest import TestCase
+
+from group_project_v2.project_api.dtos import WorkgroupDetails
+from group_project_v2.roster import ProjectRoster, ReviewAssignmentGraph, ReviewItemIndex
+from tests.utils import make_review_item as mri
+
+
+class TestProjectRoster(TestCase):
+    def setUp(self):
+        self.workgroups = [
+            WorkgroupDetails(id=1, users=[{'id': 11}, {'id': 12}]),
+            WorkgroupDetails(id=2, users=[{'id': 21}]),
+            WorkgroupDetails(id=3, users=[]),
+        ]
+        self.roster = ProjectRoster(iter(self.workgroups))
+
+    def test_workgroups(self):
+        self.assertEqual(self.roster.workgroups, tuple(self.workgroups))
+        # roster can be iterated multiple times
+        self.assertEqual(list(self.roster), self.workgroups)
+        self.assertEqual(list(self.roster), self.workgroups)
+        self.assertEqual(len(self.roster), 3)
+        self.assertEqual(self.roster.workgroup_ids, {1, 2, 3})
+
+    def test_users(self):
+        self.assertEqual([user.id for user in self.roster.users], [11, 12, 21])
+        self.assertEqual(self.roster.user_ids, {11, 12, 21})
+
+    def test_get_user_workgroup(self):
+        self.assertIs(self.roster.get_user_workgroup(12), self.workgroups[0])
+        self.assertIs(self.roster.get_user_workgroup(21), self.workgroups[1])
+        self.assertIsNone(self.roster.get_user_workgroup(42))
+        self.assertEqual(set(self.roster.workgroup_by_user_id), {11, 12, 21})
+
+    def test_subset(self):
+        subset = self.roster.subset(self.workgroups[1:2])
+
+        self.assertEqual(subset.workgroup_ids, {2})
+        self.assertEqual(subset.user_ids, {21})
+        self.assertIs(subset.project_roster, self.roster)
+        self.assertIs(subset.subset([]).project_roster, self.roster)
+        self.assertIs(self.roster.project_roster, self.roster)
+
+    def test_immutable(self):
+        with self.assertRaises(TypeError):
+            # pylint: disable=unsupported-assignment-operation
+            self.roster.workgroup_by_user_id[42] = self.workgroups[0]
+        with self.assertRaises(AttributeError):
+            self.roster.workgroups = []
+        with self.assertRaises(AttributeError):
+            self.roster.extra_attribute = 1  # pylint: disable=attribute-defined-outside-init
+
+
+class TestReviewAssignmentGraph(TestCase):
+    def setUp(self):
+        self.workgroups = {
+            workgroup_id: WorkgroupDetails(id=workgroup_id, users=[]) for workgroup_id in (1, 2, 3)
+        }
+        self.graph = ReviewAssignmentGraph([
+            ([11, 12], [self.workgroups[2], self.workgroups[3]]),
+            ([12, 21], iter([self.workgroups[1], self.workgroups[2]])),
+        ])
+
+    def test_get_review_subjects(self):
+        self.assertEqual(self.graph.get_review_subjects(11), (self.workgroups[2], self.workgroups[3]))
+        # workgroup 2 is assigned to user 12 by both assignments, but is reviewed once
+        self.assertEqual(
+            self.graph.get_review_subjects(12), (self.workgroups[2], self.workgroups[3], self.workgroups[1])
+        )
+        self.assertEqual(self.graph.get_review_subjects(21), (self.workgroups[1], self.workgroups[2]))
+        self.assertEqual(self.graph.get_review_subjects(42), ())
+
+    def test_get_reviewer_ids(self):
+        self.assertEqual(self.graph.get_reviewer_ids(1), (12, 21))
+        self.assertEqual(self.graph.get_reviewer_ids(2), (11, 12, 21))
+        self.assertEqual(self.graph.get_reviewer_ids(3), (11, 12))
+        self.assertEqual(self.graph.get_reviewer_ids(42), ())
+
+
+class TestReviewItemIndex(TestCase):
+    def setUp(self):
+        self.items = [
+            mri('anon1', 'q1', peer=11), mri('anon1', 'q2', peer='11'), mri('anon1', 'q1', peer=12),
+            mri('anon2', 'q1', peer=11), mri(3, 'q2', peer=12),
+        ]
+        self.index = ReviewItemIndex(self.items, 'user')
+
+    def test_get_items(self):
+        items = self.items
+        self.assertEqual(self.index.get_items(), tuple(items))
+        self.assertEqual(self.index.get_items(reviewer_id='anon1'), tuple(items[:3]))
+        self.assertEqual(self.index.get_items(subject_id=11), (items[0], items[1], items[3]))
+        self.assertEqual(self.index.get_items(question_id='q2'), (items[1], items[4]))
+        self.assertEqual(self.index.get_items(reviewer_id='anon1', subject_id='11'), tuple(items[:2]))
+        self.assertEqual(self.index.get_items(subject_id=12, question_id='q1'), (items[2],))
+        self.assertEqual(self.index.get_items(reviewer_id='3', subject_id=12, question_id='q2'), (items[4],))
+        self.assertEqual(self.index.get_items(reviewer_id='anon3'), ())
+
+    def test_reviewer_ids(self):
+        self.assertEqual(list(self.index.reviewer_ids), ['anon1', 'anon2', 3])
+        self.assertEqual(len(self.index), 5)
+
+    def test_reviewer_ids_are_not_normalized(self):
+        index = ReviewItemIndex([mri('4', 'q1', peer=11), mri(4, 'q2', peer=11)], 'user')
+
+        self.assertEqual(index.reviewer_ids, ('4',))
+        self.assertEqual(len(index.get_items(reviewer_id=index.reviewer_ids[0])), 2)
+
+    def test_thousands_of_items(self):
+        items = [
+            mri('anon{}'.format(reviewer), 'q{}'.format(question), peer=subject, answer=reviewer * subject)
+            for reviewer in range(20) for subject in range(20) for question in range(10)
+        ]
+        index = ReviewItemIndex(items, 'user')
+
+        self.assertEqual(len(index), 4000)
+        self.assertEqual(index.get_items(reviewer_id='anon7', subject_id=3, question_id='q5'), (items[7 * 200 + 35],))
+        self.assertEqual(len(index.get_items(reviewer_id='anon7', subject_id=3)), 10)
+        self.assertEqual(len(index.get_items(subject_id=3, question_id='q5')), 20)
@@ -7,6 +7,7 @@ from xml.etree import ElementTree
 import ddt
 import mock
 import pytz
+from django.core.exceptions import ValidationError
 from freezegun import freeze_time
 from xblock.field_data import DictFieldData
 from xblock.fields import ScopeIds
@@ -16,17 +17,21 @@ from xblock.validation import ValidationMessage
 from group_project_v2 import messages
 from group_project_v2.group_project import GroupActivityXBlock
 from group_project_v2.project_api import TypedProjectAPI
-from group_project_v2.project_api.dtos import WorkgroupDetails
+from group_project_v2.project_api.dtos import ReducedUserDetails, WorkgroupDetails
 from group_project_v2.project_navigator import ProjectNavigatorViewXBlockBase
-from group_project_v2.stage import BaseGroupActivityStage
+from group_project_v2.request_context import request_scope
+from group_project_v2.roster import ReviewItemIndex
+from group_project_v2.stage import BaseGroupActivityStage, TeamEvaluationStage
+from group_project_v2.stage.utils import ReviewState
 from group_project_v2.stage_components import (
     GroupProjectGradeEvaluationDisplayXBlock,
     GroupProjectReviewQuestionXBlock,
     GroupProjectSubmissionXBlock,
     GroupProjectTeamEvaluationDisplayXBlock,
+    PeerSelectorXBlock,
     StaticContentBaseXBlock,
 )
-from group_project_v2.upload_file import UploadFile
+from group_project_v2.upload_file import DEFAULT_MAX_UPLOAD_SIZE, UploadFile
 from tests.utils import TestWithPatchesMixin, make_api_error, make_question
 from tests.utils import make_review_item as mri
 
@@ -191,6 +196,19 @@ class TestGroupProjectSubmissionXBlock(StageComponentXBlockTestBase):
         self.project_api_mock.get_latest_workgroup_submissions_by_id.return_value = {1: {}, 2: {}}
         self.assertIsNone(self.block.upload)
 
+    def test_upload_snapshot_is_shared_within_request(self):
+        self.block.upload_id = 150
+        self.project_api_mock.get_latest_workgroup_submissions_by_id.return_value = {1: {}, 2: {}}
+
+        with request_scope():
+            self.assertIsNone(self.block.upload)
+            self.assertIsNone(self.block.get_upload(self.group_id))
+            self.project_api_mock.get_latest_workgroup_submissions_by_id.assert_called_once_with(self.group_id)
+
+            self.block.invalidate_latest_workgroup_submissions(self.group_id)
+            self.assertIsNone(self.block.upload)
+            self.assertEqual(self.project_api_mock.get_latest_workgroup_submissions_by_id.call_count, 2)
+
     def test_upload_submission_stage_is_not_available(self):
         self.stage_mock.available_now = False
         self.stage_mock.STAGE_ACTION = 'something'
@@ -265,7 +283,7 @@ class TestGroupProjectSubmissionXBlock(StageComponentXBlockTestBase):
         with mock.patch.object(self.block, 'persist_and_submit_file') as patched_persist_and_submit_file:
             uploaded_file_mock = mock.Mock()
             uploaded_file_mock.submission_id = submission_id
-            uploaded_file_mock.file_url = file_url
+            uploaded_file_mock.location = file_url
             patched_persist_and_submit_file.return_value = uploaded_file_mock
 
             response = self.block.upload_submission(request_mock)
@@ -282,6 +300,151 @@ class TestGroupProjectSubmissionXBlock(StageComponentXBlockTestBase):
                 self.stage_mock.activity, expected_context, uploaded_file
             )
 
+    def test_upload_submission_completion_invalidated_if_mark_complete_fails(self):
+        upload_id = "upload_id"
+        request_mock = mock.Mock()
+        request_mock.params = {upload_id: mock.Mock()}
+        request_mock.params[upload_id].file = self._make_file()
+        self.block.upload_id = upload_id
+        self.stage_mock.check_submissions_and_mark_complete = mock.Mock(side_effect=make_api_error(500, "failed"))
+
+        with mock.patch.object(self.block, 'persist_and_submit_file') as patched_persist_and_submit_file:
+            patched_persist_and_submit_file.return_value = mock.Mock(submission_id='sub1', location='file.html')
+            response = self.block.upload_submission(request_mock)
+
+        self.assertEqual(response.status_code, 500)
+        invalidated_user_ids = self.stage_mock.completion_table.invalidate_users.call_args[0][0]
+        self.assertEqual(
+            list(invalidated_user_ids), [user.id for user in self.stage_mock.activity.workgroup.users]
+        )
+
+    @staticmethod
+    def _make_json_request(data):
+        request_mock = mock.Mock()
+        request_mock.body = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+        return request_mock
+
+    def _patch_direct_uploads(self, enabled=True):
+        return mock.patch(
+            'group_project_v2.direct_uploads.direct_uploads_enabled', mock.Mock(return_value=enabled)
+        )
+
+    def test_get_upload_policy(self):
+        self.block.upload_id = 'upload_id'
+        with self._patch_direct_uploads(), \
+                mock.patch('group_project_v2.direct_uploads.DirectUpload') as direct_upload_class:
+            direct_upload_class.make_key.return_value = 'key'
+            upload = direct_upload_class.return_value
+            upload.key = 'key'
+            upload.make_policy.return_value = {'url': 'https://bucket.s3.amazonaws.com/', 'fields': {'key': 'key'}}
+
+            response = self.block.get_upload_policy(self._make_json_request({'file_name': 'report.pdf'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.text), {
+            'url': 'https://bucket.s3.amazonaws.com/', 'fields': {'key': 'key'}, 'key': 'key'
+        })
+        direct_upload_class.make_key.assert_called_once_with(self.group_id, 'report.pdf')
+        self.assertEqual(direct_upload_class.call_args[0][:2], ('key', 'upload_id'))
+        upload.make_policy.assert_called_once_with(DEFAULT_MAX_UPLOAD_SIZE)
+
+    @ddt.data(
+        (True, {'file_name': 'malware.exe'}, 400),
+        (True, {}, 400),
+        (True, b'', 400),
+        (True, b'{"file_name": ', 400),
+        (True, ['report.pdf'], 400),
+        (True, {'file_name': 42}, 400),
+        (False, {'file_name': 'report.pdf'}, 404),
+    )
+    @ddt.unpack
+    def test_get_upload_policy_rejected(self, enabled, data, expected_code):
+        with self._patch_direct_uploads(enabled), \
+                mock.patch('group_project_v2.direct_uploads.DirectUpload') as direct_upload_class:
+            response = self.block.get_upload_policy(self._make_json_request(data))
+
+        self.assertEqual(response.status_code, expected_code)
+        self.assertEqual(json.loads(response.text)['result'], 'error')
+        direct_upload_class.assert_not_called()
+
+    def test_get_upload_policy_not_group_member(self):
+        self.stage_mock.is_group_member = False
+        self.stage_mock.is_admin_grader = False
+
+        with self._patch_direct_uploads():
+            response = self.block.get_upload_policy(self._make_json_request({'file_name': 'report.pdf'}))
+        self.assertEqual(response.status_code, 403)
+
+    @freeze_time("2015-08-01")
+    def test_confirm_upload(self):
+        self.block.upload_id = 'upload_id'
+        self.stage_mock.activity.content_id = 'content_id'
+        self.stage_mock.get_new_stage_state_data = mock.Mock(return_value={'state': 'complete'})
+        self.stage_mock.check_submissions_and_mark_complete = mock.Mock()
+
+        with self._patch_direct_uploads(), \
+                mock.patch('group_project_v2.direct_uploads.DirectUpload') as direct_upload_class:
+            upload = direct_upload_class.return_value
+            upload.submission_id = 'upload_id'
+            upload.file_name = 'report.pdf'
+            upload.location = 'https://bucket.s3.amazonaws.com/report.pdf'
+
+            response = self.block.confirm_upload(self._make_json_request({'key': 'key'}))
+
+        self.assertEqual(response.status_code, 200)
+        response_payload = json.loads(response.text)
+        self.assertEqual(response_payload['submissions'], {'upload_id': 'https://bucket.s3.amazonaws.com/report.pdf'})
+        self.assertEqual(response_payload['new_stage_states'], [{'state': 'complete'}])
+        self.assertEqual(response_payload['submission_date'], 'Aug 01')
+
+        self.assertEqual(direct_upload_class.call_args[0][:2], ('key', 'upload_id'))
+        upload.validate.assert_called_once_with(self.block.validator)
+        upload.save_file.assert_called_once_with()
+        upload.submit.assert_called_once_with()
+        self.stage_mock.check_submissions_and_mark_complete.assert_called_once_with()
+        self.runtime_mock.publish.assert_called_once_with(
+            self.block,
+            self.block_to_test.SUBMISSION_RECEIVED_EVENT,
+            {
+                "submission_id": 'upload_id',
+                "filename": 'report.pdf',
+                "content_id": 'content_id',
+                "group_id": self.group_id,
+                "user_id": self.user_id,
+            }
+        )
+
+    def test_confirm_upload_invalid(self):
+        with self._patch_direct_uploads(), \
+                mock.patch('group_project_v2.direct_uploads.DirectUpload') as direct_upload_class:
+            direct_upload_class.return_value.validate.side_effect = ValidationError(messages.DIRECT_UPLOAD_NOT_FOUND)
+
+            response = self.block.confirm_upload(self._make_json_request({'key': 'key'}))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.text)['message'], messages.DIRECT_UPLOAD_NOT_FOUND)
+        direct_upload_class.return_value.save_file.assert_not_called()
+        direct_upload_class.return_value.submit.assert_not_called()
+        self.runtime_mock.publish.assert_not_called()
+
+    @ddt.data(
+        (True, {}, 400),
+        (True, b'', 400),
+        (True, b'not json', 400),
+        (True, {'key': None}, 400),
+        (False, {'key': 'key'}, 404),
+    )
+    @ddt.unpack
+    def test_confirm_upload_rejected(self, enabled, data, expected_code):
+        with self._patch_direct_uploads(enabled), \
+                mock.patch('group_project_v2.direct_uploads.DirectUpload') as direct_upload_class:
+            response = self.block.confirm_upload(self._make_json_request(data))
+
+        self.assertEqual(response.status_code, expected_code)
+        self.assertEqual(json.loads(response.text)['result'], 'error')
+        direct_upload_class.assert_not_called()
+        self.runtime_mock.publish.assert_not_called()
+
     def test_persist_and_submit_file_propagates_exceptions(self):
         context_mock = mock.Mock()
         uploaded_file = self._make_file()
@@ -487,7 +650,8 @@ class TestGroupProjectTeamEvaluationDisplayXBlock(CommonFeedbackDisplayStageTest
     )
     @ddt.unpack
     def test_get_feedback(self, user_id, group_id, content_id, question_id, feedback_items, expected_result):
-        self.project_api_mock.get_user_peer_review_items = mock.Mock(return_value=feedback_items)
+        feedback_items = [dict(item, user=user_id) for item in feedback_items] + [mri(1, question_id, peer=42)]
+        self.project_api_mock.get_peer_review_item_index.return_value = ReviewItemIndex(feedback_items, 'user')
         self.stage_mock.activity_content_id = content_id
         self.block.question_id = question_id
 
@@ -495,10 +659,8 @@ class TestGroupProjectTeamEvaluationDisplayXBlock(CommonFeedbackDisplayStageTest
                 mock.patch.object(self.block_to_test, 'group_id', mock.PropertyMock(return_value=group_id)):
             result = self.block.get_feedback()
 
-            self.project_api_mock.get_user_peer_review_items.assert_called_once_with(
-                user_id, group_id, content_id
-            )
-            self.assertEqual(result, expected_result)
+            self.project_api_mock.get_peer_review_item_index.assert_called_once_with(group_id, content_id)
+            self.assertEqual(result, [dict(item, user=user_id) for item in expected_result])
 
     def test_activity_questions(self):
         self.activity_mock.team_evaluation_questions = [1, 2, 3]
@@ -519,14 +681,16 @@ class TestGroupProjectGradeEvaluationDisplayXBlock(CommonFeedbackDisplayStageTes
     )
     @ddt.unpack
     def test_get_feedback(self, group_id, content_id, question_id, feedback_items, expected_result):
-        self.project_api_mock.get_workgroup_review_items_for_group = mock.Mock(return_value=feedback_items)
+        self.project_api_mock.get_workgroup_review_item_index.return_value = ReviewItemIndex(
+            feedback_items, 'workgroup'
+        )
         self.stage_mock.activity_content_id = content_id
         self.block.question_id = question_id
 
         with mock.patch.object(self.block_to_test, 'group_id', mock.PropertyMock(return_value=group_id)):
             result = self.block.get_feedback()
 
-            self.project_api_mock.get_workgroup_review_items_for_group.assert_called_once_with(group_id, content_id)
+            self.project_api_mock.get_workgroup_review_item_index.assert_called_once_with(group_id, content_id)
             self.assertEqual(result, expected_result)
 
     def test_activity_questions(self):
@@ -534,3 +698,19 @@ class TestGroupProjectGradeEvaluationDisplayXBlock(CommonFeedbackDisplayStageTes
         self.activity_mock.peer_review_questions = [4, 5, 6]
 
         self.assertEqual(self.block.activity_questions, [4, 5, 6])
+
+
+class TestPeerSelectorXBlock(StageComponentXBlockTestBase):
+    block_to_test = PeerSelectorXBlock
+
+    def test_get_statuses(self):
+        stage_mock = mock.create_autospec(TeamEvaluationStage)
+        stage_mock.team_members = [ReducedUserDetails(id=10), ReducedUserDetails(id=11)]
+        stage_mock.get_review_states.return_value = {10: ReviewState.COMPLETED, 11: ReviewState.NOT_STARTED}
+        self.make_patch(self.block_to_test, 'stage', mock.PropertyMock(return_value=stage_mock))
+
+        response = self.block.get_statuses(mock.Mock())
+
+        self.assertEqual(json.loads(response.body.decode('utf-8')), {'10': 'completed', '11': 'not_started'})
+        self.assertEqual(list(stage_mock.get_review_states.call_args[0][0]), [10, 11])
+        stage_mock.get_review_state.assert_not_called()
@@ -3,6 +3,8 @@ from collections import OrderedDict
 
 import ddt
 import mock
+from django.core.cache import caches
+from django.test import override_settings
 
 from group_project_v2.project_api.dtos import ReducedUserDetails
 from group_project_v2.stage import BaseGroupActivityStage
@@ -13,6 +15,11 @@ from tests.utils import KNOWN_USERS, OTHER_GROUPS, WORKGROUP, TestConstants
 
 TEST_USERS = TestConstants.Users  # pylint: disable=invalid-name
 
+COMPLETION_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'completion': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'completion'},
+}
+
 
 class DummyStageBlock(BaseGroupActivityStage):
     """ Dummy stage for testing BaseGroupActivityStage """
@@ -235,6 +242,58 @@ class TestBaseGroupActivityStage(BaseStageTest):
         for stat, value in list(stats.items()):
             self.assertAlmostEqual(value, expected_stats[stat])
 
+    @override_settings(CACHES=COMPLETION_CACHES, GROUP_PROJECT_V2_COMPLETION_CACHE='completion')
+    def test_materialized_users_completion(self):
+        caches['completion'].clear()
+        users = [make_reduced_user_details(id=user_id) for user_id in (1, 2, 3, 4)]
+        patched_completions = self.make_patch(self.block, 'get_users_completion')
+        patched_completions.return_value = ({1}, {2})
+
+        self.assertEqual(self.block.get_materialized_users_completion(['workgroups'], users[:3]), ({1}, {2}))
+        patched_completions.assert_called_once_with(['workgroups'], users[:3])
+
+        # only users missing from the table are calculated
+        patched_completions.reset_mock()
+        patched_completions.return_value = (set(), {4})
+        self.assertEqual(self.block.get_materialized_users_completion(['workgroups'], users), ({1}, {2, 4}))
+        patched_completions.assert_called_once_with(['workgroups'], users[3:])
+
+        # write paths update the table
+        with mock.patch.object(self.block, 'runtime'):
+            self.block.mark_complete(3)
+        patched_completions.reset_mock()
+        self.assertEqual(self.block.get_materialized_users_completion(['workgroups'], users), ({1, 3}, {2, 4}))
+        patched_completions.assert_not_called()
+
+    def test_materialized_users_completion_disabled(self):
+        users = [make_reduced_user_details(id=user_id) for user_id in (1, 2)]
+        patched_completions = self.make_patch(self.block, 'get_users_completion')
+        patched_completions.return_value = ({1}, {2})
+
+        for _ in range(2):
+            self.assertEqual(self.block.get_materialized_users_completion(['workgroups'], users), ({1}, {2}))
+
+        self.assertEqual(patched_completions.call_count, 2)
+
+    @ddt.data(
+        (False, [2, 3]),
+        (True, [1, 2, 3]),
+    )
+    @ddt.unpack
+    def test_get_team_members(self, include_current_user, expected_user_ids):
+        self.project_api_mock.get_members_data.side_effect = lambda user_ids: ['member {}'.format(u) for u in user_ids]
+
+        result = self.block.get_team_members(include_current_user=include_current_user)
+
+        self.project_api_mock.get_members_data.assert_called_once_with(expected_user_ids)
+        self.assertEqual(result, ['member {}'.format(user_id) for user_id in expected_user_ids])
+
+    def test_team_members_outsider(self):
+        self.user_id_mock.return_value = 42
+
+        self.assertEqual(self.block.team_members, [])
+        self.project_api_mock.get_members_data.assert_not_called()
+
     def test_get_external_group_status(self):
         self.assertEqual(self.block.get_external_group_status('irrelevant'), StageState.NOT_AVAILABLE)
 
@@ -0,0 +1,124 @@
+from unittest import TestCase
+
+import ddt
+import mock
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from group_project_v2.stage.completion import CompletionMatrix, StageCompletionTable
+from group_project_v2.stage.utils import StageState
+from tests.utils import make_workgroup as mk_wg
+
+
+@ddt.ddt
+class TestCompletionMatrix(TestCase):
+    def setUp(self):
+        self.workgroups = [
+            mk_wg(1, [{'id': 1}, {'id': 2}]),
+            mk_wg(2, [{'id': 3}, {'id': 4}]),
+            mk_wg(3, [{'id': 5}]),
+        ]
+        self.matrix = CompletionMatrix([1, 2, 3, 4, 5, 1], self.workgroups)
+        self.matrix.add_stage('stage1', {1, 2, 3}, {4})
+        self.matrix.add_stage('stage2', set(), set())
+
+    def test_user_states(self):
+        self.assertEqual(len(self.matrix), 5)
+        self.assertEqual(self.matrix.get_user_states('stage1'), {
+            1: StageState.COMPLETED, 2: StageState.COMPLETED, 3: StageState.COMPLETED,
+            4: StageState.INCOMPLETE, 5: StageState.NOT_STARTED,
+        })
+        self.assertEqual(self.matrix.get_user_state('stage1', 4), StageState.INCOMPLETE)
+        self.assertEqual(self.matrix.get_user_state('stage1', 42), StageState.UNKNOWN)
+
+    def test_unknown_users_are_ignored(self):
+        self.matrix.add_stage('stage3', {42}, {5})
+
+        self.assertEqual(self.matrix.get_state_counts('stage3'), {
+            StageState.COMPLETED: 0, StageState.INCOMPLETE: 1, StageState.NOT_STARTED: 4,
+        })
+
+    def test_completed_takes_precedence(self):
+        self.matrix.add_stage('stage3', {1}, {1})
+        self.assertEqual(self.matrix.get_user_state('stage3', 1), StageState.COMPLETED)
+
+    @ddt.data(
+        ('stage1', {StageState.COMPLETED: 3, StageState.INCOMPLETE: 1, StageState.NOT_STARTED: 1}),
+        ('stage2', {StageState.COMPLETED: 0, StageState.INCOMPLETE: 0, StageState.NOT_STARTED: 5}),
+    )
+    @ddt.unpack
+    def test_state_counts(self, stage_id, expected_counts):
+        self.assertEqual(self.matrix.get_state_counts(stage_id), expected_counts)
+
+    def test_group_states(self):
+        self.assertEqual(self.matrix.get_group_states('stage1'), {
+            1: StageState.COMPLETED, 2: StageState.INCOMPLETE, 3: StageState.NOT_STARTED,
+        })
+        self.assertEqual(self.matrix.get_group_states('stage2'), {
+            1: StageState.NOT_STARTED, 2: StageState.NOT_STARTED, 3: StageState.NOT_STARTED,
+        })
+
+    @ddt.data(
+        # members that are not target users have unknown state - group is at least partially completed
+        ([1], {1}, StageState.INCOMPLETE),
+        ([1], set(), StageState.INCOMPLETE),
+        ([1, 2], {1, 2}, StageState.COMPLETED),
+    )
+    @ddt.unpack
+    def test_group_states_with_unknown_members(self, user_ids, completed, expected_state):
+        matrix = CompletionMatrix(user_ids, [mk_wg(1, [{'id': 1}, {'id': 2}])])
+        matrix.add_stage('stage', completed, set())
+
+        self.assertEqual(matrix.get_group_states('stage'), {1: expected_state})
+
+    def test_group_states_single_member(self):
+        matrix = CompletionMatrix([1], [mk_wg(1, [{'id': 1}]), mk_wg(2, [])])
+        matrix.add_stage('stage', {1}, set())
+
+        # empty workgroup is considered completed, same as if all its members completed the stage
+        self.assertEqual(matrix.get_group_states('stage'), {1: StageState.COMPLETED, 2: StageState.COMPLETED})
+
+
+COMPLETION_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'completion': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'completion'},
+}
+
+
+@override_settings(CACHES=COMPLETION_CACHES, GROUP_PROJECT_V2_COMPLETION_CACHE='completion')
+class TestStageCompletionTable(SimpleTestCase):
+    def setUp(self):
+        caches['completion'].clear()
+        self.table = StageCompletionTable('block-v1:course+type@gp-v2-stage-basic+block@stage')
+
+    def test_rows(self):
+        self.table.set_user_states({1: StageState.COMPLETED, 2: StageState.INCOMPLETE})
+
+        self.assertEqual(
+            self.table.get_user_states([1, 2, 3]), {1: StageState.COMPLETED, 2: StageState.INCOMPLETE}
+        )
+
+        self.table.invalidate_users([2])
+        self.assertEqual(self.table.get_user_states([1, 2, 3]), {1: StageState.COMPLETED})
+
+    def test_tables_are_per_stage(self):
+        self.table.set_user_states({1: StageState.COMPLETED})
+
+        self.assertEqual(StageCompletionTable('other-stage').get_user_states([1]), {})
+
+    @override_settings(GROUP_PROJECT_V2_COMPLETION_CACHE=None)
+    def test_disabled_by_default(self):
+        self.table.set_user_states({1: StageState.COMPLETED})
+
+        self.assertIsNone(self.table.cache)
+        self.assertEqual(self.table.get_user_states([1]), {})
+        with override_settings(GROUP_PROJECT_V2_COMPLETION_CACHE='completion'):
+            self.assertEqual(self.table.get_user_states([1]), {})
+
+    def test_cache_errors_are_missing_rows(self):
+        self.table.set_user_states({1: StageState.COMPLETED})
+
+        with mock.patch('django.core.cache.backends.locmem.LocMemCache.get_many', mock.Mock(side_effect=IOError)):
+            self.assertEqual(self.table.get_user_states([1]), {})
+        with mock.patch('django.core.cache.backends.locmem.LocMemCache.set_many', mock.Mock(side_effect=IOError)):
+            self.table.set_user_states({2: StageState.COMPLETED})
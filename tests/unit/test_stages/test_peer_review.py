@@ -1,17 +1,21 @@
 import itertools
+import json
 from collections import defaultdict
 
 import ddt
 import mock
+import webob
 from xblock.validation import ValidationMessage
 
 from group_project_v2.project_api.dtos import WorkgroupDetails
+from group_project_v2.request_context import request_scope, run_deferred
+from group_project_v2.roster import ProjectRoster, ReviewAssignmentGraph
 from group_project_v2.stage import PeerReviewStage
 from group_project_v2.stage.utils import ReviewState, StageState
 from group_project_v2.stage_components import GroupProjectReviewQuestionXBlock, GroupSelectorXBlock
 from tests.unit.test_stages.base import BaseStageTest, ReviewStageBaseTest, ReviewStageUserCompletionStatsMixin
 from tests.unit.test_stages.utils import GROUP_ID, OTHER_GROUP_ID, OTHER_USER_ID, USER_ID, patch_obj
-from tests.utils import make_question
+from tests.utils import make_api_error, make_question
 from tests.utils import make_review_item as mri
 from tests.utils import make_workgroup as mk_wg
 
@@ -49,6 +53,38 @@ class TestPeerReviewStage(ReviewStageBaseTest, BaseStageTest):
                 patch_obj(self.block_to_test, 'available_now', mock.PropertyMock(return_value=available_now)):
             self.assertEqual(self.block.can_mark_complete, True)
 
+    @ddt.data(None, make_api_error(500, "API is down"))
+    def test_submit_review_invalidates_reviewer_completion(self, submit_error):
+        completion_table_mock = mock.PropertyMock(return_value=mock.Mock())
+        request = webob.Request.blank(
+            '/', method='POST', body=json.dumps({'review_subject_id': str(GROUP_ID)}).encode('utf-8')
+        )
+
+        with patch_obj(self.block_to_test, 'is_admin_grader', mock.PropertyMock(return_value=True)), \
+                patch_obj(self.block_to_test, 'available_now', mock.PropertyMock(return_value=True)), \
+                patch_obj(self.block_to_test, 'can_mark_complete', mock.PropertyMock(return_value=False)), \
+                patch_obj(self.block_to_test, 'completion_table', completion_table_mock), \
+                patch_obj(self.block_to_test, 'do_submit_review', mock.Mock(side_effect=submit_error)):
+            self.activity_mock.allow_admin_grader_access = True
+            self.block.submit_review(request)
+
+        # only grader's row is dropped, even if submission failed
+        completion_table_mock.return_value.invalidate_users.assert_called_once_with([self.user_id])
+        self.project_api_mock.get_workgroup_by_id.assert_not_called()
+
+    def test_grade_recalculated_once_per_request(self):
+        self.project_api_mock.submit_workgroup_review_items.return_value = []
+
+        with patch_obj(self.block_to_test, 'grade_questions', mock.PropertyMock(return_value=[])), request_scope():
+            self.block.do_submit_review({'review_subject_id': str(OTHER_GROUP_ID), 'q1': '1'})
+            self.block.do_submit_review({'review_subject_id': str(OTHER_GROUP_ID), 'q1': '2'})
+            self.activity_mock.calculate_and_send_grade.assert_not_called()
+
+            run_deferred()
+            self.activity_mock.calculate_and_send_grade.assert_called_once_with(OTHER_GROUP_ID)
+
+        self.assertEqual(self.project_api_mock.submit_workgroup_review_items.call_count, 2)
+
     def test_validation(self):
         questions = [self._make_question(graded=True)]
         categories = [GroupProjectReviewQuestionXBlock.CATEGORY]
@@ -181,6 +217,30 @@ class TestPeerReviewStageReviewStatus(ReviewStageBaseTest, ReviewStageUserComple
 
         self.assertEqual(self.project_api_mock.get_workgroup_review_items_for_group.mock_calls, expected_calls)
 
+    def test_get_review_states(self):
+        reviews = {
+            GROUP_ID: [mri(USER_ID, "q1", group=GROUP_ID, answer='1'), mri(USER_ID, "q2", group=GROUP_ID, answer='2')],
+            OTHER_GROUP_ID: [
+                mri(USER_ID, "q1", group=OTHER_GROUP_ID, answer='3'),
+                mri(OTHER_USER_ID, "q2", group=OTHER_GROUP_ID, answer='4'),
+            ],
+        }
+        self.project_api_mock.get_workgroup_review_items_for_group.side_effect = (
+            lambda group_id, _content_id: reviews.get(group_id, [])
+        )
+
+        with patch_obj(self.block_to_test, 'required_questions', mock.PropertyMock()) as patched_questions:
+            patched_questions.return_value = [make_question(q_id, 'irrelevant') for q_id in ["q1", "q2"]]
+
+            states = self.block.get_review_states([GROUP_ID, OTHER_GROUP_ID, 42, GROUP_ID])
+
+        self.assertEqual(states, {
+            GROUP_ID: ReviewState.COMPLETED, OTHER_GROUP_ID: ReviewState.INCOMPLETE, 42: ReviewState.NOT_STARTED,
+        })
+        self.assertEqual(self.project_api_mock.get_workgroup_review_items_for_group.mock_calls, [
+            mock.call(group_id, self.block.activity_content_id) for group_id in [GROUP_ID, OTHER_GROUP_ID, 42]
+        ])
+
     @ddt.data(
         # no reviews - not started
         ([GROUP_ID], ["q1"], [], (set(), set())),
@@ -379,3 +439,46 @@ class TestPeerReviewStageReviewStatus(ReviewStageBaseTest, ReviewStageUserComple
             patched_outsider_allowed.side_effect = lambda user_id, _course_id: user_id in ta_reviewers
 
             self.assert_group_completion(group_to_review, questions, expected_result)
+
+    def test_roster_uses_review_assignment_graph(self):
+        workgroups = [mk_wg(GROUP_ID, [{"id": 1}]), mk_wg(OTHER_GROUP_ID, [{"id": 2}])]
+        roster = ProjectRoster(workgroups)
+        self.project_api_mock.get_review_assignment_graph.return_value = ReviewAssignmentGraph([
+            ([1], [workgroups[1]]),
+            ([2], [workgroups[0]]),
+        ])
+        self._set_project_api_responses(
+            {},
+            {
+                GROUP_ID: [self._parse_review_item_string('2:q1:10:a')],
+                OTHER_GROUP_ID: [],
+            }
+        )
+
+        self.assert_users_completion(({2}, set()), ['q1'], [1, 2], roster)
+        self.assertEqual(self.block.get_review_subjects(1, roster), [workgroups[1]])
+        with patch_obj(self.block_to_test, 'required_questions', mock.PropertyMock()) as patched_questions:
+            patched_questions.return_value = [make_question('q1', 'irrelevant')]
+            self.assertEqual(self.block.get_external_group_status(workgroups[0], roster), StageState.COMPLETED)
+            self.assertEqual(self.block.get_external_group_status(workgroups[1], roster), StageState.NOT_STARTED)
+
+        self.project_api_mock.get_review_assignment_graph.assert_called_with(
+            tuple(workgroups), self.block.activity_content_id
+        )
+        self.project_api_mock.get_workgroups_to_review.assert_not_called()
+        self.project_api_mock.get_workgroup_reviewers.assert_not_called()
+
+    def test_roster_subset_uses_project_review_assignment_graph(self):
+        workgroups = [mk_wg(GROUP_ID, [{"id": 1}]), mk_wg(OTHER_GROUP_ID, [{"id": 2}])]
+        page_roster = ProjectRoster(workgroups).subset(workgroups[:1])
+        self.project_api_mock.get_review_assignment_graph.return_value = ReviewAssignmentGraph([
+            ([1], [workgroups[1]]),
+            ([2], [workgroups[0]]),
+        ])
+
+        # reviewers and review subjects may be outside of the subset
+        self.assertEqual(self.block.get_review_subjects(1, page_roster), [workgroups[1]])
+        self.assertEqual(self.block.get_workgroup_reviewer_ids(GROUP_ID, page_roster), [2])
+        self.project_api_mock.get_review_assignment_graph.assert_called_with(
+            tuple(workgroups), self.block.activity_content_id
+        )
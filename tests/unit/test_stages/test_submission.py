@@ -1,7 +1,9 @@
 import ddt
 import mock
 
+from group_project_v2.request_context import request_scope
 from group_project_v2.stage import SubmissionStage
+from group_project_v2.stage.utils import StageState
 from tests.unit.test_stages.base import BaseStageTest
 from tests.utils import make_workgroup as mk_wg
 
@@ -86,3 +88,20 @@ class TestSubmissionStage(BaseStageTest):
             self.project_api_mock.get_latest_workgroup_submissions_by_id.mock_calls,
             expected_calls
         )
+
+    @ddt.data(
+        (['u1', 'u2'], {}, StageState.NOT_STARTED),
+        (['u1', 'u2'], {'u1': {}}, StageState.INCOMPLETE),
+        (['u1', 'u2'], {'u1': {}, 'u2': {}}, StageState.COMPLETED),
+    )
+    @ddt.unpack
+    def test_get_stage_state(self, uploads, group_submissions, expected_state):
+        self._set_upload_ids(uploads)
+        self.project_api_mock.get_latest_workgroup_submissions_by_id.return_value = group_submissions
+
+        with request_scope():
+            self.assertEqual(self.block.get_stage_state(), expected_state)
+            self.assertEqual(self.block.get_external_group_status(self.workgroup_data), expected_state)
+
+        # stage state checks read a single submissions snapshot per request
+        self.project_api_mock.get_latest_workgroup_submissions_by_id.assert_called_once_with(self.workgroup_data.id)
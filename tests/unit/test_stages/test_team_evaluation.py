@@ -3,6 +3,8 @@ import mock
 from xblock.validation import ValidationMessage
 
 from group_project_v2.project_api.dtos import ReducedUserDetails
+from group_project_v2.request_context import request_scope
+from group_project_v2.roster import ProjectRoster
 from group_project_v2.stage import TeamEvaluationStage
 from group_project_v2.stage.utils import ReviewState
 from group_project_v2.stage_components import GroupProjectReviewQuestionXBlock, PeerSelectorXBlock
@@ -91,6 +93,56 @@ class TestTeamEvaluationStageStageStatus(ReviewStageUserCompletionStatsMixin, Ba
                 self.workgroup_data.id, self.activity_mock.content_id
             )
 
+    def test_get_review_states(self):
+        self.project_api_mock.get_peer_review_items_for_group.return_value = [
+            mri(USER_ID, "q1", peer=10, answer='1'), mri(USER_ID, "q2", peer=10, answer='2'),
+            mri(USER_ID, "q1", peer=11, answer='3'),
+            mri(OTHER_USER_ID, "q1", peer=12, answer='4'),
+        ]
+
+        with patch_obj(self.block_to_test, 'required_questions', mock.PropertyMock()) as patched_questions:
+            patched_questions.return_value = [make_question(q_id, 'irrelevant') for q_id in ["q1", "q2"]]
+
+            self.assertEqual(self.block.get_review_states([10, 11, 12]), {
+                10: ReviewState.COMPLETED, 11: ReviewState.INCOMPLETE, 12: ReviewState.NOT_STARTED,
+            })
+
+        self.project_api_mock.get_peer_review_items_for_group.assert_called_once_with(
+            self.workgroup_data.id, self.activity_mock.content_id
+        )
+
+    def test_review_status_after_submission_is_not_fetched_again(self):
+        self.project_api_mock.submit_peer_review_items.return_value = [mri(USER_ID, "q1", peer=10, answer='1')]
+
+        with patch_obj(self.block_to_test, 'review_subjects', mock.PropertyMock()) as patched_review_subjects, \
+                patch_obj(self.block_to_test, 'required_questions', mock.PropertyMock()) as patched_questions, \
+                request_scope():
+            patched_review_subjects.return_value = [ReducedUserDetails(id=10)]
+            patched_questions.return_value = [make_question("q1", 'irrelevant')]
+
+            self.block.do_submit_review({'review_subject_id': '10', 'q1': '1'})
+
+            self.assertEqual(self.block.review_status(), ReviewState.COMPLETED)
+            self.project_api_mock.get_peer_review_items_for_group.assert_not_called()
+
+    def test_review_data_after_submission_includes_submitted_items(self):
+        submitted_items = [mri(USER_ID, "q1", peer=10, answer='1')]
+        self.project_api_mock.get_user_workgroup_for_course.return_value = mk_wg(
+            self.workgroup_data.id, users=[{"id": USER_ID}, {"id": 10}]
+        )
+        self.project_api_mock.get_peer_review_items_for_group.return_value = []
+        self.project_api_mock.submit_peer_review_items.return_value = submitted_items
+
+        with request_scope():
+            self.assertEqual(self.block.get_review_data(USER_ID), ({10}, []))
+
+            self.block.do_submit_review({'review_subject_id': '10', 'q1': '1'})
+
+            self.assertEqual(self.block.get_review_data(USER_ID), ({10}, submitted_items))
+            self.project_api_mock.get_peer_review_items_for_group.assert_called_once_with(
+                self.workgroup_data.id, self.activity_mock.content_id
+            )
+
     def _set_project_api_responses(self, workgroups, review_items):
         def workgroups_side_effect(user_id, _course_id):
             return workgroups.get(user_id, None)
@@ -225,3 +277,20 @@ class TestTeamEvaluationStageStageStatus(ReviewStageUserCompletionStatsMixin, Ba
             mock.call(OTHER_GROUP_ID, self.block.activity_content_id)
         ]
         self.assertEqual(self.project_api_mock.get_peer_review_items_for_group.mock_calls, expected_calls)
+
+    def test_users_completion_uses_roster_memberships(self):
+        workgroups = [
+            mk_wg(GROUP_ID, users=[{"id": 1}, {"id": 2}]),
+            mk_wg(OTHER_GROUP_ID, users=[{"id": 3}, {"id": 4}]),
+        ]
+        self._set_project_api_responses(
+            {},
+            {
+                GROUP_ID: [self._parse_review_item_string(item) for item in ['1:q1:2:a', '2:q1:1:b']],
+                OTHER_GROUP_ID: [self._parse_review_item_string('3:q1:4:c')],
+            }
+        )
+
+        self.assert_users_completion(({1, 2, 3}, set()), ['q1'], [1, 2, 3, 4], ProjectRoster(workgroups))
+
+        self.project_api_mock.get_user_workgroup_for_course.assert_not_called()
@@ -0,0 +1,238 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from unittest import TestCase
+
+import ddt
+import mock
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+from storages.backends.s3boto import S3BotoStorage
+
+from group_project_v2 import messages
+from group_project_v2.stage_components import GroupProjectSubmissionXBlock
+from group_project_v2.upload_file import DirectUpload, UploadFile, direct_uploads_enabled
+from group_project_v2.utils import get_s3_client
+from tests.utils import S3_SETTINGS
+
+CONTENT = b'group project deliverable ' * 10000
+CONTENT_SHA1 = hashlib.sha1(CONTENT).hexdigest()
+
+
+class TestUploadFile(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = FileSystemStorage(location=self.location)
+        patcher = mock.patch('group_project_v2.upload_file.get_storage', mock.Mock(return_value=self.storage))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _make_upload(content=CONTENT):
+        return UploadFile(ContentFile(content, name='report.pdf'), 'upload_id', {'group_id': 12})
+
+    def _stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(path, file_name), self.location)
+            for path, _dirs, files in os.walk(self.location) for file_name in files
+        )
+
+    def test_location(self):
+        upload = self._make_upload()
+        upload.save_file()
+
+        # not an S3 storage - storage URL is used as is
+        self.assertEqual(upload.location, upload.file_url)
+        self.assertTrue(upload.file_url.endswith('group_work/12/{}/report.pdf'.format(CONTENT_SHA1)))
+
+    def test_save_file(self):
+        upload = self._make_upload()
+
+        upload.save_file()
+
+        path = 'group_work/12/{}/report.pdf'.format(CONTENT_SHA1)
+        self.assertEqual(upload.sha1, CONTENT_SHA1)
+        self.assertEqual(upload.file_storage_path, path)
+        self.assertEqual(self._stored_files(), [path])
+        with self.storage.open(path) as stored_file:
+            self.assertEqual(stored_file.read(), CONTENT)
+
+    def test_save_duplicate_file(self):
+        self._make_upload().save_file()
+        self._make_upload().save_file()
+        self._make_upload(b'other content').save_file()
+
+        self.assertEqual(self._stored_files(), sorted([
+            'group_work/12/{}/report.pdf'.format(CONTENT_SHA1),
+            'group_work/12/{}/report.pdf'.format(hashlib.sha1(b'other content').hexdigest()),
+        ]))
+
+
+@ddt.ddt
+class TestSaveS3File(TestCase):
+    def setUp(self):
+        self.storage = mock.Mock(
+            spec=S3BotoStorage, headers={}, encryption=True, default_acl='private', reduced_redundancy=False
+        )
+        for method in ('_clean_name', '_normalize_name', '_encode_name'):
+            getattr(self.storage, method).side_effect = lambda name: name
+        patcher = mock.patch('group_project_v2.upload_file.get_storage', mock.Mock(return_value=self.storage))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @ddt.data(1, 2)
+    def test_save_file(self, times_uploaded):
+        for _ in range(times_uploaded):
+            upload = UploadFile(ContentFile(CONTENT, name='report.pdf'), 'upload_id', {'group_id': 12})
+            upload.save_file()
+
+        path = 'group_work/12/{}/report.pdf'.format(CONTENT_SHA1)
+        self.assertEqual(upload.file_storage_path, path)
+        # each upload is a single write, with no requests to check the path first
+        self.storage.exists.assert_not_called()
+        self.storage.bucket.get_key.assert_not_called()
+        self.assertEqual(self.storage.bucket.new_key.call_args_list, [mock.call(path)] * times_uploaded)
+        key = self.storage.bucket.new_key.return_value
+        self.assertEqual(key.set_contents_from_file.call_count, times_uploaded)
+        key.set_contents_from_file.assert_called_with(
+            upload.file, headers={'Content-Type': 'application/pdf'}, policy='private', reduced_redundancy=False,
+            rewind=True, encrypt_key=True,
+            md5=(hashlib.md5(CONTENT).hexdigest(), base64.b64encode(hashlib.md5(CONTENT).digest()).decode('ascii'))
+        )
+
+
+def _read_resource(file_name):
+    with open(os.path.join(os.path.dirname(__file__), '..', 'resources', file_name), 'rb') as resource:
+        return resource.read()
+
+
+@ddt.ddt
+@override_settings(**S3_SETTINGS)
+class TestDirectUpload(SimpleTestCase):
+    """
+    S3 is stood in by botocore stubber, activated on the shared S3 client
+    """
+    group_id = 12
+    context = {'group_id': group_id}
+
+    def setUp(self):
+        patcher = mock.patch.dict('group_project_v2.utils._s3_clients', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stubber = Stubber(get_s3_client())
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+
+    def _make_upload(self, file_name='report.pdf'):
+        return DirectUpload(DirectUpload.make_key(self.group_id, file_name), 'upload_id', self.context)
+
+    def _stub_get_object(self, upload, content):
+        self.stubber.add_response(
+            'get_object',
+            {'Body': StreamingBody(ContentFile(content), len(content)), 'ContentLength': len(content)},
+            {'Bucket': 'bucket', 'Key': upload.key, 'Range': mock.ANY}
+        )
+
+    def test_direct_uploads_enabled(self):
+        self.assertFalse(direct_uploads_enabled())
+        with override_settings(GROUP_PROJECT_V2_DIRECT_UPLOADS=True):
+            self.assertTrue(direct_uploads_enabled())
+            with override_settings(DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage'):
+                self.assertFalse(direct_uploads_enabled())
+
+    @ddt.data(
+        ('report.pdf', 'report.pdf'),
+        ('../../other/report.pdf', 'report.pdf'),
+        ('my report (final).pptx', 'my_report_final.pptx'),
+    )
+    @ddt.unpack
+    def test_make_key(self, file_name, expected_file_name):
+        upload = self._make_upload(file_name)
+
+        self.assertRegex(upload.key, r'^group_work/uploads/12/[0-9a-f]{32}/' + re.escape(expected_file_name) + '$')
+        self.assertEqual(upload.file_name, expected_file_name)
+        # confirmed upload is stored outside of unconfirmed uploads
+        self.assertEqual(upload.file_storage_path, upload.key.replace('group_work/uploads/', 'group_work/'))
+
+    @ddt.data(
+        None,
+        'group_work/uploads/13/0123456789abcdef0123456789abcdef/report.pdf',
+        'group_work/uploads/12/not-a-token/report.pdf',
+        'group_work/uploads/12/0123456789abcdef0123456789abcdef/../report.pdf',
+        'group_work/uploads/120/0123456789abcdef0123456789abcdef/report.pdf',
+        # stored file
+        'group_work/12/0123456789abcdef0123456789abcdef/report.pdf',
+    )
+    def test_foreign_keys_are_rejected(self, key):
+        with self.assertRaises(ValidationError):
+            DirectUpload(key, 'upload_id', self.context)
+
+    def test_make_policy(self):
+        upload = self._make_upload()
+
+        policy = upload.make_policy(1024)
+
+        self.assertEqual(policy['url'], 'https://bucket.s3.amazonaws.com/')
+        self.assertEqual(policy['fields']['key'], upload.key)
+        self.assertEqual(policy['fields']['acl'], 'private')
+        self.assertEqual(policy['fields']['Content-Type'], 'application/pdf')
+        self.assertEqual(policy['fields']['x-amz-server-side-encryption'], 'AES256')
+        conditions = json.loads(base64.b64decode(policy['fields']['policy']))['conditions']
+        self.assertIn(['content-length-range', 1, 1024], conditions)
+        self.assertIn({'Content-Type': 'application/pdf'}, conditions)
+
+    def test_validate(self):
+        upload = self._make_upload()
+        self._stub_get_object(upload, _read_resource('document.pdf'))
+
+        upload.validate(GroupProjectSubmissionXBlock.validator)
+        self.stubber.assert_no_pending_responses()
+
+    def test_validate_invalid_file_is_deleted(self):
+        upload = self._make_upload('image.pdf')
+        self._stub_get_object(upload, _read_resource('restricted_upload.gif'))
+        self.stubber.add_response('delete_object', {}, {'Bucket': 'bucket', 'Key': upload.key})
+
+        with self.assertRaises(ValidationError):
+            upload.validate(GroupProjectSubmissionXBlock.validator)
+        self.stubber.assert_no_pending_responses()
+
+    def test_validate_missing_file(self):
+        upload = self._make_upload()
+        self.stubber.add_client_error('get_object', service_error_code='NoSuchKey', http_status_code=404)
+
+        with self.assertRaises(ValidationError) as raised:
+            upload.validate(GroupProjectSubmissionXBlock.validator)
+        self.assertEqual(raised.exception.message, messages.DIRECT_UPLOAD_NOT_FOUND)
+
+    def _stub_copy_object(self, upload):
+        self.stubber.add_response('copy_object', {}, {
+            'Bucket': 'bucket', 'Key': upload.file_storage_path, 'CopySource': {'Bucket': 'bucket', 'Key': upload.key},
+            'ACL': 'private', 'ServerSideEncryption': 'AES256',
+        })
+
+    def test_save_file(self):
+        upload = self._make_upload()
+        self._stub_copy_object(upload)
+        self.stubber.add_response('delete_object', {}, {'Bucket': 'bucket', 'Key': upload.key})
+
+        upload.save_file()
+        self.stubber.assert_no_pending_responses()
+
+    def test_save_file_delete_fails(self):
+        upload = self._make_upload()
+        self._stub_copy_object(upload)
+        self.stubber.add_client_error('delete_object', service_error_code='InternalError', http_status_code=500)
+
+        # uploaded object is left to lifecycle rule
+        upload.save_file()
+        self.stubber.assert_no_pending_responses()
@@ -1,16 +1,29 @@
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from unittest import TestCase
 
 import ddt
 import mock
 import pytz
 from dateutil.tz import tzoffset
+from django.test import SimpleTestCase, override_settings
 from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
 from xblock.core import XBlock
 from xblock.field_data import DictFieldData
 from xblock.fields import String
 
-from group_project_v2.utils import FieldValuesContextManager, build_date_field, get_block_content_id
+import group_project_v2.utils
+from group_project_v2.utils import (
+    ExpiringLRUCache,
+    FieldValuesContextManager,
+    build_date_field,
+    get_block_content_id,
+    get_s3_client,
+    iter_csv,
+    make_s3_link_temporary,
+    memoize_with_expiration,
+)
+from tests.utils import S3_SETTINGS
 
 
 class DummyXBlock(XBlock):
@@ -68,3 +81,153 @@ class TestUtils(TestCase):
     def test_build_date_field(self, json_string, expected):
         actual = build_date_field(json_string)
         self.assertEqual(actual, expected)
+
+    def test_iter_csv(self):
+        rows = iter([['a', 'b,c'], [1, u'ż']])
+
+        lines = iter_csv(rows, headers=['h1', 'h2'])
+
+        self.assertEqual(next(lines), b'h1,h2\r\n')
+        # rows are consumed lazily
+        self.assertEqual(next(rows), ['a', 'b,c'])
+        self.assertEqual(list(lines), [u'1,ż\r\n'.encode('utf-8')])
+
+
+class TestExpiringLRUCache(TestCase):
+    def setUp(self):
+        self.time_mock = mock.Mock(return_value=1000.0)
+        patcher = mock.patch('group_project_v2.utils.time.monotonic', self.time_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_set(self):
+        cache = ExpiringLRUCache(max_size=10, expires_after=timedelta(seconds=10))
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get('key', 'default'), 'default')
+
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+
+    def test_expiration(self):
+        cache = ExpiringLRUCache(max_size=10, expires_after=timedelta(seconds=10))
+        cache.set('key', 'value')
+
+        self.time_mock.return_value += 9
+        self.assertEqual(cache.get('key'), 'value')
+
+        self.time_mock.return_value += 1
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+
+    def test_expired_entries_are_dropped_on_set(self):
+        cache = ExpiringLRUCache(max_size=10, expires_after=timedelta(seconds=10))
+        for key in range(5):
+            cache.set(key, key)
+
+        self.time_mock.return_value += 10
+        cache.set('key', 'value')
+        self.assertEqual(len(cache), 1)
+
+    def test_lru_eviction(self):
+        cache = ExpiringLRUCache(max_size=3, expires_after=timedelta(seconds=10))
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+
+        cache.get('a')
+        cache.set('d', 'd')
+
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(key) for key in ('a', 'c', 'd')], ['a', 'c', 'd'])
+
+
+class TestMemoizeWithExpiration(TestCase):
+    def setUp(self):
+        self.func = mock.Mock(side_effect=lambda *args, **kwargs: (args, kwargs))
+        self.func.__name__ = 'func'
+        self.memoized = memoize_with_expiration(max_size=2)(self.func)
+
+    def test_caches_results(self):
+        self.assertEqual(self.memoized(1, b=2), ((1,), {'b': 2}))
+        self.assertEqual(self.memoized(1, b=2), ((1,), {'b': 2}))
+        self.assertEqual(self.memoized(2), ((2,), {}))
+
+        self.assertEqual(self.func.mock_calls, [mock.call(1, b=2), mock.call(2)])
+
+    def test_bounded(self):
+        for value in range(10):
+            self.memoized(value)
+
+        self.assertEqual(len(self.memoized.cache), 2)
+
+    def test_unhashable_arguments_are_not_cached(self):
+        self.memoized([1, 2])
+        self.memoized([1, 2])
+
+        self.assertEqual(self.func.mock_calls, [mock.call([1, 2]), mock.call([1, 2])])
+        self.assertEqual(len(self.memoized.cache), 0)
+
+    def test_thread_safety(self):
+        memoized = memoize_with_expiration(max_size=50)(self.func)
+
+        def worker():
+            for value in range(200):
+                memoized(value % 75)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(memoized.cache), 50)
+        self.assertEqual(memoized(74), ((74,), {}))
+
+
+@override_settings(**S3_SETTINGS)
+class TestMakeS3LinkTemporary(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict('group_project_v2.utils._s3_clients', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._clear_caches()
+
+    @staticmethod
+    def _clear_caches():
+        # pylint: disable=protected-access
+        group_project_v2.utils._s3_clients.clear()
+        group_project_v2.utils._s3_file_urls.clear()
+
+    @override_settings(DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage')
+    def test_not_s3_storage(self):
+        self.assertEqual(make_s3_link_temporary(1, 'sha1', 'file.pdf', '/media/file.pdf'), '/media/file.pdf')
+
+    def test_signed_link(self):
+        url = make_s3_link_temporary(1, 'sha1', 'file.pdf', 'irrelevant')
+
+        self.assertIn('bucket', url)
+        self.assertIn('group_work/1/sha1/file.pdf', url)
+        self.assertIn('Expires=', url)
+
+    def test_client_is_shared(self):
+        with mock.patch('boto3.client') as patched_client:
+            clients = [get_s3_client() for _ in range(3)]
+            with override_settings(AWS_ACCESS_KEY_ID='other-key'):
+                get_s3_client()
+
+        self.assertEqual(clients, [patched_client.return_value] * 3)
+        self.assertEqual(patched_client.call_count, 2)
+
+    def test_signed_links_are_reused(self):
+        with mock.patch('boto3.client') as patched_client:
+            patched_client.return_value.generate_presigned_url.side_effect = lambda **kwargs: kwargs['Params']['Key']
+
+            self.assertEqual(make_s3_link_temporary(1, 'sha1', 'file.pdf', None), 'group_work/1/sha1/file.pdf')
+            self.assertEqual(make_s3_link_temporary(1, 'sha1', 'file.pdf', None), 'group_work/1/sha1/file.pdf')
+            self.assertEqual(make_s3_link_temporary(2, 'sha1', 'file.pdf', None), 'group_work/2/sha1/file.pdf')
+
+        self.assertEqual(patched_client.call_count, 1)
+        self.assertEqual(patched_client.return_value.generate_presigned_url.call_count, 2)
@@ -10,7 +10,8 @@ from xblockutils.resources import ResourceLoader
 from group_project_v2.api_error import ApiError
 from group_project_v2.mixins import AuthXBlockMixin, UserAwareXBlockMixin
 from group_project_v2.project_api import TypedProjectAPI
-from group_project_v2.project_api.dtos import UserDetails, WorkgroupDetails
+from group_project_v2.project_api.dtos import OrganisationDetails, UserDetails, WorkgroupDetails
+from group_project_v2.roster import ReviewAssignmentGraph
 from group_project_v2.stage_components import GroupProjectReviewQuestionXBlock
 
 loader = ResourceLoader(__name__)  # pylint: disable=invalid-name
@@ -74,6 +75,14 @@ def make_submission_data(doc_url, doc_filename, upload_date, user_details):
     }
 
 
+S3_SETTINGS = {
+    'DEFAULT_FILE_STORAGE': 'storages.backends.s3boto.S3BotoStorage',
+    'AWS_ACCESS_KEY_ID': 'access-key',
+    'AWS_SECRET_ACCESS_KEY': 'secret-key',
+    'AWS_STORAGE_BUCKET_NAME': 'bucket',
+}
+
+
 def _get_user_details(user_id):
     if user_id not in KNOWN_USERS:
         raise ApiError("User {user_id} not found".format(user_id=user_id))
@@ -86,6 +95,9 @@ def get_mock_project_api():
     mock_api.get_user_preferences = Mock(return_value={})
     mock_api.get_user_workgroup_for_course = Mock(return_value=WORKGROUP)
     mock_api.get_workgroup_by_id = Mock(return_value=WORKGROUP)
+    mock_api.get_workgroups_by_ids = Mock(
+        side_effect=lambda group_ids: [mock_api.get_workgroup_by_id(group_id) for group_id in group_ids]
+    )
     mock_api.get_stage_state = Mock(return_value=({1, 2}, set()))
     mock_api.get_user_details = Mock(side_effect=_get_user_details)
     mock_api.get_workgroups_to_review = Mock(return_value={})
@@ -96,8 +108,14 @@ def get_mock_project_api():
     mock_api.get_workgroup_review_items_for_group = Mock(return_value={})
     mock_api.get_user_organizations = Mock(
         return_value=[{'display_name': "Org1", "id": 1}])
+    # all known users are members of organization returned by get_user_organizations
+    mock_api.get_organizations_by_ids = Mock(
+        side_effect=lambda org_ids: [OrganisationDetails(display_name="Org1", users=list(KNOWN_USERS)) for _ in org_ids]
+    )
     mock_api.get_workgroup_reviewers = Mock(return_value={})
+    mock_api.get_review_assignment_graph = Mock(return_value=ReviewAssignmentGraph([]))
     mock_api.get_member_data = Mock(side_effect=_get_user_details)
+    mock_api.get_members_data = Mock(side_effect=lambda user_ids: [_get_user_details(user_id) for user_id in user_ids])
     mock_api.get_user_groups = Mock(return_value=tuple())
     mock_api.get_user_permissions = Mock(return_value=tuple())
     mock_api.get_user_roles_for_course = Mock(return_value=set())